@@ -0,0 +1,114 @@
+import pathlib, re, sqlite3, threading, time
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional, Tuple
+
+# edgar/data/320193/0000320193-24-000010.txt
+_FILENAME = re.compile(r"edgar/data/(\d+)/(\d{10}-\d{2}-\d{6})\.txt$")
+# A quarter's index keeps growing until the quarter is over; reload it after this long.
+OPEN_QUARTER_TTL = 6 * 3600
+# EDGAR rebuilds the full index nightly, so a copy fetched this long after the
+# quarter ended holds all of it.
+_SETTLE = timedelta(days=2)
+
+
+def quarter_end(year: int, qtr: int) -> datetime:
+    """Midnight after the quarter's last day."""
+    return datetime(year + qtr // 4, qtr % 4 * 3 + 1, 1)
+
+
+def parse_master_index(text: str) -> Iterator[Tuple[str, int, str, str]]:
+    """Yield (accession, cik, form, filed) from an EDGAR quarterly master.idx."""
+    body = False
+    for line in text.splitlines():
+        if not body:
+            # header ends with a row of dashes under the column names
+            body = line.startswith("-----")
+            continue
+        parts = line.split("|")
+        if len(parts) != 5:
+            continue
+        cik, _, form, filed, filename = parts
+        m = _FILENAME.search(filename.strip())
+        if not m:
+            continue
+        yield m.group(2), int(cik), form.strip(), filed.strip()
+
+
+class AccessionIndex:
+    """On-disk map of accession -> (issuer CIK, form, filed date, primary document).
+
+    Fed from quarterly full-index files and from every submissions document the
+    server reads, so a lookup is one primary-key probe and survives restarts.
+    Writes hold a lock for their whole transaction, so callers on the event
+    loop run them through asyncio.to_thread.
+    """
+
+    def __init__(self, path=".cache/accessions.sqlite"):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        # writers run in threads; one transaction at a time on the shared connection
+        self._lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS filings ("
+            " accession TEXT PRIMARY KEY, cik INTEGER NOT NULL, form TEXT, filed TEXT, primary_doc TEXT)"
+        )
+        self.db.execute("CREATE TABLE IF NOT EXISTS quarters (year INTEGER, qtr INTEGER, loaded_at REAL, PRIMARY KEY (year, qtr))")
+
+    def get(self, accession: str) -> Optional[dict]:
+        row = self.db.execute(
+            "SELECT cik, form, filed, primary_doc FROM filings WHERE accession = ?", (accession,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"accession": accession, "cik": row[0], "form": row[1], "filed": row[2], "primary_doc": row[3]}
+
+    def put_many(self, rows: Iterable[Tuple[str, int, str, str, Optional[str]]]):
+        """Upsert (accession, cik, form, filed, primary_doc) rows.
+
+        Submissions rows are authoritative for the issuer and carry the primary
+        document, so they win over what the quarterly index recorded.
+        """
+        self._write(
+            "INSERT INTO filings (accession, cik, form, filed, primary_doc) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(accession) DO UPDATE SET "
+            " cik = CASE WHEN excluded.primary_doc IS NOT NULL THEN excluded.cik ELSE filings.cik END,"
+            " form = COALESCE(excluded.form, filings.form),"
+            " filed = COALESCE(excluded.filed, filings.filed),"
+            " primary_doc = COALESCE(excluded.primary_doc, filings.primary_doc)",
+            rows,
+        )
+
+    def has_quarter(self, year: int, qtr: int) -> bool:
+        """Whether the quarter's index is loaded and still complete enough to trust."""
+        row = self.db.execute("SELECT loaded_at FROM quarters WHERE year = ? AND qtr = ?", (year, qtr)).fetchone()
+        if row is None:
+            return False
+        settled = (quarter_end(year, qtr) + _SETTLE).timestamp()
+        return row[0] >= settled or time.time() - row[0] <= OPEN_QUARTER_TTL
+
+    def load_quarter(self, year: int, qtr: int, index_text: str):
+        # first listing wins: for multi-filer submissions that is the subject company
+        self._write(
+            "INSERT OR IGNORE INTO filings (accession, cik, form, filed, primary_doc) VALUES (?, ?, ?, ?, NULL)",
+            parse_master_index(index_text),
+            ("INSERT OR REPLACE INTO quarters VALUES (?, ?, ?)", (year, qtr, time.time())),
+        )
+
+    def _write(self, sql: str, rows, *extra):
+        # one transaction per batch; autocommit would fsync every row
+        with self._lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany(sql, rows)
+                for stmt, args in extra:
+                    self.db.execute(stmt, args)
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+
+ACCESSIONS = AccessionIndex()
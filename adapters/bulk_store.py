@@ -0,0 +1,157 @@
+import json, os, pathlib, re, sqlite3, zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BULK_PATH = os.environ.get("SEC_MCP_BULK_DB", ".cache/bulk.sqlite")
+# Answer submissions, ticker and companyfacts lookups from the bulk store
+# only; nothing is fetched from EDGAR. Load the store with ingestion/bulk.py.
+OFFLINE = os.environ.get("SEC_MCP_OFFLINE", "0") == "1"
+# Parsed submissions documents kept in memory, by member name.
+MAX_DOCS = 256
+
+# CIK0000320193.json, CIK0000320193-submissions-001.json
+CIK_MEMBER = re.compile(r"^CIK(\d{10})")
+
+
+class BulkStore:
+    """Local copy of EDGAR's nightly submissions.zip and companyfacts.zip.
+
+    One row per archive member, keyed by member name with its CRC and size,
+    so a reload only rewrites members that changed. Submissions bodies are
+    kept as compressed JSON; companyfacts as serialized FactTables, which
+    load without any JSON parsing, plus a concept -> CIK index.
+    """
+
+    def __init__(self, path=BULK_PATH):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS submissions ("
+            " name TEXT PRIMARY KEY, cik INTEGER NOT NULL, crc INTEGER, size INTEGER, body BLOB)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS submissions_cik ON submissions (cik)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            " name TEXT PRIMARY KEY, cik INTEGER NOT NULL UNIQUE, crc INTEGER, size INTEGER, body BLOB)"
+        )
+        self.db.execute("CREATE TABLE IF NOT EXISTS concepts (concept TEXT, cik INTEGER, PRIMARY KEY (concept, cik)) WITHOUT ROWID")
+        self.db.execute("CREATE TABLE IF NOT EXISTS companies (cik INTEGER, ticker TEXT, title TEXT, PRIMARY KEY (cik, ticker))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        self._docs: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tickers: tuple = (None, None)
+
+    def generation(self) -> int:
+        return self.meta("generation", 0)
+
+    def meta(self, key: str, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def members(self, archive: str) -> Dict[str, Tuple[int, int]]:
+        """Member name -> (crc, size) of what is loaded from `archive`."""
+        table = "facts" if archive == "companyfacts" else "submissions"
+        return {name: (crc, size) for name, crc, size in self.db.execute(f"SELECT name, crc, size FROM {table}")}
+
+    def submissions(self, name: str) -> Optional[dict]:
+        """Parsed submissions document by member name, e.g. CIK0000320193.json.
+
+        The same object is returned until the member is reloaded, like the
+        response cache does, so indexes built over it are reused.
+        """
+        row = self.db.execute("SELECT crc FROM submissions WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        hit = self._docs.get(name)
+        if hit is not None and hit[0] == row[0]:
+            self._docs.move_to_end(name)
+            return hit[1]
+        body = self.db.execute("SELECT body FROM submissions WHERE name = ?", (name,)).fetchone()[0]
+        doc = json.loads(zlib.decompress(body))
+        self._docs[name] = (row[0], doc)
+        while len(self._docs) > MAX_DOCS:
+            self._docs.popitem(last=False)
+        return doc
+
+    def facts_crc(self, cik: int) -> Optional[int]:
+        row = self.db.execute("SELECT crc FROM facts WHERE cik = ?", (cik,)).fetchone()
+        return row[0] if row else None
+
+    def facts_blob(self, cik: int) -> Optional[bytes]:
+        row = self.db.execute("SELECT body FROM facts WHERE cik = ?", (cik,)).fetchone()
+        return row[0] if row else None
+
+    def ciks_with(self, concept: str) -> List[int]:
+        """Filers whose companyfacts report the us-gaap concept in any period."""
+        return [r[0] for r in self.db.execute("SELECT cik FROM concepts WHERE concept = ?", (concept,))]
+
+    def tickers(self) -> dict:
+        """Listed issuers in the shape of company_tickers.json, rebuilt only after a reload."""
+        gen = self.generation()
+        if self._tickers[0] != gen:
+            rows = self.db.execute("SELECT cik, ticker, title FROM companies ORDER BY cik, ticker")
+            data = {str(i): {"cik_str": cik, "ticker": t, "title": title} for i, (cik, t, title) in enumerate(rows)}
+            self._tickers = (gen, data)
+        return self._tickers[1]
+
+    def put_submissions(self, rows: Iterable[tuple], companies: Iterable[tuple]):
+        """rows: (name, cik, crc, size, compressed body); companies: (cik, title, tickers)."""
+        companies = list(companies)
+        self._write(
+            ("INSERT OR REPLACE INTO submissions VALUES (?, ?, ?, ?, ?)", rows),
+            ("DELETE FROM companies WHERE cik = ?", [(c[0],) for c in companies]),
+            ("INSERT OR IGNORE INTO companies VALUES (?, ?, ?)", [(cik, t, title) for cik, title, ts in companies for t in ts]),
+        )
+
+    def put_facts(self, rows: Iterable[tuple]):
+        """rows: (name, cik, crc, size, serialized FactTable, concepts)."""
+        rows = list(rows)
+        self._write(
+            ("INSERT OR REPLACE INTO facts VALUES (?, ?, ?, ?, ?)", [r[:5] for r in rows]),
+            ("DELETE FROM concepts WHERE cik = ?", [(r[1],) for r in rows]),
+            ("INSERT OR IGNORE INTO concepts VALUES (?, ?)", [(c, r[1]) for r in rows for c in r[5]]),
+        )
+
+    def drop(self, archive: str, names: Iterable[str]):
+        names = [(n,) for n in names]
+        if not names:
+            return
+        if archive == "companyfacts":
+            self._write(
+                ("DELETE FROM concepts WHERE cik IN (SELECT cik FROM facts WHERE name = ?)", names),
+                ("DELETE FROM facts WHERE name = ?", names),
+            )
+        else:
+            ciks = [(int(m.group(1)),) for (n,) in names if (m := CIK_MEMBER.match(n)) and "-submissions-" not in n]
+            self._write(("DELETE FROM submissions WHERE name = ?", names), ("DELETE FROM companies WHERE cik = ?", ciks))
+
+    def counts(self) -> dict:
+        q = lambda sql: self.db.execute(sql).fetchone()[0]
+        return {
+            "submissions": q("SELECT COUNT(*) FROM submissions"),
+            "companies": q("SELECT COUNT(DISTINCT cik) FROM companies"),
+            "facts": q("SELECT COUNT(*) FROM facts"),
+            "generation": self.generation(),
+        }
+
+    def _write(self, *statements):
+        # one transaction per batch, and a new generation for readers' memos
+        self.db.execute("BEGIN")
+        try:
+            for sql, rows in statements:
+                self.db.executemany(sql, rows)
+            self.db.execute(
+                "INSERT INTO meta VALUES ('generation', 1) ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+
+BULK = BulkStore()
@@ -1,33 +1,279 @@
-import hashlib, json, time, os, pathlib
+import hashlib, json, time, os, pathlib, re, zlib
+from collections import OrderedDict
 
-class SimpleTTLCache:
-    def __init__(self, base_dir=".cache"):
+# Stats are bucketed by the prefix of the cache name, e.g. "subs_0000320193" -> "subs".
+FAMILIES = ("subs_", "facts_", "company_tickers")
+
+MEMORY_BYTES = int(os.environ.get("SEC_MCP_CACHE_MEMORY_MB", "256")) * 1024 * 1024
+DISK_BYTES = int(os.environ.get("SEC_MCP_CACHE_DISK_MB", "2048")) * 1024 * 1024
+# Hard upper bound on entry age regardless of the ttl callers ask for.
+MAX_AGE = int(os.environ.get("SEC_MCP_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+
+_SUFFIX = ".json.z"
+_LEGACY_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+def key_family(name: str) -> str:
+    for prefix in FAMILIES:
+        if name.startswith(prefix):
+            return prefix.rstrip("_")
+    return "other"
+
+
+class Entry:
+    __slots__ = ("ts", "data", "size", "family", "meta")
+
+    def __init__(self, ts: float, data, size: int, family: str, meta: dict | None = None):
+        self.ts = ts
+        self.data = data
+        self.size = size
+        self.family = family
+        self.meta = meta or {}
+
+
+class _MemoryTier:
+    """LRU of decoded objects bounded by the size of their serialized form."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items: "OrderedDict[str, Entry]" = OrderedDict()
+
+    def get(self, key: str):
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key: str, entry: Entry):
+        self.pop(key)
+        if entry.size > self.max_bytes:
+            return []
+        self._items[key] = entry
+        self.bytes += entry.size
+        evicted = []
+        while self.bytes > self.max_bytes:
+            _, old = self._items.popitem(last=False)
+            self.bytes -= old.size
+            evicted.append(old.family)
+        return evicted
+
+    def pop(self, key: str):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.bytes -= item.size
+        return item
+
+
+class TieredCache:
+    """In-process LRU of decoded JSON in front of a compressed on-disk tier.
+
+    A disk entry is one JSON header line (ts, size, validators) followed by the
+    zlib-compressed body, written atomically (tmp + rename), so refreshing an
+    entry's timestamp never recompresses the body. Both tiers are bounded in
+    bytes and evict least-recently-used entries first; entries older than
+    MAX_AGE are dropped whatever ttl the caller uses.
+
+    Several server processes may share base_dir: every disk write is a
+    rename, and reload() picks up entries another process fetched.
+    """
+
+    def __init__(
+        self,
+        base_dir=".cache",
+        memory_bytes: int = MEMORY_BYTES,
+        disk_bytes: int = DISK_BYTES,
+        max_age: int = MAX_AGE,
+        disk_only: tuple = (),
+    ):
         self.base_dir = pathlib.Path(base_dir)
+        # families whose callers keep their own decoded structure in memory
+        self.disk_only = set(disk_only)
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.memory = _MemoryTier(memory_bytes)
+        self.disk_bytes = disk_bytes
+        self.max_age = max_age
+        self.stats: dict = {}
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, LRU order
+        self._disk_used = 0
+        self._scan_disk()
 
     def _key(self, name: str, params: dict) -> str:
         m = hashlib.sha256()
         m.update(name.encode())
         m.update(json.dumps(params, sort_keys=True).encode())
-        return m.hexdigest()
+        # family prefix lets eviction stats be attributed without opening the file
+        return f"{key_family(name)}-{m.hexdigest()}"
 
-    def get(self, name: str, params: dict, ttl_seconds: int):
+    def _path(self, key: str) -> pathlib.Path:
+        return self.base_dir / (key + _SUFFIX)
+
+    def _count(self, family: str, stat: str, n: int = 1):
+        fam = self.stats.setdefault(
+            family, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale": 0, "memory_evictions": 0, "disk_evictions": 0}
+        )
+        fam[stat] += n
+
+    def _scan_disk(self):
+        entries = []
+        for fp in self.base_dir.iterdir():
+            if not fp.is_file():
+                continue
+            if _LEGACY_NAME.match(fp.name):
+                # uncompressed entries from the old single-tier cache
+                fp.unlink(missing_ok=True)
+                continue
+            if fp.name.endswith(_SUFFIX):
+                st = fp.stat()
+                entries.append((st.st_mtime, fp.name[: -len(_SUFFIX)], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_used += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk_used > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            self._path(key).unlink(missing_ok=True)
+            self._count(key.split("-", 1)[0], "disk_evictions")
+
+    def _read_disk(self, key: str):
+        fp = self._path(key)
+        try:
+            blob = fp.read_bytes()
+            nl = blob.index(b"\n")
+            header = json.loads(blob[:nl])
+            data = json.loads(zlib.decompress(blob[nl + 1 :]))
+        except FileNotFoundError:
+            self._drop_disk(key)
+            return None
+        except Exception:
+            self._drop_disk(key, unlink=True)
+            return None
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            try:
+                os.utime(fp)
+            except OSError:
+                pass
+        else:
+            # written by another process sharing this directory; count it against the budget
+            self._disk[key] = len(blob)
+            self._disk_used += len(blob)
+        return Entry(header["ts"], data, header.get("size", 0), key.split("-", 1)[0], header.get("meta"))
+
+    def _write_disk(self, key: str, entry: Entry, body: bytes):
+        header = json.dumps({"ts": entry.ts, "size": entry.size, "meta": entry.meta}, separators=(",", ":")).encode()
+        fp = self._path(key)
+        tmp = fp.with_name(f".{fp.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(header + b"\n" + body)
+        os.replace(tmp, fp)
+        self._drop_disk(key)
+        self._disk[key] = len(header) + 1 + len(body)
+        self._disk_used += self._disk[key]
+        self._evict_disk()
+
+    def _drop_disk(self, key: str, unlink: bool = False):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_used -= size
+        if unlink:
+            self._path(key).unlink(missing_ok=True)
+
+    def _remember(self, key: str, entry: Entry):
+        if entry.family in self.disk_only:
+            return
+        for fam in self.memory.put(key, entry):
+            self._count(fam, "memory_evictions")
+
+    def lookup(self, name: str, params: dict) -> Entry | None:
+        """Return the cached entry whatever its age (up to MAX_AGE), or None."""
         key = self._key(name, params)
-        fp = self.base_dir / key
-        if not fp.exists():
+        family = key_family(name)
+        now = time.time()
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            if now - entry.ts <= self.max_age:
+                self._count(family, "memory_hits")
+                return entry
+            self.memory.pop(key)
+            self._count(family, "memory_evictions")
+
+        entry = self._read_disk(key)
+        if entry is None:
+            self._count(family, "misses")
+            return None
+        if now - entry.ts > self.max_age:
+            self._drop_disk(key, unlink=True)
+            self._count(family, "disk_evictions")
+            self._count(family, "misses")
             return None
+        self._remember(key, entry)
+        self._count(family, "disk_hits")
+        return entry
+
+    def stamp(self, name: str, params: dict) -> float | None:
+        """Timestamp of the cached entry without decoding its body."""
+        key = self._key(name, params)
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry.ts
         try:
-            raw = json.loads(fp.read_text())
-            if time.time() - raw["ts"] > ttl_seconds:
-                return None
-            return raw["data"]
-        except Exception:
+            with open(self._path(key), "rb") as fh:
+                return json.loads(fh.readline())["ts"]
+        except (OSError, ValueError, KeyError):
             return None
 
-    def set(self, name: str, params: dict, data):
+    def reload(self, name: str, params: dict, newer_than: float) -> Entry | None:
+        """The disk entry if another process stored one newer than `newer_than`."""
         key = self._key(name, params)
-        fp = self.base_dir / key
-        fp.write_text(json.dumps({"ts": time.time(), "data": data}))
-        return True
+        try:
+            with open(self._path(key), "rb") as fh:
+                if json.loads(fh.readline())["ts"] <= newer_than:
+                    return None
+        except (OSError, ValueError, KeyError):
+            return None
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def get(self, name: str, params: dict, ttl_seconds: int):
+        entry = self.lookup(name, params)
+        if entry is None:
+            return None
+        if time.time() - entry.ts > ttl_seconds:
+            self._count(entry.family, "stale")
+            return None
+        return entry.data
 
+    def set(self, name: str, params: dict, data, meta: dict | None = None):
+        key = self._key(name, params)
+        body = json.dumps(data, separators=(",", ":")).encode()
+        entry = Entry(time.time(), data, len(body), key_family(name), meta)
+        self._write_disk(key, entry, zlib.compress(body, 6))
+        self._remember(key, entry)
+        return True
 
+    def touch(self, name: str, params: dict, meta: dict | None = None) -> bool:
+        """Mark an entry fresh again (e.g. after a 304) without rewriting its body."""
+        key = self._key(name, params)
+        fp = self._path(key)
+        try:
+            blob = fp.read_bytes()
+            body = blob[blob.index(b"\n") + 1 :]
+        except (OSError, ValueError):
+            return False
+        entry = self.memory.get(key)
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is None:
+                return False
+        entry.ts = time.time()
+        if meta:
+            entry.meta = meta
+        self._write_disk(key, entry, body)
+        self._remember(key, entry)
+        return True
@@ -0,0 +1,392 @@
+import codecs, hashlib, json, mmap, os, pathlib, time, zlib
+from array import array
+from collections import OrderedDict
+
+DOCSTORE_BYTES = int(os.environ.get("SEC_MCP_DOCSTORE_MB", "4096")) * 1024 * 1024
+# Extracted text is stored as plain UTF-8 with the byte offset of every
+# TEXT_CHECKPOINT-th character, so a character range maps to a byte range.
+TEXT_CHECKPOINT = 4096
+# Blobs written (or rewritten) this recently survive garbage collection even
+# when no record points at them yet: a worker stores them before the record
+# that references them is saved.
+GC_GRACE = 15 * 60
+
+
+def text_checkpoints(text: str) -> array:
+    marks = array("q", [0])
+    for i in range(0, len(text), TEXT_CHECKPOINT):
+        marks.append(marks[-1] + len(text[i : i + TEXT_CHECKPOINT].encode("utf-8")))
+    return marks
+
+
+class BlobWriter:
+    """Compress and hash a blob incrementally, e.g. while it is being downloaded."""
+
+    def __init__(self, objects: "ObjectStore"):
+        self._objects = objects
+        self._tmp = objects.root / f".{os.getpid()}.{id(self)}.tmp"
+        self._fh = open(self._tmp, "wb")
+        self._z = zlib.compressobj(6)
+        self._h = hashlib.sha256()
+
+    def write(self, data: bytes):
+        self._h.update(data)
+        self._fh.write(self._z.compress(data))
+
+    def finish(self) -> tuple:
+        self._fh.write(self._z.flush())
+        self._fh.close()
+        sha = self._h.hexdigest()
+        fp = self._objects.path(sha)
+        if fp.exists():
+            self._tmp.unlink(missing_ok=True)
+            _touch(fp)
+        else:
+            fp.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._tmp, fp)
+        return sha, fp.stat().st_size
+
+    def abort(self):
+        self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+def _referenced(rec: dict) -> set:
+    shas = {rec[f] for f in ("raw", "text", "text_index", "spans") if rec.get(f)}
+    shas.update(s["sha"] for s in rec.get("sentences", {}).values())
+    return shas
+
+
+def _touch(fp: pathlib.Path):
+    try:
+        os.utime(fp)
+    except OSError:
+        pass
+
+
+class ObjectStore:
+    """The content-addressed half of the DocStore: sha256 -> zlib blob.
+
+    Holds no accounting state, so worker processes can read and write blobs
+    directly and hand back only their addresses.
+    """
+
+    def __init__(self, root):
+        self.root = pathlib.Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, sha: str) -> pathlib.Path:
+        return self.root / sha[:2] / f"{sha}.z"
+
+    def plain_path(self, sha: str) -> pathlib.Path:
+        return self.root / sha[:2] / f"{sha}.u"
+
+    def _store(self, fp: pathlib.Path, blob: bytes) -> int:
+        if fp.exists():
+            # a fresh write of an existing blob restarts its grace period
+            _touch(fp)
+            return fp.stat().st_size
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        tmp = fp.with_name(f".{fp.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(blob)
+        os.replace(tmp, fp)
+        return len(blob)
+
+    def put(self, data: bytes) -> tuple:
+        sha = hashlib.sha256(data).hexdigest()
+        fp = self.path(sha)
+        if fp.exists():
+            _touch(fp)
+            return sha, fp.stat().st_size
+        return sha, self._store(fp, zlib.compress(data, 6))
+
+    def put_plain(self, data: bytes) -> tuple:
+        """Store uncompressed, so ranges can be read through mmap without decoding the rest."""
+        sha = hashlib.sha256(data).hexdigest()
+        return sha, self._store(self.plain_path(sha), data)
+
+    def read_range(self, sha: str, start: int, end: int) -> bytes:
+        with open(self.plain_path(sha), "rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size == 0:
+                return b""
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[max(0, start) : min(size, end)]
+
+    def get(self, sha: str) -> bytes | None:
+        try:
+            return zlib.decompress(self.path(sha).read_bytes())
+        except (OSError, zlib.error):
+            return None
+
+    def iter_text(self, sha: str, chunk_size: int = 1 << 20):
+        """Decode a UTF-8 blob in chunks without holding all of it."""
+        z = zlib.decompressobj()
+        dec = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with open(self.path(sha), "rb") as fh:
+            while True:
+                block = fh.read(chunk_size)
+                if not block:
+                    break
+                out = dec.decode(z.decompress(block))
+                if out:
+                    yield out
+        tail = dec.decode(z.flush(), final=True)
+        if tail:
+            yield tail
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+
+class DocStore:
+    """Content-addressed, compressed store for primary filing documents.
+
+    Filings are immutable once accepted, so everything derived from one is kept
+    per accession: the raw document, its extracted text, the html -> text
+    offset spans, section offsets and per-section sentence fingerprints.
+    Blobs live under objects/ keyed by sha256 of their content; a small JSON
+    record per accession under acc/ points at them. When the store exceeds its
+    byte budget the least recently used accessions are evicted, and blobs no
+    record references any more are deleted. Sizes, recency and blob reference
+    counts are kept in memory; the directories are only scanned at startup.
+    """
+
+    def __init__(self, base_dir=".cache/docs", max_bytes: int = DOCSTORE_BYTES):
+        self.base_dir = pathlib.Path(base_dir)
+        self.objects = ObjectStore(self.base_dir / "objects")
+        self.records = self.base_dir / "acc"
+        self.records.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._sizes: dict = {}  # accession -> bytes of objects it references
+        self._lru: "OrderedDict[str, None]" = OrderedDict()  # accessions, least recently used first
+        self._blobs: dict = {}  # accession -> shas its record references
+        self._refs: dict = {}  # sha -> number of records referencing it
+        self._used = 0
+        self._scan()
+
+    def _record_path(self, accession: str) -> pathlib.Path:
+        return self.records / f"{accession}.json"
+
+    def _scan(self):
+        found = []
+        for fp in self.records.glob("*.json"):
+            try:
+                rec = json.loads(fp.read_text())
+            except Exception:
+                fp.unlink(missing_ok=True)
+                continue
+            found.append((fp.stat().st_mtime, fp.stem, rec))
+        for _, acc, rec in sorted(found, key=lambda f: f[:2]):
+            self._track(acc, rec)
+        self._collect_garbage()
+
+    def _track(self, accession: str, rec: dict) -> list:
+        """Account for the record as saved; returns the blobs nothing references any more."""
+        size = sum(rec.get("sizes", {}).values())
+        self._used += size - self._sizes.get(accession, 0)
+        self._sizes[accession] = size
+        self._lru[accession] = None
+        self._lru.move_to_end(accession)
+        old, new = self._blobs.get(accession, set()), _referenced(rec)
+        self._blobs[accession] = new
+        for sha in new - old:
+            self._refs[sha] = self._refs.get(sha, 0) + 1
+        return self._release(old - new)
+
+    def _untrack(self, accession: str) -> list:
+        self._used -= self._sizes.pop(accession, 0)
+        self._lru.pop(accession, None)
+        return self._release(self._blobs.pop(accession, set()))
+
+    def _release(self, shas) -> list:
+        dead = []
+        for sha in shas:
+            n = self._refs.get(sha, 0) - 1
+            if n > 0:
+                self._refs[sha] = n
+            else:
+                self._refs.pop(sha, None)
+                dead.append(sha)
+        return dead
+
+    def _write_atomic(self, fp: pathlib.Path, data: bytes):
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        tmp = fp.with_name(f".{fp.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, fp)
+
+    def get(self, accession: str) -> dict | None:
+        fp = self._record_path(accession)
+        try:
+            rec = json.loads(fp.read_text())
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        # picks up records written or rewritten by another process sharing this store
+        self._drop_blobs(self._track(accession, rec))
+        try:
+            os.utime(fp)
+        except OSError:
+            pass
+        return rec
+
+    def _save(self, accession: str, rec: dict):
+        self._write_atomic(self._record_path(accession), json.dumps(rec, separators=(",", ":")).encode())
+        self._drop_blobs(self._track(accession, rec))
+        self._evict(keep=accession)
+
+    def writer(self) -> BlobWriter:
+        return self.objects.writer()
+
+    def attach(self, accession: str, field: str, sha: str, size: int, meta: dict | None = None) -> dict:
+        rec = self.get(accession) or {"accession": accession, "sizes": {}}
+        if meta is not None:
+            rec["meta"] = meta
+        rec[field] = sha
+        rec["sizes"][field] = size
+        self._save(accession, rec)
+        return rec
+
+    def attach_text(
+        self,
+        accession: str,
+        text: tuple,
+        checkpoints: tuple,
+        chars: int,
+        meta: dict | None = None,
+        spans: tuple | None = None,
+        sections: tuple | None = None,
+    ) -> dict:
+        """Point the record at its text blobs, plus spans and (offsets, version) sections if given.
+
+        One save for all of them, so an eviction it triggers never collects
+        one blob of a conversion while the record names only the others.
+        """
+        rec = self.get(accession) or {"accession": accession, "sizes": {}}
+        if meta is not None:
+            rec["meta"] = meta
+        rec["text"], rec["sizes"]["text"] = text
+        rec["text_index"], rec["sizes"]["text_index"] = checkpoints
+        rec["text_format"] = "plain"
+        rec["text_chars"] = chars
+        if spans is not None:
+            rec["spans"], rec["sizes"]["spans"] = spans
+        if sections is not None:
+            rec["sections"] = {"version": sections[1], "offsets": sections[0]}
+        self._save(accession, rec)
+        return rec
+
+    def put_sections(self, accession: str, sections: dict, version: int) -> dict:
+        rec = self.get(accession) or {"accession": accession, "sizes": {}}
+        rec["sections"] = {"version": version, "offsets": sections}
+        self._save(accession, rec)
+        return rec
+
+    def put_sentences(self, accession: str, section: str, data: dict, version: int) -> dict:
+        sha, size = self.objects.put(json.dumps(data, separators=(",", ":")).encode())
+        rec = self.get(accession) or {"accession": accession, "sizes": {}}
+        rec.setdefault("sentences", {})[section] = {"version": version, "sha": sha}
+        rec["sizes"][f"sentences:{section}"] = size
+        self._save(accession, rec)
+        return rec
+
+    def load_raw(self, rec: dict) -> str | None:
+        data = self.objects.get(rec["raw"]) if rec.get("raw") else None
+        return data.decode("utf-8") if data is not None else None
+
+    def _plain(self, rec: dict) -> bool:
+        return rec.get("text_format") == "plain"
+
+    def has_text(self, rec: dict) -> bool:
+        # text stored compressed by older versions is regenerated rather than sliced
+        return bool(rec.get("text")) and self._plain(rec) and self.objects.plain_path(rec["text"]).exists()
+
+    def load_text(self, rec: dict) -> str | None:
+        if not rec.get("text"):
+            return None
+        if self._plain(rec):
+            try:
+                return self.objects.plain_path(rec["text"]).read_bytes().decode("utf-8")
+            except OSError:
+                return None
+        data = self.objects.get(rec["text"])
+        return data.decode("utf-8") if data is not None else None
+
+    def text_length(self, rec: dict) -> int:
+        if self._plain(rec):
+            return rec["text_chars"]
+        return len(self.load_text(rec) or "")
+
+    def read_text(self, rec: dict, start: int, end: int) -> str:
+        """Characters [start, end) of the stored text, touching only the bytes around them."""
+        if not self._plain(rec):
+            return (self.load_text(rec) or "")[start:end]
+        marks = array("q")
+        marks.frombytes(self.objects.get(rec["text_index"]) or b"")
+        start, end = max(0, start), min(end, rec["text_chars"])
+        if end <= start or not marks:
+            return ""
+        a = min(start // TEXT_CHECKPOINT, len(marks) - 1)
+        b = min(-(-end // TEXT_CHECKPOINT), len(marks) - 1)
+        chunk = self.objects.read_range(rec["text"], marks[a], marks[b]).decode("utf-8")
+        base = a * TEXT_CHECKPOINT
+        return chunk[start - base : end - base]
+
+    def load_spans(self, rec: dict) -> array | None:
+        data = self.objects.get(rec["spans"]) if rec.get("spans") else None
+        if data is None:
+            return None
+        spans = array("q")
+        spans.frombytes(data)
+        return spans
+
+    def load_sections(self, rec: dict, version: int) -> dict | None:
+        s = rec.get("sections")
+        if not s or s.get("version") != version:
+            return None
+        return s["offsets"]
+
+    def load_sentences(self, rec: dict, section: str, version: int) -> dict | None:
+        s = rec.get("sentences", {}).get(section)
+        if not s or s.get("version") != version:
+            return None
+        data = self.objects.get(s["sha"])
+        return json.loads(data) if data is not None else None
+
+    def _evict(self, keep: str | None = None):
+        dead = []
+        for acc in list(self._lru):
+            if self._used <= self.max_bytes:
+                break
+            if acc == keep:
+                continue
+            self._record_path(acc).unlink(missing_ok=True)
+            dead += self._untrack(acc)
+            self.stats["evictions"] += 1
+        self._drop_blobs(dead)
+
+    def _drop_blobs(self, shas):
+        fresh = time.time() - GC_GRACE
+        for sha in shas:
+            for fp in (self.objects.path(sha), self.objects.plain_path(sha)):
+                try:
+                    if fp.stat().st_mtime < fresh:
+                        fp.unlink()
+                except OSError:
+                    pass
+
+    def _collect_garbage(self):
+        # startup only: blobs left behind by conversions whose record was never saved,
+        # or by evictions that ran inside their grace period
+        fresh = time.time() - GC_GRACE
+        for fp in self.objects.root.glob("*/*.[zu]"):
+            if fp.stem in self._refs:
+                continue
+            try:
+                if fp.stat().st_mtime < fresh:
+                    fp.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,263 @@
+import contextvars, functools, logging, os, pathlib, random, sys, threading, time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+log = logging.getLogger("sec_mcp")
+
+# Histogram bucket upper bounds, seconds.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Tool calls slower than this are logged with their per-stage breakdown. 0 disables.
+SLOW_MS = float(os.environ.get("SEC_MCP_SLOW_MS", "5000"))
+# Sampling profiler: off unless enabled. A call is profiled when it passes
+# "_profile": true, or at random with probability PROFILE_RATE; samples are
+# kept (as folded stacks, for flamegraph.pl / speedscope) only for calls that
+# asked for it or ran longer than PROFILE_SLOW_MS.
+PROFILE = os.environ.get("SEC_MCP_PROFILE", "0") == "1"
+PROFILE_RATE = float(os.environ.get("SEC_MCP_PROFILE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("SEC_MCP_PROFILE_SLOW_MS", "2000"))
+PROFILE_INTERVAL = float(os.environ.get("SEC_MCP_PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = pathlib.Path(os.environ.get("SEC_MCP_PROFILE_DIR", ".cache/profiles"))
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, n: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + n
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for lv, v in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.labels, lv)} {v:g}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self.series: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *labels):
+        s = self.series.get(labels)
+        if s is None:
+            s = self.series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                s[i] += 1
+                break
+        s[-2] += value
+        s[-1] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for lv, s in sorted(self.series.items()):
+            cum = 0
+            for bound, n in zip(self.buckets, s):
+                cum += n
+                yield "%s_bucket%s %d" % (self.name, _labels(self.labels, lv, 'le="%g"' % bound), cum)
+            yield "%s_bucket%s %d" % (self.name, _labels(self.labels, lv, 'le="+Inf"'), s[-1])
+            yield f"{self.name}_sum{_labels(self.labels, lv)} {s[-2]:.6f}"
+            yield f"{self.name}_count{_labels(self.labels, lv)} {s[-1]}"
+
+
+class _Collected:
+    """Metric read from a callable at scrape time, e.g. stats dicts kept elsewhere."""
+
+    def __init__(self, name: str, kind: str, help: str, labels: Tuple[str, ...], fn: Callable[[], Iterable[tuple]]):
+        self.name, self.kind, self.help, self.labels, self.fn = name, kind, help, labels, fn
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for *lv, v in self.fn():
+            yield f"{self.name}{_labels(self.labels, tuple(lv))} {v:g}"
+
+
+class Registry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Updates happen on the event loop thread, so there is no locking; each
+    server process exposes its own series.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, labels, buckets))
+
+    def collect(self, name: str, kind: str, help: str, labels: Tuple[str, ...], fn: Callable[[], Iterable[tuple]]):
+        """Register fn() -> [(label values..., value)], evaluated on every scrape."""
+        self._metrics[name] = _Collected(name, kind, help, labels, fn)
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics.values():
+            try:
+                lines.extend(m.render())
+            except Exception:
+                log.exception("rendering metric %s failed", m.name)
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TOOL_SECONDS = METRICS.histogram("sec_mcp_tool_seconds", "Tool call latency", ("tool", "outcome"))
+TOOL_ERRORS = METRICS.counter("sec_mcp_tool_errors_total", "Tool calls that returned an error", ("tool", "error_code", "exception"))
+STAGE_SECONDS = METRICS.histogram("sec_mcp_stage_seconds", "Time spent per stage of request handling", ("stage",))
+UPSTREAM_REQUESTS = METRICS.counter(
+    "sec_mcp_upstream_requests_total", "Upstream HTTP attempts", ("host", "family", "status")
+)
+UPSTREAM_BYTES = METRICS.counter("sec_mcp_upstream_bytes_total", "Upstream response bytes received", ("host", "family"))
+UPSTREAM_SECONDS = METRICS.histogram("sec_mcp_upstream_seconds", "Upstream response time", ("host", "family"))
+PROFILES = METRICS.counter("sec_mcp_profiles_total", "Sampling profiles captured, by outcome", ("outcome",))
+
+
+class Call:
+    __slots__ = ("tool", "stages", "error")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.stages: Dict[str, float] = {}
+        self.error: str | None = None
+
+
+_CALL: contextvars.ContextVar = contextvars.ContextVar("sec_mcp_call", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into sec_mcp_stage_seconds and the current call's breakdown."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, name)
+        call = _CALL.get()
+        if call is not None:
+            call.stages[name] = call.stages.get(name, 0.0) + dt
+
+
+def record_error(e: BaseException, error_code: str, fails_call: bool = True):
+    """Note the exception behind an ErrorPayload, so it is counted and logged, not just returned.
+
+    Batch tools pass fails_call=False for per-item errors: the call itself succeeded.
+    """
+    call = _CALL.get()
+    tool = call.tool if call is not None else "unknown"
+    if call is not None and fails_call:
+        call.error = error_code
+    TOOL_ERRORS.inc(tool, error_code, type(e).__name__)
+    log.warning("%s failed with %s: %r", tool, error_code, e, exc_info=e)
+
+
+class SamplingProfiler:
+    """Sample one thread's stack every `interval` seconds from a side thread.
+
+    Samples are aggregated as folded stacks ("root;...;leaf count"). The event
+    loop thread runs every in-flight request, so a profile also shows whatever
+    else was running during the call.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: _Tally = _Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sec-mcp-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+
+_PROFILING = [0]  # profilers running; at most one at a time to bound overhead
+
+
+def _start_profiler(requested: bool) -> SamplingProfiler | None:
+    if not PROFILE or _PROFILING[0]:
+        return None
+    if not requested and (PROFILE_RATE <= 0 or random.random() >= PROFILE_RATE):
+        return None
+    _PROFILING[0] += 1
+    return SamplingProfiler(threading.get_ident()).start()
+
+
+def _finish_profiler(prof: SamplingProfiler, call: Call, requested: bool, elapsed: float):
+    _PROFILING[0] -= 1
+    folded = prof.stop()
+    if not requested and elapsed * 1000 < PROFILE_SLOW_MS:
+        PROFILES.inc("discarded")
+        return
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    fp = PROFILE_DIR / f"{time.strftime('%Y%m%dT%H%M%S')}-{call.tool}-{os.getpid()}.folded"
+    fp.write_text(folded)
+    PROFILES.inc("saved")
+    log.warning("profile of %s (%.0f ms) written to %s", call.tool, elapsed * 1000, fp)
+
+
+def instrumented(tool: str):
+    """Wrap an MCP tool handler: latency and outcome metrics, slow-call log, optional profiling."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def handler(req):
+            call = Call(tool)
+            token = _CALL.set(call)
+            requested = bool((getattr(req, "arguments", None) or {}).get("_profile"))
+            prof = _start_profiler(requested)
+            t0 = time.perf_counter()
+            try:
+                return await fn(req)
+            except BaseException:
+                call.error = call.error or "EXCEPTION"
+                raise
+            finally:
+                elapsed = time.perf_counter() - t0
+                _CALL.reset(token)
+                TOOL_SECONDS.observe(elapsed, tool, call.error or "ok")
+                if prof is not None:
+                    _finish_profiler(prof, call, requested, elapsed)
+                if SLOW_MS and elapsed * 1000 >= SLOW_MS:
+                    breakdown = " ".join(f"{k}={v * 1000:.0f}ms" for k, v in sorted(call.stages.items(), key=lambda kv: -kv[1]))
+                    log.warning("slow %s: %.0f ms (%s)", tool, elapsed * 1000, breakdown or "no stages recorded")
+
+        return handler
+
+    return wrap
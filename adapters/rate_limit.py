@@ -1,7 +1,214 @@
-from aiolimiter import AsyncLimiter
+import asyncio, contextvars, mmap, os, pathlib, struct, time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
 
-# SEC guidance is 10 requests per second per IP. Stay under it.
-GLOBAL_LIMITER = AsyncLimiter(max_rate=8, time_period=1.0)
-HOST_LIMITERS = {}
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, each process keeps its own bucket
+    fcntl = None
 
+# SEC guidance is 10 requests per second per client, across all of its hosts.
+MAX_RPS = float(os.environ.get("SEC_MCP_MAX_RPS", "9"))
+MIN_RPS = 0.5
+# Bucket state shared by every server process on the host, so N workers stay
+# under one budget and a 429 seen by one slows them all. Empty disables.
+SHARED_BUCKET = os.environ.get("SEC_MCP_SHARED_BUCKET", ".cache/ratelimit.bin")
+# Interactive calls fail fast with a retry hint rather than queueing longer than this.
+MAX_WAIT = float(os.environ.get("SEC_MCP_MAX_WAIT_MS", "15000")) / 1000
 
+# Lanes, highest priority first.
+INTERACTIVE, PREFETCH, BACKGROUND = 0, 1, 2
+_LANE = contextvars.ContextVar("sec_mcp_lane", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(lane: int):
+    """Run upstream requests made in this block (and tasks started in it) in `lane`."""
+    token = _LANE.set(lane)
+    try:
+        yield
+    finally:
+        _LANE.reset(token)
+
+
+def current_lane() -> int:
+    return _LANE.get()
+
+
+class UpstreamThrottled(RuntimeError):
+    """EDGAR is throttling us, or the predicted wait exceeds what a caller accepts."""
+
+    def __init__(self, retry_after_ms: int, hint: str = "upstream rate limit"):
+        super().__init__(f"{hint}; retry in {retry_after_ms} ms")
+        self.retry_after_ms = retry_after_ms
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _LocalBucket:
+    def __init__(self, rate: float):
+        self.tokens, self.last, self.rate, self.blocked_until = 1.0, time.time(), rate, 0.0
+
+    @contextmanager
+    def locked(self):
+        yield self
+
+
+class _SharedBucket:
+    """Bucket state in a small mmap'd file, read and written under flock."""
+
+    _FMT = struct.Struct("<5d")  # tokens, last refill, rate, blocked until, configured max rate
+
+    def __init__(self, path: str, rate: float):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._initial = rate
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < self._FMT.size:
+                os.ftruncate(self._fd, self._FMT.size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(self._fd, self._FMT.size)
+
+    @contextmanager
+    def locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            self.tokens, self.last, self.rate, self.blocked_until, configured = self._FMT.unpack_from(self._mm)
+            if self.rate <= 0 or configured != self._initial:
+                # fresh file, or SEC_MCP_MAX_RPS changed since the bucket was written
+                self.tokens, self.last, self.rate, self.blocked_until = 1.0, time.time(), self._initial, 0.0
+            yield self
+            self._FMT.pack_into(self._mm, 0, self.tokens, self.last, self.rate, self.blocked_until, self._initial)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class Scheduler:
+    """One token bucket for every upstream request, drained in priority order.
+
+    The rate is adaptive (AIMD): halved on 429/503, nudged back up on each
+    success, and a Retry-After blocks the bucket until it expires. Waiting
+    requests are granted tokens lane by lane, so tool calls overtake prefetch
+    and ingestion traffic queued behind them.
+    """
+
+    def __init__(
+        self, max_rate: float = MAX_RPS, min_rate: float = MIN_RPS, max_wait: float = MAX_WAIT, shared: str | None = None
+    ):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.max_wait = max_wait
+        self.bucket = _SharedBucket(shared, max_rate) if shared and fcntl is not None else _LocalBucket(max_rate)
+        self._lanes = [deque() for _ in range(BACKGROUND + 1)]
+        self._timer: asyncio.TimerHandle | None = None
+        self.stats = {"granted": 0, "queued": 0, "rejected": 0, "throttled": 0}
+
+    @property
+    def rate(self) -> float:
+        with self.bucket.locked() as b:
+            return b.rate
+
+    @staticmethod
+    def _refill(b, now: float):
+        # burst of one second's worth at most
+        b.tokens = min(max(1.0, b.rate), b.tokens + max(0.0, now - b.last) * b.rate)
+        b.last = now
+
+    def _take(self) -> bool:
+        now = time.time()
+        with self.bucket.locked() as b:
+            self._refill(b, now)
+            if now < b.blocked_until or b.tokens < 1:
+                return False
+            b.tokens -= 1
+        self.stats["granted"] += 1
+        return True
+
+    def predicted_wait(self, lane: int | None = None) -> float:
+        """Seconds until a request entering `lane` now would be sent."""
+        lane = current_lane() if lane is None else lane
+        now = time.time()
+        ahead = sum(len(q) for q in self._lanes[: lane + 1])
+        with self.bucket.locked() as b:
+            self._refill(b, now)
+            return max(0.0, (ahead + 1 - b.tokens) / b.rate) + max(0.0, b.blocked_until - now)
+
+    async def acquire(self, lane: int | None = None):
+        lane = current_lane() if lane is None else lane
+        if not any(self._lanes) and self._take():
+            return
+        wait = self.predicted_wait(lane)
+        if lane == INTERACTIVE and wait > self.max_wait:
+            self.stats["rejected"] += 1
+            raise UpstreamThrottled(int(wait * 1000))
+        fut = asyncio.get_running_loop().create_future()
+        self._lanes[lane].append(fut)
+        self.stats["queued"] += 1
+        self._schedule()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                with self.bucket.locked() as b:
+                    b.tokens += 1  # granted just as we were cancelled; hand it back
+            elif fut in self._lanes[lane]:
+                self._lanes[lane].remove(fut)  # _dispatch may have pruned it already
+            raise
+
+    def _schedule(self):
+        if self._timer is not None or not any(self._lanes):
+            return
+        now = time.time()
+        with self.bucket.locked() as b:
+            self._refill(b, now)
+            delay = max(b.blocked_until - now, (1 - b.tokens) / b.rate, 0.0)
+        # another process may take that token first; _dispatch then just reschedules
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self):
+        self._timer = None
+        for q in self._lanes:
+            while q and q[0].done():
+                q.popleft()  # cancelled waiters
+        while any(self._lanes) and self._take():
+            q = next(q for q in self._lanes if q)
+            q.popleft().set_result(None)
+            for q in self._lanes:
+                while q and q[0].done():
+                    q.popleft()
+        self._schedule()
+
+    def feedback(self, status: int | None, retry_after: str | None = None) -> float | None:
+        """Adjust the rate from a response; returns the Retry-After delay, if any."""
+        if status in (429, 503):
+            self.stats["throttled"] += 1
+            with self.bucket.locked() as b:
+                b.rate = max(self.min_rate, b.rate / 2)
+                delay = parse_retry_after(retry_after)
+                # EDGAR rarely sends Retry-After; without one back off for a couple of token intervals
+                delay = delay if delay is not None else 2 / b.rate
+                b.blocked_until = max(b.blocked_until, time.time() + delay)
+                b.tokens = min(b.tokens, 0.0)
+            return delay
+        if status is not None and status < 400:
+            with self.bucket.locked() as b:
+                b.rate = min(self.max_rate, b.rate + 0.1)
+        return None
+
+
+SCHEDULER = Scheduler(shared=SHARED_BUCKET)
@@ -1,33 +1,250 @@
-import httpx, asyncio
-from tenacity import retry, stop_after_attempt, wait_exponential
-from urllib.parse import urlparse
-from .rate_limit import GLOBAL_LIMITER, HOST_LIMITERS
-from .cache import SimpleTTLCache
-
-CACHE = SimpleTTLCache()
-
-def host_limiter(url: str):
-    host = urlparse(url).netloc
-    lim = HOST_LIMITERS.get(host)
-    if not lim:
-        from aiolimiter import AsyncLimiter
-        lim = AsyncLimiter(2, 1.0)
-        HOST_LIMITERS[host] = lim
-    return lim
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=0.3, max=2))
-async def fetch_json(url: str, cache_key: str, cache_ttl: int):
-    cached = CACHE.get(cache_key, {"url": url}, cache_ttl)
-    if cached is not None:
-        return cached
-
-    async with GLOBAL_LIMITER:
-        async with host_limiter(url):
-            async with httpx.AsyncClient(timeout=15.0, http2=True) as client:
-                resp = await client.get(url, headers={"User-Agent": "sec-mcp/0.1 contact@example.com"})
-                resp.raise_for_status()
-                data = resp.json()
-                CACHE.set(cache_key, {"url": url}, data)
-                return data
+import httpx, asyncio, os, time
+from .metrics import METRICS, UPSTREAM_BYTES, UPSTREAM_REQUESTS, UPSTREAM_SECONDS, stage
+from .rate_limit import PREFETCH, SCHEDULER, UpstreamThrottled, priority
+from .cache import TieredCache
+from .singleflight import SingleFlight, host_lock
+
+# companyfacts is only read to build tools.financials.FactTable, which is far
+# smaller than the decoded JSON, so keep those bodies out of the memory tier.
+CACHE = TieredCache(disk_only=("facts",))
+# Concurrent cache misses for the same URL share one upstream request, within
+# a process (INFLIGHT) and across processes on the host (host_lock).
+INFLIGHT = SingleFlight()
+
+USER_AGENT = os.environ.get("SEC_MCP_USER_AGENT", "sec-mcp/0.1 contact@example.com")
+# Base URL standing in for both EDGAR hosts, e.g. the benchmark stand-in
+# (bench/standin.py). Their paths do not overlap, so one server can answer both.
+UPSTREAM = os.environ.get("SEC_MCP_UPSTREAM", "").rstrip("/")
+_EDGAR_HOSTS = ("https://www.sec.gov", "https://data.sec.gov")
+
+# One pooled client per process. EDGAR serves everything from two hosts, so a
+# small pool with long keep-alive is enough to avoid a TLS handshake per call.
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.environ.get("SEC_MCP_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.environ.get("SEC_MCP_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.environ.get("SEC_MCP_KEEPALIVE_EXPIRY", "60")),
+)
+TIMEOUT = httpx.Timeout(15.0, read=30.0)
+DOC_TIMEOUT = httpx.Timeout(20.0, read=60.0)
+
+# When set, an expired cache entry is returned immediately and refreshed in the
+# background instead of making the caller wait on the revalidation.
+STALE_WHILE_REVALIDATE = os.environ.get("SEC_MCP_STALE_WHILE_REVALIDATE", "0") == "1"
+_BACKGROUND: set = set()
+
+_CLIENT: httpx.AsyncClient | None = None
+
+METRICS.collect(
+    "sec_mcp_cache_events_total", "counter", "Response cache lookups and evictions by key family",
+    ("family", "event"), lambda: [(fam, ev, n) for fam, st in CACHE.stats.items() for ev, n in st.items()],
+)
+METRICS.collect(
+    "sec_mcp_scheduler_events_total", "counter", "Upstream scheduler grants, queueing, rejections and throttles",
+    ("event",), lambda: SCHEDULER.stats.items(),
+)
+METRICS.collect("sec_mcp_scheduler_rate", "gauge", "Current upstream request rate, per second", (), lambda: [(SCHEDULER.rate,)])
+METRICS.collect(
+    "sec_mcp_singleflight_calls_total", "counter", "Coalesced upstream calls: executed, or deduplicated onto one in flight",
+    ("outcome",), lambda: [(k, INFLIGHT.stats[k]) for k in ("executed", "deduplicated")],
+)
+METRICS.collect("sec_mcp_singleflight_inflight", "gauge", "Upstream calls in flight", (), lambda: [(INFLIGHT.inflight(),)])
+
+
+def get_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            http2=True,
+            timeout=TIMEOUT,
+            limits=POOL_LIMITS,
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+        )
+    return _CLIENT
+
+
+async def startup() -> None:
+    get_client()
+
+
+async def shutdown() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+ATTEMPTS = 3
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+# URL path prefix -> key family for upstream metrics; cache families reuse their names.
+_URL_FAMILIES = (
+    ("/submissions/", "subs"),
+    ("/api/xbrl/companyfacts/", "facts"),
+    ("/api/xbrl/frames/", "frames"),
+    ("/files/company_tickers", "company_tickers"),
+    ("/Archives/edgar/full-index/", "full_index"),
+    ("/Archives/edgar/data/", "archives"),
+    ("/cgi-bin/browse-edgar", "feed"),
+)
+
+
+def upstream_url(url: str) -> str:
+    if UPSTREAM:
+        for host in _EDGAR_HOSTS:
+            if url.startswith(host):
+                return UPSTREAM + url[len(host) :]
+    return url
+
+
+def url_family(url: httpx.URL) -> str:
+    for prefix, family in _URL_FAMILIES:
+        if url.path.startswith(prefix):
+            return family
+    return "other"
+
 
+async def _send(url: str, headers: dict | None = None, timeout=None, stream: bool = False) -> httpx.Response:
+    """GET through the scheduler, retrying transport errors and 429/5xx.
 
+    Every attempt takes a fresh token, so retries queue behind other work and
+    a Retry-After from the previous attempt is honoured by the scheduler.
+    """
+    client = get_client()
+    for attempt in range(ATTEMPTS):
+        with stage("limiter_wait"):
+            await SCHEDULER.acquire()
+        req = client.build_request("GET", upstream_url(url), headers=headers, timeout=timeout or TIMEOUT)
+        labels = (req.url.host, url_family(req.url))
+        try:
+            with stage("upstream"):
+                t0 = time.perf_counter()
+                resp = await client.send(req, stream=stream)
+                UPSTREAM_SECONDS.observe(time.perf_counter() - t0, *labels)
+        except httpx.TransportError:
+            UPSTREAM_REQUESTS.inc(*labels, "error")
+            SCHEDULER.feedback(None)
+            if attempt == ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(0.3 * 2**attempt)
+            continue
+        UPSTREAM_REQUESTS.inc(*labels, str(resp.status_code))
+        if not stream:
+            UPSTREAM_BYTES.inc(*labels, n=resp.num_bytes_downloaded)
+        delay = SCHEDULER.feedback(resp.status_code, resp.headers.get("Retry-After"))
+        if resp.status_code not in _RETRY_STATUS:
+            return resp
+        if stream:
+            await resp.aclose()
+        if attempt == ATTEMPTS - 1:
+            if delay is not None:
+                raise UpstreamThrottled(int(max(delay, SCHEDULER.predicted_wait()) * 1000), f"EDGAR returned {resp.status_code}")
+            resp.raise_for_status()
+    raise AssertionError("unreachable")
+
+
+async def fetch_json(url: str, cache_key: str, cache_ttl: int, stale_while_revalidate: bool | None = None):
+    params = {"url": url}
+    entry = CACHE.lookup(cache_key, params)
+    if entry is not None and time.time() - entry.ts <= cache_ttl:
+        return entry.data
+
+    if entry is not None:
+        swr = STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate
+        if swr:
+            with priority(PREFETCH):
+                task = asyncio.ensure_future(INFLIGHT.do(url, lambda: _download_json(url, cache_key, entry)))
+            _BACKGROUND.add(task)
+            task.add_done_callback(_BACKGROUND.discard)
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            return entry.data
+    return await INFLIGHT.do(url, lambda: _download_json(url, cache_key, entry))
+
+
+async def fetch_text(url: str) -> str:
+    return await INFLIGHT.do(url, lambda: _download_text(url))
+
+
+def _validators(resp: httpx.Response) -> dict:
+    meta = {}
+    if resp.headers.get("ETag"):
+        meta["etag"] = resp.headers["ETag"]
+    if resp.headers.get("Last-Modified"):
+        meta["last_modified"] = resp.headers["Last-Modified"]
+    return meta
+
+
+async def _download_json(url: str, cache_key: str, stale=None):
+    async with host_lock(url):
+        # another worker may have fetched it while we waited for the lock
+        fresh = CACHE.reload(cache_key, {"url": url}, stale.ts if stale is not None else 0.0)
+        if fresh is not None:
+            return fresh.data
+        return await _download_json_locked(url, cache_key, stale)
+
+
+async def _download_json_locked(url: str, cache_key: str, stale=None):
+    headers = {}
+    if stale is not None:
+        if stale.meta.get("etag"):
+            headers["If-None-Match"] = stale.meta["etag"]
+        if stale.meta.get("last_modified"):
+            headers["If-Modified-Since"] = stale.meta["last_modified"]
+
+    resp = await _send(url, headers=headers)
+    if resp.status_code == 304 and stale is not None:
+        CACHE.touch(cache_key, {"url": url}, _validators(resp) or None)
+        return stale.data
+    resp.raise_for_status()
+    data = resp.json()
+    CACHE.set(cache_key, {"url": url}, data, meta=_validators(resp))
+    return data
+
+
+async def fetch_conditional(url: str, validators: dict | None = None):
+    """GET url unless it is unchanged since `validators`; returns (text or None, validators)."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    resp = await _send(url, headers=headers)
+    if resp.status_code == 304:
+        return None, validators
+    resp.raise_for_status()
+    return resp.text, _validators(resp)
+
+
+async def _download_text(url: str) -> str:
+    resp = await _send(url, timeout=DOC_TIMEOUT)
+    resp.raise_for_status()
+    return resp.text
+
+
+async def download_stream(url: str, sink_factory):
+    """Stream url's decoded text into a fresh sink and return sink.close().
+
+    A sink has feed(chunk), close() and abort(); a connection dropped mid-body
+    restarts the download with a new sink, so nothing larger than a network
+    chunk is buffered here.
+    """
+    for attempt in range(ATTEMPTS):
+        sink = sink_factory()
+        try:
+            resp = await _send(url, timeout=DOC_TIMEOUT, stream=True)
+            try:
+                resp.raise_for_status()
+                with stage("upstream_body"):
+                    async for chunk in resp.aiter_text():
+                        sink.feed(chunk)
+            finally:
+                await resp.aclose()
+                UPSTREAM_BYTES.inc(resp.url.host, url_family(resp.url), n=resp.num_bytes_downloaded)
+            return sink.close()
+        except httpx.TransportError:
+            sink.abort()
+            if attempt == ATTEMPTS - 1:
+                raise
+        except BaseException:
+            sink.abort()
+            raise
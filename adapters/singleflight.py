@@ -0,0 +1,72 @@
+import asyncio, hashlib, os, pathlib, time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Lock files for host_lock; keys hash onto a fixed set so the directory never grows.
+LOCK_DIR = pathlib.Path(os.environ.get("SEC_MCP_LOCK_DIR", ".cache/locks"))
+LOCK_STRIPES = 1024
+# A holder that takes longer than this (hung download, dead process) is not waited on.
+LOCK_TIMEOUT = 90.0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"calls": 0, "executed": 0, "deduplicated": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        self.stats["calls"] += 1
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.stats["deduplicated"] += 1
+            # shield so one cancelled waiter does not cancel the shared fetch
+            return await asyncio.shield(fut)
+
+        self.stats["executed"] += 1
+        fut = asyncio.ensure_future(fn())
+        self._inflight[key] = fut
+        fut.add_done_callback(lambda f: self._inflight.get(key) is f and self._inflight.pop(key))
+        # retrieve the exception if nobody is left waiting on it
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return await asyncio.shield(fut)
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+
+@asynccontextmanager
+async def host_lock(key: str, poll: float = 0.05, timeout: float = LOCK_TIMEOUT):
+    """Exclusive lock on `key` across every process on this host.
+
+    SingleFlight coalesces callers within a process; this makes the other
+    server processes wait for the one already fetching, so they can read the
+    result from the shared on-disk caches instead of fetching it again. The
+    lock is advisory: without flock, or after `timeout`, callers go ahead.
+    """
+    if fcntl is None:
+        yield False
+        return
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    stripe = int(hashlib.sha1(key.encode()).hexdigest()[:8], 16) % LOCK_STRIPES
+    fd = os.open(LOCK_DIR / f"{stripe:04d}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        held = False
+        while not held:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                held = True
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    break
+                await asyncio.sleep(poll)
+        yield held
+    finally:
+        os.close(fd)  # releases the lock
@@ -0,0 +1,172 @@
+import os, pathlib, re, sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TEXT_INDEX_PATH = os.environ.get("SEC_MCP_TEXT_INDEX", ".cache/text_index.sqlite")
+# Target chunk length; chunks never straddle a section boundary.
+CHUNK_CHARS = 2000
+
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+# unicode61 token characters: letters and digits
+_TOKEN = re.compile(r"[^\W_]+")
+_OPERATORS = ("AND", "OR", "NOT")
+
+
+def parse_query(query: str) -> Tuple[str, re.Pattern]:
+    """User query -> (FTS5 MATCH expression, pattern finding its terms in text).
+
+    Bare words and "quoted phrases" are all required; AND, OR and NOT pass
+    through and a trailing * makes a word a prefix. Everything else is quoted,
+    so no input is an FTS5 syntax error.
+    """
+    parts, pats = [], []
+    for phrase, word in _QUERY.findall(query):
+        if word in _OPERATORS:
+            if parts and parts[-1] not in _OPERATORS:
+                parts.append(word)
+            continue
+        text = phrase or word
+        prefix = not phrase and text.endswith("*")
+        tokens = _TOKEN.findall(text)
+        if not tokens:
+            continue
+        parts.append('"%s"%s' % (" ".join(tokens), " *" if prefix else ""))
+        pats.append(r"\b" + r"\W+".join(map(re.escape, tokens)) + (r"\w*" if prefix else r"\b"))
+    while parts and parts[-1] in _OPERATORS:
+        parts.pop()
+    if not pats:
+        raise ValueError("Query has no searchable terms")
+    return " ".join(parts), re.compile("|".join(pats), re.I)
+
+
+def chunk_text(text: str, sections: Dict[str, dict]) -> Iterable[Tuple[Optional[str], int, int]]:
+    """(section, start, end) chunks covering the text, cut at line breaks where possible."""
+    spans = sorted((s["start"], s["end"], name) for name, s in sections.items())
+    cuts = sorted({0, len(text)} | {b for s in spans for b in s[:2] if 0 < b < len(text)})
+    for a, b in zip(cuts, cuts[1:]):
+        # nested sections (Footnotes inside FinancialStatements) label their own range
+        inside = [s for s in spans if s[0] <= a < s[1]]
+        name = min(inside, key=lambda s: s[1] - s[0])[2] if inside else None
+        pos = a
+        while pos < b:
+            end = min(b, pos + CHUNK_CHARS)
+            if end < b:
+                cut = text.rfind("\n", pos + CHUNK_CHARS // 2, end)
+                if cut < 0:
+                    cut = text.rfind(" ", pos + CHUNK_CHARS // 2, end)
+                if cut >= 0:
+                    end = cut + 1
+            yield name, pos, end
+            pos = end
+
+
+class TextIndex:
+    """Positional full-text index over filing text, one row per section chunk.
+
+    SQLite FTS5, contentless: the text itself stays in the document store and
+    only postings are kept here, so phrase queries work without a second copy.
+    Worker processes write (one transaction per filing); server processes read.
+    """
+
+    def __init__(self, path=TEXT_INDEX_PATH):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " accession TEXT PRIMARY KEY, cik INTEGER, form TEXT, filed TEXT, text_sha TEXT, version INTEGER)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS docs_cik ON docs (cik, filed)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, accession TEXT, section TEXT, start INTEGER, stop INTEGER)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS chunks_accession ON chunks (accession)")
+        self.db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunk_text USING fts5(body, content='', tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def state(self, accession: str) -> Optional[Tuple[str, int]]:
+        """(text sha, sections version) the accession was indexed with."""
+        row = self.db.execute("SELECT text_sha, version FROM docs WHERE accession = ?", (accession,)).fetchone()
+        return tuple(row) if row else None
+
+    def add(self, doc: dict, text: str, sections: Dict[str, dict], old_text: Optional[str] = None) -> int:
+        """Index (or re-index) one filing; doc has accession, cik, form, filed, text_sha, version.
+
+        A contentless index needs the old text to remove old postings; without
+        it they stay behind, unreachable once their chunk rows are gone.
+        """
+        acc = doc["accession"]
+        chunks = list(chunk_text(text, sections))
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            old = self.db.execute("SELECT id, start, stop FROM chunks WHERE accession = ?", (acc,)).fetchall()
+            if old and old_text is not None:
+                self.db.executemany(
+                    "INSERT INTO chunk_text (chunk_text, rowid, body) VALUES ('delete', ?, ?)",
+                    [(i, old_text[a:b]) for i, a, b in old],
+                )
+            self.db.execute("DELETE FROM chunks WHERE accession = ?", (acc,))
+            for name, a, b in chunks:
+                cur = self.db.execute("INSERT INTO chunks (accession, section, start, stop) VALUES (?, ?, ?, ?)", (acc, name, a, b))
+                self.db.execute("INSERT INTO chunk_text (rowid, body) VALUES (?, ?)", (cur.lastrowid, text[a:b]))
+            self.db.execute(
+                "INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?, ?)",
+                (acc, doc["cik"], doc["form"], doc["filed"], doc["text_sha"], doc["version"]),
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return len(chunks)
+
+    def search(
+        self,
+        match: str,
+        cik: Optional[int] = None,
+        forms: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        sections: Optional[List[str]] = None,
+        limit: int = 10,
+        per_filing: int = 3,
+    ) -> List[tuple]:
+        """Best chunks by bm25, at most per_filing from any one filing.
+
+        Rows are (accession, cik, form, filed, section, start, stop, score), lower score first.
+        """
+        where, args = ["chunk_text MATCH ?"], [match]
+        if cik is not None:
+            where.append("d.cik = ?")
+            args.append(cik)
+        if forms:
+            where.append("d.form IN (%s)" % ",".join("?" * len(forms)))
+            args.extend(forms)
+        if start_date:
+            where.append("d.filed >= ?")
+            args.append(start_date)
+        if end_date:
+            where.append("d.filed <= ?")
+            args.append(end_date)
+        if sections:
+            where.append("c.section IN (%s)" % ",".join("?" * len(sections)))
+            args.extend(sections)
+        # bm25() is not allowed inside a window function, so score first
+        sql = (
+            "WITH hits AS MATERIALIZED ("
+            " SELECT c.accession, d.cik, d.form, d.filed, c.section, c.start, c.stop, bm25(chunk_text) AS score"
+            " FROM chunk_text JOIN chunks c ON c.id = chunk_text.rowid JOIN docs d ON d.accession = c.accession"
+            " WHERE " + " AND ".join(where) + ")"
+            " SELECT accession, cik, form, filed, section, start, stop, score FROM ("
+            "  SELECT *, row_number() OVER (PARTITION BY accession ORDER BY score) AS n FROM hits)"
+            " WHERE n <= ? ORDER BY score LIMIT ?"
+        )
+        return self.db.execute(sql, (*args, per_filing, limit)).fetchall()
+
+    def counts(self) -> dict:
+        q = lambda sql: self.db.execute(sql).fetchone()[0]
+        return {"filings": q("SELECT COUNT(*) FROM docs"), "chunks": q("SELECT COUNT(*) FROM chunks")}
+
+
+TEXT_INDEX = TextIndex()
@@ -0,0 +1,88 @@
+import asyncio, multiprocessing, os, time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .metrics import METRICS
+
+# CPU-bound stages (HTML -> text, sectioning, sentence diff) run here so a big
+# 10-K never blocks the event loop. 0 workers runs them on the default thread
+# executor instead, for environments that cannot spawn processes.
+WORKERS = int(os.environ.get("SEC_MCP_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Jobs allowed to wait for a free worker before new ones are turned away.
+MAX_QUEUE = int(os.environ.get("SEC_MCP_MAX_QUEUE", str(max(1, WORKERS) * 4)))
+
+
+class Overloaded(RuntimeError):
+    """Raised instead of queueing when the worker pool is saturated."""
+
+    def __init__(self, pending: int, retry_after_ms: int):
+        super().__init__(f"worker pool saturated ({pending} jobs pending)")
+        self.retry_after_ms = retry_after_ms
+
+
+class WorkerPool:
+    """Process pool with a bounded admission queue.
+
+    At most `workers` jobs run at once and `max_queue` more may wait; beyond
+    that run() raises Overloaded right away, so heavy callers get back-pressure
+    and cheap tools on the event loop are never stuck behind them.
+    """
+
+    def __init__(self, workers: int = WORKERS, max_queue: int = MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._avg = 0.1  # moving average job time, seconds
+
+    def _get_executor(self):
+        if self._executor is None and self.workers > 0:
+            # spawn: forking a process that holds sqlite handles and an event loop is unsafe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn, *args):
+        slots = max(1, self.workers)
+        if self._pending >= slots + self.max_queue:
+            self.stats["rejected"] += 1
+            waves = (self._pending - slots) // slots + 1
+            raise Overloaded(self._pending, int(self._avg * waves * 1000))
+        self.stats["submitted"] += 1
+        self._pending += 1
+        t0 = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # a worker died (e.g. OOM); start a fresh pool for the next job
+            self._executor = None
+            self.stats["failed"] += 1
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._pending -= 1
+        self.stats["completed"] += 1
+        self._avg = 0.8 * self._avg + 0.2 * (time.perf_counter() - t0)
+        return result
+
+    def start(self):
+        ex = self._get_executor()
+        if ex is not None:
+            # bring the workers up now rather than on the first request
+            for _ in range(self.workers):
+                ex.submit(os.getpid)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+POOL = WorkerPool()
+METRICS.collect("sec_mcp_worker_jobs_total", "counter", "Worker pool jobs by outcome", ("outcome",), lambda: POOL.stats.items())
+METRICS.collect("sec_mcp_worker_pending", "gauge", "Worker pool jobs running or queued", (), lambda: [(POOL.pending(),)])
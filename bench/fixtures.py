@@ -0,0 +1,244 @@
+"""Build the fixture tree bench/standin.py serves, plus a manifest of what is in it.
+
+    python -m bench.fixtures synth [--out DIR] [--companies 4] [--years 3] [--doc-kb 3000]
+    python -m bench.fixtures record --tickers AAPL MSFT NVDA [--out DIR] [--user-agent "me@example.com"]
+
+`synth` generates everything offline: a company_tickers.json with a few
+thousand filler issuers, submissions, companyfacts and large inline-XBRL
+style 10-K documents whose Risk Factors drift year to year like real ones.
+`record` downloads the same files from EDGAR for real issuers (at most 5
+requests a second, with your User-Agent) so runs can use real documents.
+
+Files are stored under their EDGAR paths; manifest.json lists each
+company's ticker, CIK, a fiscal period with facts, and its 10-K/10-Q
+accessions, and is what bench/suite.py builds its calls from.
+"""
+import argparse, json, os, pathlib, random, sys, time
+from datetime import date
+
+from bench.sentdiff_bench import make_section, make_vocab, mutate
+
+DEFAULT_OUT = ".cache/bench/fixtures"
+_GAAP = {
+    "Revenues": (5e9, False),
+    "CostOfRevenue": (3e9, False),
+    "OperatingIncomeLoss": (1e9, False),
+    "NetIncomeLoss": (8e8, False),
+    "NetCashProvidedByUsedInOperatingActivities": (1.2e9, False),
+    "PaymentsToAcquirePropertyPlantAndEquipment": (3e8, False),
+    "AssetsCurrent": (4e9, True),
+    "LiabilitiesCurrent": (2.5e9, True),
+    "CashAndCashEquivalentsAtCarryingValue": (1.5e9, True),
+    "LongTermDebtNoncurrent": (6e9, True),
+}
+_ITEMS = [
+    ("1", "Business"), ("1A", "Risk Factors"), ("1B", "Unresolved Staff Comments"), ("1C", "Cybersecurity"),
+    ("2", "Properties"), ("3", "Legal Proceedings"), ("4", "Mine Safety Disclosures"),
+    ("5", "Market for Registrant's Common Equity"), ("6", "[Reserved]"),
+    ("7", "Management's Discussion and Analysis of Financial Condition and Results of Operations"),
+    ("7A", "Quantitative and Qualitative Disclosures About Market Risk"),
+    ("8", "Financial Statements and Supplementary Data"), ("9A", "Controls and Procedures"),
+    ("10", "Directors, Executive Officers and Corporate Governance"), ("11", "Executive Compensation"),
+    ("15", "Exhibit and Financial Statement Schedules"),
+]
+# share of the document body given to each item; the rest is spread evenly
+_WEIGHT = {"1": 0.12, "1A": 0.25, "7": 0.2, "8": 0.25}
+
+
+def _write(out: pathlib.Path, url_path: str, data):
+    fp = out / url_path.lstrip("/")
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, (dict, list)):
+        data = json.dumps(data, separators=(",", ":"))
+    fp.write_bytes(data.encode("utf-8") if isinstance(data, str) else data)
+    return fp
+
+
+def _paragraphs_html(sents, rng: random.Random) -> str:
+    # inline XBRL filings wrap every run of text in styled divs and spans
+    out, i = [], 0
+    while i < len(sents):
+        n = rng.randint(3, 8)
+        body = " ".join(
+            f'<span style="color:#000000;font-family:\'Times New Roman\',sans-serif;font-size:10pt;font-weight:400;line-height:120%">{s}</span>'
+            for s in sents[i : i + n]
+        )
+        out.append(f'<div style="margin-top:6pt;text-align:justify"><p>{body}</p></div>')
+        i += n
+    return "\n".join(out)
+
+
+def _tenk_html(name: str, year: int, sections: dict, rng: random.Random) -> str:
+    toc = "\n".join(
+        f'<tr><td><a href="#i{num}">Item {num}.</a></td><td>{title}</td><td>{k + 3}</td></tr>'
+        for k, (num, title) in enumerate(_ITEMS)
+    )
+    parts = [
+        f"<html><head><title>{name} 10-K {year}</title></head><body>",
+        f"<div><p>UNITED STATES SECURITIES AND EXCHANGE COMMISSION</p><p>FORM 10-K</p><p>{name}</p></div>",
+        f"<table>{toc}</table>",
+    ]
+    for num, title in _ITEMS:
+        if num == "1":
+            parts.append("<div><p>PART I</p></div>")
+        elif num == "5":
+            parts.append("<div><p>PART II</p></div>")
+        elif num == "10":
+            parts.append("<div><p>PART III</p></div>")
+        parts.append(f'<div id="i{num}"><p><b>Item {num}. {title}</b></p></div>')
+        parts.append(_paragraphs_html(sections[num], rng))
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def _facts(cik: int, name: str, years, rng: random.Random, filler: int) -> dict:
+    gaap = {}
+    concepts = dict(_GAAP)
+    for k in range(filler):
+        concepts[f"SyntheticConcept{k:04d}"] = (rng.uniform(1e6, 1e9), rng.random() < 0.4)
+    for tag, (base, instant) in concepts.items():
+        items = []
+        for y in years:
+            filed = f"{y + 1}-02-15"
+            scale = base * (1.05 ** (y - years[0])) * rng.uniform(0.95, 1.05)
+            if instant:
+                items.append({"end": f"{y}-12-31", "val": round(scale), "fy": y, "fp": "FY", "form": "10-K", "filed": filed})
+                for q, end in ((1, "03-31"), (2, "06-30"), (3, "09-30")):
+                    items.append({"end": f"{y}-{end}", "val": round(scale * rng.uniform(0.9, 1.1)), "fy": y, "fp": f"Q{q}", "form": "10-Q", "filed": f"{y}-{end[:2]}-28"})
+                continue
+            items.append({"start": f"{y}-01-01", "end": f"{y}-12-31", "val": round(scale), "fy": y, "fp": "FY", "form": "10-K", "filed": filed})
+            for q, (start, end) in enumerate((("01-01", "03-31"), ("04-01", "06-30"), ("07-01", "09-30")), 1):
+                items.append({"start": f"{y}-{start}", "end": f"{y}-{end}", "val": round(scale / 4), "fy": y, "fp": f"Q{q}", "form": "10-Q", "filed": f"{y}-{end[:2]}-28"})
+        gaap[tag] = {"label": tag, "description": f"{tag} reported by {name}.", "units": {"USD": items}}
+    return {"cik": cik, "entityName": name, "facts": {"us-gaap": gaap}}
+
+
+def synth(out: pathlib.Path, companies: int, years: int, doc_kb: int, universe: int, facts_filler: int, seed: int):
+    rng = random.Random(seed)
+    vocab = make_vocab(rng)
+    last = date.today().year - 1
+    span = list(range(last - years + 1, last + 1))
+    tickers, manifest = {}, {"source": "synthetic", "seed": seed, "companies": []}
+    # ~25 words of ~6 characters per sentence, plus markup
+    sents_per_doc = max(200, doc_kb * 1024 // 600)
+    for k in range(companies):
+        cik = 1_900_000 + k
+        ticker = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(4))
+        name = f"{make_section(1, rng, vocab)[0].split()[0]} Holdings Inc"
+        tickers[str(len(tickers))] = {"cik_str": cik, "ticker": ticker, "title": name}
+        cols = {"accessionNumber": [], "filingDate": [], "reportDate": [], "form": [], "primaryDocument": []}
+        filings = []
+        sections = {
+            num: make_section(max(20, int(sents_per_doc * _WEIGHT.get(num, 0.18 / (len(_ITEMS) - len(_WEIGHT))))), rng, vocab)
+            for num, _ in _ITEMS
+        }
+        for seq, y in enumerate(span, 1):
+            if seq > 1:
+                # a year's worth of edits, inserts, deletions and moves
+                sections = {num: mutate(s, rng, vocab) for num, s in sections.items()}
+            acc = f"{cik:010d}-{(y + 1) % 100:02d}-{seq:06d}"
+            doc = f"{ticker.lower()}-{y}1231.htm"
+            filed = f"{y + 1}-02-15"
+            _write(out, f"/Archives/edgar/data/{cik}/{acc.replace('-', '')}/{doc}", _tenk_html(name, y, sections, rng))
+            cols["accessionNumber"].insert(0, acc)
+            cols["filingDate"].insert(0, filed)
+            cols["reportDate"].insert(0, f"{y}-12-31")
+            cols["form"].insert(0, "10-K")
+            cols["primaryDocument"].insert(0, doc)
+            filings.insert(0, {"accession": acc, "form": "10-K", "filed": filed})
+        _write(out, f"/submissions/CIK{cik:010d}.json", {"cik": str(cik), "name": name, "tickers": [ticker], "filings": {"recent": cols, "files": []}})
+        _write(out, f"/api/xbrl/companyfacts/CIK{cik:010d}.json", _facts(cik, name, span, rng, facts_filler))
+        manifest["companies"].append({"ticker": ticker, "cik": f"{cik:010d}", "name": name, "period": f"FY{last}", "filings": filings})
+    for k in range(universe):
+        words = make_section(1, rng, vocab)[0].rstrip(".").split()[:3]
+        tickers[str(len(tickers))] = {"cik_str": 2_000_000 + k, "ticker": f"X{k:05d}", "title": " ".join(w.capitalize() for w in words) + " Corp"}
+    _write(out, "/files/company_tickers.json", tickers)
+    _write(out, "manifest.json", manifest)
+    return manifest
+
+
+class _Recorder:
+    def __init__(self, out: pathlib.Path, user_agent: str, rps: float = 5.0):
+        import httpx
+
+        self.out = out
+        self.client = httpx.Client(headers={"User-Agent": user_agent}, timeout=60, follow_redirects=True)
+        self.interval = 1 / rps
+        self._next = 0.0
+
+    def get(self, url: str) -> bytes:
+        wait = self._next - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._next = time.monotonic() + self.interval
+        resp = self.client.get(url)
+        resp.raise_for_status()
+        path = url.split(".sec.gov", 1)[1]
+        _write(self.out, path, resp.content)
+        print(f"  {len(resp.content) / 1e6:7.2f} MB  {path}", file=sys.stderr)
+        return resp.content
+
+
+def record(out: pathlib.Path, tickers, tenk: int, tenq: int, user_agent: str):
+    rec = _Recorder(out, user_agent)
+    universe = json.loads(rec.get("https://www.sec.gov/files/company_tickers.json"))
+    by_ticker = {v["ticker"].upper(): v for v in universe.values()}
+    manifest = {"source": "recorded", "recorded_at": date.today().isoformat(), "companies": []}
+    for t in tickers:
+        row = by_ticker.get(t.upper())
+        if row is None:
+            print(f"unknown ticker {t}", file=sys.stderr)
+            continue
+        cik10 = f"{int(row['cik_str']):010d}"
+        subs = json.loads(rec.get(f"https://data.sec.gov/submissions/CIK{cik10}.json"))
+        recent = subs["filings"]["recent"]
+        rec.get(f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik10}.json")
+        want = {"10-K": tenk, "10-Q": tenq}
+        filings, period = [], None
+        for i, form in enumerate(recent["form"]):
+            if want.get(form, 0) <= 0:
+                continue
+            want[form] -= 1
+            acc, doc = recent["accessionNumber"][i], recent["primaryDocument"][i]
+            rec.get(f"https://www.sec.gov/Archives/edgar/data/{int(cik10)}/{acc.replace('-', '')}/{doc}")
+            filings.append({"accession": acc, "form": form, "filed": recent["filingDate"][i]})
+            if form == "10-K" and period is None and recent["reportDate"][i]:
+                period = f"FY{recent['reportDate'][i][:4]}"
+        manifest["companies"].append(
+            {"ticker": row["ticker"], "cik": cik10, "name": row["title"], "period": period or f"FY{date.today().year - 1}", "filings": filings}
+        )
+    _write(out, "manifest.json", manifest)
+    return manifest
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("synth", help="generate synthetic fixtures offline")
+    s.add_argument("--out", default=DEFAULT_OUT)
+    s.add_argument("--companies", type=int, default=4)
+    s.add_argument("--years", type=int, default=3, help="10-K filings per company")
+    s.add_argument("--doc-kb", type=int, default=3000, help="approximate size of each 10-K")
+    s.add_argument("--universe", type=int, default=8000, help="filler issuers in company_tickers.json")
+    s.add_argument("--facts-filler", type=int, default=400, help="extra concepts per companyfacts file")
+    s.add_argument("--seed", type=int, default=7)
+    r = sub.add_parser("record", help="download real fixtures from EDGAR")
+    r.add_argument("--out", default=DEFAULT_OUT)
+    r.add_argument("--tickers", nargs="+", required=True)
+    r.add_argument("--10k", dest="tenk", type=int, default=2)
+    r.add_argument("--10q", dest="tenq", type=int, default=1)
+    r.add_argument("--user-agent", default=os.environ.get("SEC_MCP_USER_AGENT"), help="EDGAR requires a contact")
+    args = ap.parse_args(argv)
+    out = pathlib.Path(args.out)
+    if args.cmd == "synth":
+        m = synth(out, args.companies, args.years, args.doc_kb, args.universe, args.facts_filler, args.seed)
+    else:
+        if not args.user_agent:
+            ap.error("--user-agent or SEC_MCP_USER_AGENT is required to record from EDGAR")
+        m = record(out, args.tickers, args.tenk, args.tenq, args.user_agent)
+    print(f"{len(m['companies'])} companies written to {out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Time tools.sentdiff on synthetic sections of a few thousand sentences.
+
+    python -m bench.sentdiff_bench [--sentences 1000 3000 6000] [--legacy]
+
+Each case edits, inserts, deletes and moves a fixed share of sentences, the
+way Risk Factors changes between years. --legacy also times the old
+per-sentence extractOne loop for comparison (slow above ~2000 sentences).
+"""
+import argparse, random, time
+
+from rapidfuzz import fuzz, process
+
+from tools.sentdiff import diff_sentences, split_sents
+
+def make_vocab(rng: random.Random, size: int = 5000):
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 11))) for _ in range(size)]
+    # Zipf-like weights so a few words ("the", "our", "risk") dominate, as in filings
+    return words, [1 / (i + 1) for i in range(size)]
+
+
+def make_section(n: int, rng: random.Random, vocab):
+    words, weights = vocab
+    return [" ".join(rng.choices(words, weights, k=rng.randint(12, 40))).capitalize() + "." for _ in range(n)]
+
+
+def mutate(sents, rng: random.Random, vocab, edit=0.1, insert=0.05, delete=0.05, move=0.02):
+    out = []
+    for s in sents:
+        r = rng.random()
+        if r < delete:
+            continue
+        if r < delete + edit:
+            w = s.rstrip(".").split()
+            w[rng.randrange(len(w))] = rng.choice(vocab[0])
+            s = " ".join(w) + "."
+        out.append(s)
+        if rng.random() < insert:
+            out.extend(make_section(1, rng, vocab))
+    for _ in range(int(len(out) * move)):
+        out.insert(rng.randrange(len(out)), out.pop(rng.randrange(len(out))))
+    return out
+
+
+def legacy_diff(old: str, new: str):
+    old_s, new_s = split_sents(old), split_sents(new)
+    added = [s for s in new_s if (process.extractOne(s, old_s, scorer=fuzz.token_set_ratio) or (0, 0))[1] < 80]
+    removed = [s for s in old_s if (process.extractOne(s, new_s, scorer=fuzz.token_set_ratio) or (0, 0))[1] < 80]
+    return added, removed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sentences", type=int, nargs="+", default=[1000, 3000, 6000])
+    ap.add_argument("--legacy", action="store_true")
+    args = ap.parse_args()
+    rng = random.Random(7)
+    vocab = make_vocab(rng)
+    for n in args.sentences:
+        base = make_section(n, rng, vocab)
+        old, new = " ".join(base), " ".join(mutate(base, rng, vocab))
+        t0 = time.perf_counter()
+        added, removed, modified = diff_sentences(old, new)
+        line = f"{n:>6} sentences  {time.perf_counter() - t0:7.3f}s  +{len(added)} -{len(removed)} ~{len(modified)}"
+        if args.legacy:
+            t0 = time.perf_counter()
+            legacy_diff(old, new)
+            line += f"  legacy {time.perf_counter() - t0:7.3f}s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Local stand-in for www.sec.gov and data.sec.gov, serving recorded fixtures.
+
+    python -m bench.standin --fixtures .cache/bench/fixtures [--port 8765]
+        [--latency-ms 40] [--jitter-ms 20] [--throttle 0.01] [--max-rps 10]
+
+A request for /submissions/CIK0000320193.json is answered from
+<fixtures>/submissions/CIK0000320193.json, and so on for every EDGAR path
+(query strings are ignored). Each response is delayed by latency plus
+uniform jitter. --throttle answers that share of requests with 429, and
+--max-rps does so whenever a one-second token bucket is empty, the way
+EDGAR enforces its fair-access limit. ETag / If-None-Match are honoured.
+
+GET /__stats returns request, status, byte and per-family counts as JSON;
+GET /__reset clears them. Point the server at it with
+SEC_MCP_UPSTREAM=http://127.0.0.1:<port>.
+"""
+import argparse, hashlib, json, pathlib, random, shutil, sys, threading, time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Same families the server labels its upstream metrics with.
+FAMILIES = (
+    ("/submissions/", "subs"),
+    ("/api/xbrl/companyfacts/", "facts"),
+    ("/api/xbrl/frames/", "frames"),
+    ("/files/company_tickers", "company_tickers"),
+    ("/Archives/edgar/full-index/", "full_index"),
+    ("/Archives/edgar/data/", "archives"),
+    ("/cgi-bin/browse-edgar", "feed"),
+)
+
+
+def family(path: str) -> str:
+    for prefix, name in FAMILIES:
+        if path.startswith(prefix):
+            return name
+    return "other"
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, fixtures: pathlib.Path, latency: float, jitter: float, throttle: float, max_rps: float):
+        super().__init__(addr, Handler)
+        self.fixtures = fixtures.resolve()
+        self.latency, self.jitter, self.throttle, self.max_rps = latency, jitter, throttle, max_rps
+        self.lock = threading.Lock()
+        self.tokens, self.last = max_rps, time.monotonic()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = {"requests": 0, "bytes": 0, "status": Counter(), "families": Counter()}
+
+    def count(self, path: str, status: int, size: int = 0):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts["bytes"] += size
+            self.counts["status"][str(status)] += 1
+            self.counts["families"][family(path)] += 1
+
+    def admit(self) -> bool:
+        if self.throttle and random.random() < self.throttle:
+            return False
+        if not self.max_rps:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.max_rps, self.tokens + (now - self.last) * self.max_rps)
+            self.last = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandIn
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", ctype: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/__stats":
+            with self.server.lock:
+                return self._send(200, json.dumps(self.server.counts).encode())
+        if path == "/__reset":
+            self.server.reset()
+            return self._send(200, b"{}")
+        srv = self.server
+        time.sleep(srv.latency + random.uniform(0, srv.jitter))
+        if not srv.admit():
+            srv.count(path, 429)
+            return self._send(429, b"Request Rate Threshold Exceeded", "text/plain", {"Retry-After": "1"})
+        fp = (srv.fixtures / path.lstrip("/")).resolve()
+        if srv.fixtures not in fp.parents or not fp.is_file():
+            srv.count(path, 404)
+            return self._send(404, b"Not Found", "text/plain")
+        st = fp.stat()
+        etag = '"%s"' % hashlib.md5(f"{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            srv.count(path, 304)
+            return self._send(304, headers={"ETag": etag})
+        ctype = {".json": "application/json", ".htm": "text/html", ".html": "text/html"}.get(fp.suffix, "text/plain")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{ctype}; charset=utf-8")
+        self.send_header("Content-Length", str(st.st_size))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        with open(fp, "rb") as fh:
+            shutil.copyfileobj(fh, self.wfile, 1 << 16)
+        srv.count(path, 200, st.st_size)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--fixtures", default=".cache/bench/fixtures")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    ap.add_argument("--latency-ms", type=float, default=40)
+    ap.add_argument("--jitter-ms", type=float, default=20)
+    ap.add_argument("--throttle", type=float, default=0.0, help="share of requests answered with 429")
+    ap.add_argument("--max-rps", type=float, default=0.0, help="429 above this rate; 0 disables")
+    args = ap.parse_args(argv)
+    srv = StandIn(
+        (args.host, args.port), pathlib.Path(args.fixtures), args.latency_ms / 1000, args.jitter_ms / 1000,
+        args.throttle, args.max_rps,
+    )
+    # the suite reads the port from this line
+    print(f"listening http://{args.host}:{srv.server_address[1]}", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
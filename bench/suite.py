@@ -0,0 +1,321 @@
+"""End-to-end benchmark of the server's tools against a local EDGAR stand-in.
+
+    python -m bench.suite [--fixtures DIR] [--latency-ms 40] [--throttle 0.01] [--max-rps 10]
+        [--concurrency 16] [--requests 200] [--out FILE] [--compare BASELINE.json]
+
+Starts bench/standin.py on the fixtures (synthesizing them first if there
+are none), then runs the six tools of server.py in fresh server processes
+with SEC_MCP_UPSTREAM pointing at the stand-in and an empty working
+directory, so every cache starts cold:
+
+  cold       each call once, one at a time, on empty caches
+  warm       the same calls again, served from the caches
+  load       a mix of the calls, `--concurrency` in flight, `--requests` total
+  cold_load  the load phase in another fresh process, caches empty
+
+Each call includes serializing its result, as the server does. Per phase it
+reports p50/p95/p99 latency per tool, throughput, upstream requests seen by
+the stand-in (by status and family) and peak RSS of the server process and
+its worker pool. Results are saved as JSON (default .cache/bench/results/)
+and --compare prints the p50/p95 change against an earlier result file.
+"""
+import argparse, asyncio, importlib, json, os, pathlib, platform, random, resource, subprocess, sys, tempfile, time
+import urllib.request
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+TOOLS = ("find_company", "search_filings", "get_financials", "get_filing_text", "get_sections", "diff_last_two")
+PHASES = ("cold", "warm", "load", "cold_load")
+
+
+def percentiles(samples) -> dict:
+    s = sorted(samples)
+    if not s:
+        return {"n": 0}
+
+    def pct(p):
+        return s[min(len(s) - 1, max(0, int(round(p / 100 * len(s))) - 1))]
+
+    return {
+        "n": len(s), "p50_ms": round(pct(50) * 1000, 2), "p95_ms": round(pct(95) * 1000, 2),
+        "p99_ms": round(pct(99) * 1000, 2), "mean_ms": round(sum(s) / len(s) * 1000, 2), "max_ms": round(s[-1] * 1000, 2),
+    }
+
+
+def _get_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+def _children_peak_kb() -> int:
+    """Sum of the peak RSS of live child processes (the worker pool), via /proc."""
+    total = 0
+    for task in pathlib.Path("/proc/self/task").iterdir():
+        for pid in (task / "children").read_text().split():
+            try:
+                with open(f"/proc/{pid}/status") as fh:
+                    total += next((int(line.split()[1]) for line in fh if line.startswith("VmHWM:")), 0)
+            except OSError:
+                pass  # exited meanwhile
+    return total
+
+
+def _peak_rss_mb() -> dict:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / 1024 / 1024
+    try:
+        workers = _children_peak_kb() / 1024
+    except OSError:
+        # no /proc: only children that have exited are counted
+        workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return {"server": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1), "workers": round(workers, 1)}
+
+
+# ---- worker: runs inside a fresh server process ----------------------------
+
+
+def _import_tools():
+    # modules import each other from the repository root, as when server.py runs
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    mod = lambda name: importlib.import_module(f"tools.{name}")
+    return {
+        "find_company": mod("company").find_company_impl,
+        "search_filings": mod("filings").search_filings_impl,
+        "get_financials": mod("financials").get_financials_impl,
+        "get_filing_text": mod("filing_text").get_filing_text_impl,
+        "get_sections": mod("sections").get_sections_impl,
+        "diff_last_two": mod("diff").diff_last_two_impl,
+    }
+
+
+def build_calls(manifest: dict, tools) -> list:
+    calls = []
+    for c in manifest["companies"]:
+        tenk = [f["accession"] for f in c["filings"] if f["form"] == "10-K"]
+        calls.append(("find_company", (c["ticker"],)))
+        calls.append(("find_company", (c["name"],)))
+        calls.append(("search_filings", (c["cik"], ["10-K", "10-Q"], None, None, 10)))
+        calls.append(("get_financials", (c["cik"], c["period"])))
+        for f in c["filings"]:
+            calls.append(("get_filing_text", (f["accession"],)))
+        for acc in tenk:
+            calls.append(("get_sections", (acc, ["RiskFactors", "MDA"])))
+        if len(tenk) >= 2:
+            calls.append(("diff_last_two", (c["ticker"], "10-K", "RiskFactors")))
+    return [(name, args) for name, args in calls if name in tools]
+
+
+async def _call(impls, name: str, args) -> float:
+    t0 = time.perf_counter()
+    result = await impls[name](*args)
+    # the server serializes every result before returning it
+    for r in result if isinstance(result, list) else [result]:
+        r.model_dump_json()
+    return time.perf_counter() - t0
+
+
+async def _phase(impls, calls, concurrency: int, total: int | None, stats_url: str, seed: int) -> dict:
+    _get_json(stats_url.replace("__stats", "__reset"))
+    if total is not None:
+        rng = random.Random(seed)
+        calls = [rng.choice(calls) for _ in range(total)]
+    lat = {name: [] for name in TOOLS if any(n == name for n, _ in calls)}
+    errors: dict = {}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(name, args):
+        async with sem:
+            try:
+                lat[name].append(await _call(impls, name, args))
+            except Exception as e:
+                key = f"{name}:{type(e).__name__}"
+                errors[key] = errors.get(key, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(n, a) for n, a in calls))
+    wall = time.perf_counter() - t0
+    done = sum(len(v) for v in lat.values())
+    return {
+        "calls": len(calls),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(done / wall, 2) if wall else None,
+        "tools": {name: percentiles(v) for name, v in lat.items()},
+        "all": percentiles([x for v in lat.values() for x in v]),
+        "errors": errors,
+        "upstream": _get_json(stats_url),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+async def _worker_main(spec: dict) -> dict:
+    impls = _import_tools()
+    manifest = json.loads(pathlib.Path(spec["manifest"]).read_text())
+    calls = build_calls(manifest, set(spec["tools"]) & set(impls))
+    out = {}
+    try:
+        for phase in spec["phases"]:
+            if phase in ("cold", "warm"):
+                out[phase] = await _phase(impls, calls, 1, None, spec["stats_url"], spec["seed"])
+            else:
+                out[phase] = await _phase(impls, calls, spec["concurrency"], spec["requests"], spec["stats_url"], spec["seed"])
+    finally:
+        from adapters import sec_api, workers
+
+        await sec_api.shutdown()
+        workers.POOL.shutdown()
+    return out
+
+
+# ---- driver -----------------------------------------------------------------
+
+
+def _start_standin(args) -> tuple:
+    cmd = [
+        sys.executable, "-m", "bench.standin", "--fixtures", str(args.fixtures), "--port", "0",
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--throttle", str(args.throttle), "--max-rps", str(args.max_rps),
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith("listening "):
+        proc.kill()
+        raise RuntimeError(f"stand-in failed to start: {line!r}")
+    return proc, line.split(" ", 1)[1]
+
+
+def _run_worker(args, base: str, phases) -> dict:
+    spec = {
+        "manifest": str(pathlib.Path(args.fixtures, "manifest.json").resolve()),
+        "stats_url": f"{base}/__stats",
+        "phases": list(phases),
+        "tools": args.tools,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "seed": args.seed,
+    }
+    with tempfile.TemporaryDirectory(prefix="sec-mcp-bench-") as work:
+        env = dict(
+            os.environ,
+            SEC_MCP_UPSTREAM=base,
+            SEC_MCP_MAX_RPS=str(args.client_rps),
+            SEC_MCP_SHARED_BUCKET=os.path.join(work, "ratelimit.bin"),
+            SEC_MCP_LOCK_DIR=os.path.join(work, "locks"),
+        )
+        if args.workers is not None:
+            env["SEC_MCP_WORKERS"] = str(args.workers)
+        proc = subprocess.run(
+            [sys.executable, "-m", "bench.suite", "--worker", json.dumps(spec)],
+            cwd=work, env=dict(env, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))),
+            stdout=subprocess.PIPE, text=True,
+        )
+    if proc.returncode:
+        raise RuntimeError(f"benchmark worker failed ({proc.returncode})")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _print(results: dict):
+    for phase, r in results["phases"].items():
+        up = r["upstream"]
+        print(
+            f"\n{phase}: {r['calls']} calls in {r['wall_s']} s, {r['throughput_rps']} calls/s, "
+            f"upstream {up['requests']} requests {up['bytes'] / 1e6:.1f} MB {dict(up['status'])}, "
+            f"peak RSS {r['peak_rss_mb']['server']} MB (+ workers {r['peak_rss_mb']['workers']} MB)"
+        )
+        print(f"  {'tool':<18}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, p in list(r["tools"].items()) + [("all", r["all"])]:
+            if p["n"]:
+                print(f"  {name:<18}{p['n']:>5}{p['p50_ms']:>10}{p['p95_ms']:>10}{p['p99_ms']:>10}")
+        if r["errors"]:
+            print(f"  errors: {r['errors']}")
+
+
+def _compare(results: dict, baseline: dict):
+    print(f"\nvs {baseline['meta'].get('git_rev')} ({baseline['meta'].get('timestamp')}):")
+    for phase, r in results["phases"].items():
+        old = baseline["phases"].get(phase)
+        if not old:
+            continue
+        for name, p in list(r["tools"].items()) + [("all", r["all"])]:
+            o = old["all"] if name == "all" else old["tools"].get(name)
+            if not p["n"] or not o or not o["n"]:
+                continue
+            delta = "  ".join(
+                f"{k[:3]} {o[k]:.0f} -> {p[k]:.0f} ms ({(p[k] / o[k] - 1) * 100:+.0f}%)" for k in ("p50_ms", "p95_ms") if o[k]
+            )
+            print(f"  {phase:<10}{name:<18}{delta}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    ap.add_argument("--fixtures", default=".cache/bench/fixtures")
+    ap.add_argument("--phases", nargs="+", default=list(PHASES), choices=PHASES)
+    ap.add_argument("--tools", nargs="+", default=list(TOOLS), choices=TOOLS)
+    ap.add_argument("--latency-ms", type=float, default=40)
+    ap.add_argument("--jitter-ms", type=float, default=20)
+    ap.add_argument("--throttle", type=float, default=0.0, help="share of upstream requests answered with 429")
+    ap.add_argument("--max-rps", type=float, default=10, help="stand-in 429s above this rate, like EDGAR; 0 disables")
+    ap.add_argument("--client-rps", type=float, default=9, help="SEC_MCP_MAX_RPS for the server under test")
+    ap.add_argument("--workers", type=int, default=None, help="SEC_MCP_WORKERS for the server under test")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default=None, help="results file (default .cache/bench/results/<time>-<rev>.json)")
+    ap.add_argument("--compare", default=None, help="earlier results file to compare against")
+    args = ap.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(asyncio.run(_worker_main(json.loads(args.worker)))))
+        return 0
+
+    args.fixtures = pathlib.Path(args.fixtures).resolve()
+    if not (args.fixtures / "manifest.json").exists():
+        from bench.fixtures import synth
+
+        print(f"no fixtures in {args.fixtures}; generating synthetic ones", file=sys.stderr)
+        synth(args.fixtures, 4, 3, 3000, 8000, 400, 7)
+    manifest = json.loads((args.fixtures / "manifest.json").read_text())
+    standin, base = _start_standin(args)
+    try:
+        phases = {}
+        first = [p for p in args.phases if p != "cold_load"]
+        if first:
+            phases.update(_run_worker(args, base, first))
+        if "cold_load" in args.phases:
+            phases.update(_run_worker(args, base, ["cold_load"]))
+    finally:
+        standin.terminate()
+        standin.wait()
+
+    rev = _git_rev()
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_rev": rev,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "fixtures": {"source": manifest.get("source"), "companies": len(manifest["companies"])},
+            "config": {k: v for k, v in vars(args).items() if k not in ("worker", "fixtures", "out", "compare")},
+        },
+        "phases": phases,
+    }
+    out = pathlib.Path(args.out or f".cache/bench/results/{time.strftime('%Y%m%dT%H%M%S')}-{rev or 'norev'}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=1))
+    _print(results)
+    if args.compare:
+        _compare(results, json.loads(pathlib.Path(args.compare).read_text()))
+    print(f"\nresults written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Load EDGAR's nightly bulk archives into the local store used by offline mode.
+
+    python -m ingestion.bulk --submissions submissions.zip --companyfacts companyfacts.zip [--workers 4]
+
+Archives: https://www.sec.gov/Archives/edgar/daily-index/bulkdata/submissions.zip
+and https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip.
+Reloads are incremental: a member is rewritten only when its CRC or size
+changed, and members missing from the new archive are dropped. Run the
+server with SEC_MCP_OFFLINE=1 to answer from the store without touching EDGAR.
+"""
+import argparse, json, multiprocessing, sys, time, zipfile, zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from adapters.bulk_store import BULK, CIK_MEMBER
+from tools.financials import FACT_TABLE_VERSION, FactTable
+
+# Members per write transaction.
+BATCH = 256
+# companyfacts members per worker job.
+FACTS_CHUNK = 32
+
+
+def _changed(zf: zipfile.ZipFile, archive: str) -> Tuple[List[zipfile.ZipInfo], List[str]]:
+    have = BULK.members(archive)
+    if archive == "companyfacts" and BULK.meta("fact_table_version") != FACT_TABLE_VERSION:
+        # tables serialized by an older FactTable are rebuilt, changed or not
+        have = {name: None for name in have}
+    infos = [i for i in zf.infolist() if CIK_MEMBER.match(i.filename)]
+    present = {i.filename for i in infos}
+    todo = [i for i in infos if have.get(i.filename) != (i.CRC, i.file_size)]
+    return todo, [n for n in have if n not in present]
+
+
+def load_submissions(path: str) -> dict:
+    with zipfile.ZipFile(path) as zf:
+        todo, stale = _changed(zf, "submissions")
+        BULK.drop("submissions", stale)
+        for b in range(0, len(todo), BATCH):
+            rows, companies = [], []
+            for info in todo[b : b + BATCH]:
+                raw = zf.read(info)
+                cik = int(CIK_MEMBER.match(info.filename).group(1))
+                rows.append((info.filename, cik, info.CRC, info.file_size, zlib.compress(raw, 6)))
+                # older history shards carry filings only; names and tickers live in the main file
+                if "-submissions-" not in info.filename:
+                    doc = json.loads(raw)
+                    companies.append((cik, doc.get("name") or "", doc.get("tickers") or []))
+            BULK.put_submissions(rows, companies)
+    return {"changed": len(todo), "dropped": len(stale)}
+
+
+def _facts_job(path: str, names: List[str]) -> List[tuple]:
+    out = []
+    with zipfile.ZipFile(path) as zf:
+        for name in names:
+            info = zf.getinfo(name)
+            table = FactTable(json.loads(zf.read(info)))
+            cik = int(CIK_MEMBER.match(name).group(1))
+            out.append((name, cik, info.CRC, info.file_size, table.to_bytes(), table.concepts))
+    return out
+
+
+def load_companyfacts(path: str, workers: int) -> dict:
+    with zipfile.ZipFile(path) as zf:
+        todo, stale = _changed(zf, "companyfacts")
+    BULK.drop("companyfacts", stale)
+    names = [i.filename for i in todo]
+    chunks = [names[i : i + FACTS_CHUNK] for i in range(0, len(names), FACTS_CHUNK)]
+    pending: List[tuple] = []
+    # JSON parsing and FactTable builds are CPU-bound; writes stay in this process
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as ex:
+        for rows in ex.map(_facts_job, [path] * len(chunks), chunks):
+            pending.extend(rows)
+            if len(pending) >= BATCH:
+                BULK.put_facts(pending)
+                pending = []
+    if pending:
+        BULK.put_facts(pending)
+    BULK.set_meta("fact_table_version", FACT_TABLE_VERSION)
+    return {"changed": len(todo), "dropped": len(stale)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--submissions", help="path to submissions.zip")
+    ap.add_argument("--companyfacts", help="path to companyfacts.zip")
+    ap.add_argument("--workers", type=int, default=max(1, (multiprocessing.cpu_count() or 2) - 1))
+    args = ap.parse_args(argv)
+    if not args.submissions and not args.companyfacts:
+        ap.error("give --submissions and/or --companyfacts")
+    t0 = time.perf_counter()
+    if args.submissions:
+        print("submissions:", load_submissions(args.submissions), flush=True)
+    if args.companyfacts:
+        print("companyfacts:", load_companyfacts(args.companyfacts, args.workers), flush=True)
+    print(f"store {BULK.path}: {BULK.counts()} in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
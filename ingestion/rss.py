@@ -1,8 +1,280 @@
-async def poll_current_feed(watchlist_ciks: list[str]) -> None:
+import asyncio, json, os, pathlib, re, time
+import xml.etree.ElementTree as ET
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from adapters.accession_index import ACCESSIONS
+from adapters.rate_limit import BACKGROUND, priority
+from adapters.sec_api import INFLIGHT, fetch_conditional
+from adapters.workers import POOL
+from tools.common import DOCS, convert_filing, download_filing
+
+# {form} is filled per polled form type. Point at a local stand-in for tests.
+FEED_URL = os.environ.get(
+    "SEC_MCP_FEED_URL",
+    "https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type={form}&company=&dateb=&owner=include&start=0&count=100&output=atom",
+)
+FEED_FORMS = ("10-K", "10-Q", "8-K")
+POLL_INTERVAL = float(os.environ.get("SEC_MCP_FEED_INTERVAL", "10"))
+STATE_PATH = os.environ.get("SEC_MCP_FEED_STATE", ".cache/feed_state.json")
+# Accessions remembered for dedup; the feed only ever shows the latest 100 per form.
+SEEN_LIMIT = 10000
+QUEUE_SIZE = 64
+DOWNLOADERS = 2
+MAX_ATTEMPTS = 3
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_ACCESSION = re.compile(r"\d{10}-\d{2}-\d{6}")
+_CIK = re.compile(r"\((\d{10})\)")
+
+
+class FeedEntry:
+    __slots__ = ("accession", "cik", "ciks", "form", "filed", "updated")
+
+    def __init__(self, accession: str, cik: int, form: str, filed: str, updated: float):
+        self.accession = accession
+        self.cik = cik  # the first listing's filer, taken as the issuer
+        self.ciks = [cik]  # every filer, reporting owner or subject company listed
+        self.form = form
+        self.filed = filed
+        self.updated = updated
+
+    def to_dict(self) -> dict:
+        return {
+            "accession": self.accession, "cik": self.cik, "ciks": self.ciks, "form": self.form, "filed": self.filed,
+            "updated": self.updated,
+        }
+
+
+def parse_feed(xml: str) -> List[FeedEntry]:
+    """Entries of an EDGAR 'current' Atom feed, newest first as served.
+
+    A filing with several filers is listed once per filer. They become one
+    entry that carries every listed CIK; the first listing is its issuer.
     """
-    TODO: poll EDGAR Atom 'current' feed every 10s, detect new 8-K/10-Q/10-K,
-    enqueue download+parse, write to local cache/db for instant pull results.
+    out, seen = [], {}
+    for e in ET.fromstring(xml).iter(f"{_ATOM}entry"):
+        # id: urn:tag:sec.gov,2008:accession-number=0000320193-24-000123
+        m = _ACCESSION.search(e.findtext(f"{_ATOM}id", ""))
+        # title: 10-K - Apple Inc. (0000320193) (Filer)
+        title = e.findtext(f"{_ATOM}title", "")
+        c = _CIK.search(title)
+        if not m or not c:
+            continue
+        if m.group(0) in seen:
+            ciks = seen[m.group(0)].ciks
+            if int(c.group(1)) not in ciks:
+                ciks.append(int(c.group(1)))
+            continue
+        cat = e.find(f"{_ATOM}category")
+        form = cat.get("term") if cat is not None else title.split(" - ")[0]
+        # updated: 2024-11-01T06:01:36-04:00, Eastern time like EDGAR's filing dates
+        stamp = e.findtext(f"{_ATOM}updated", "")
+        try:
+            updated = datetime.fromisoformat(stamp).timestamp()
+        except ValueError:
+            updated, stamp = time.time(), datetime.now().isoformat()
+        out.append(FeedEntry(m.group(0), int(c.group(1)), form.strip(), stamp[:10], updated))
+        seen[m.group(0)] = out[-1]
+    return out
+
+
+def _percentiles(samples: Iterable[float]) -> dict:
+    s = sorted(samples)
+    if not s:
+        return {}
+    return {"p50": s[len(s) // 2], "p95": s[min(len(s) - 1, int(len(s) * 0.95))], "max": s[-1]}
+
+
+class FeedPipeline:
+    """Poll the current feed and pre-warm the document store for new filings.
+
+    Stages are connected by bounded queues: poll -> download (network, a few
+    concurrent) -> convert (text, spans and sections in the worker pool). When
+    a stage falls behind, its queue fills and the stage before it waits.
+
+    Progress is persisted after every poll and every finished filing: the
+    seen set for dedup and the pending filings, which are re-queued on the
+    next start, so a crash loses nothing and repeats no finished work.
     """
-    pass
 
+    def __init__(
+        self,
+        watchlist: Iterable[str] = (),
+        forms=FEED_FORMS,
+        feed_url: str = FEED_URL,
+        state_path: str = STATE_PATH,
+        interval: float = POLL_INTERVAL,
+    ):
+        self.watchlist = {int(c) for c in watchlist}
+        self.forms = tuple(forms)
+        self.feed_url = feed_url
+        self.state_path = pathlib.Path(state_path)
+        self.interval = interval
+        self.downloads: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        self.conversions: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        self.stats = {"polls": 0, "not_modified": 0, "poll_errors": 0, "new": 0, "done": 0, "failed": 0, "retried": 0}
+        # seconds from the feed's <updated> to detection, and from detection to warm
+        self.lag = {"detect": deque(maxlen=1000), "ingest": deque(maxlen=1000)}
+        self._seen: deque = deque()
+        self._seen_set: set = set()
+        self._pending: Dict[str, dict] = {}
+        self._validators: Dict[str, dict] = {}
+        self._load_state()
+
+    def _load_state(self):
+        try:
+            state = json.loads(self.state_path.read_text())
+        except (OSError, ValueError):
+            return
+        for acc in state.get("seen", []):
+            self._mark_seen(acc)
+        self._pending = state.get("pending", {})
+        self._validators = state.get("validators", {})
+
+    def _save_state(self):
+        state = {"seen": list(self._seen), "pending": self._pending, "validators": self._validators}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(f".{self.state_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state, separators=(",", ":")))
+        os.replace(tmp, self.state_path)
+
+    def _mark_seen(self, accession: str):
+        if accession in self._seen_set:
+            return
+        self._seen.append(accession)
+        self._seen_set.add(accession)
+        while len(self._seen) > SEEN_LIMIT:
+            self._seen_set.discard(self._seen.popleft())
+
+    async def poll_once(self) -> List[FeedEntry]:
+        """Fetch each form's feed once; returns the entries that are new."""
+        fresh = []
+        for form in self.forms:
+            url = self.feed_url.format(form=form)
+            self.stats["polls"] += 1
+            try:
+                xml, self._validators[url] = await fetch_conditional(url, self._validators.get(url))
+            except Exception:
+                self.stats["poll_errors"] += 1
+                continue
+            if xml is None:
+                self.stats["not_modified"] += 1
+                continue
+            try:
+                entries = parse_feed(xml)
+            except ET.ParseError:
+                self.stats["poll_errors"] += 1
+                continue
+            now = time.time()
+            for e in entries:
+                if e.accession in self._seen_set or e.accession in self._pending:
+                    continue
+                if self.watchlist and self.watchlist.isdisjoint(e.ciks):
+                    continue
+                if e.form not in self.forms:
+                    continue
+                self.lag["detect"].append(max(0.0, now - e.updated))
+                self._pending[e.accession] = dict(e.to_dict(), detected=now, attempts=0)
+                fresh.append(e)
+        if fresh:
+            # the feed knows the issuer, which spares resolve_accession a full-index scan
+            await asyncio.to_thread(ACCESSIONS.put_many, [(e.accession, e.cik, e.form, e.filed, None) for e in fresh])
+            self.stats["new"] += len(fresh)
+        self._save_state()
+        for e in sorted(fresh, key=lambda e: e.updated):
+            await self.downloads.put(e.accession)
+        return fresh
+
+    async def _download_stage(self):
+        while True:
+            acc = await self.downloads.get()
+            try:
+                rec = DOCS.get(acc)
+                if not (rec and rec.get("raw")):
+                    rec = await download_filing(acc)
+                await self.conversions.put((acc, rec))
+            except Exception:
+                self._failed(acc)
+            finally:
+                self.downloads.task_done()
+
+    async def _convert_stage(self):
+        while True:
+            acc, rec = await self.conversions.get()
+            try:
+                if not DOCS.has_text(rec):
+                    # same key as tool calls, so a request racing the pipeline shares the work
+                    await INFLIGHT.do(f"doc:{acc}", lambda: convert_filing(acc, rec))
+                self._finished(acc)
+            except Exception:
+                self._failed(acc)
+            finally:
+                self.conversions.task_done()
 
+    def _finished(self, accession: str):
+        item = self._pending.pop(accession, None)
+        if item:
+            self.lag["ingest"].append(time.time() - item["detected"])
+        self._mark_seen(accession)
+        self.stats["done"] += 1
+        self._save_state()
+
+    def _failed(self, accession: str):
+        item = self._pending.get(accession)
+        if item is None:
+            return
+        item["attempts"] += 1
+        if item["attempts"] >= MAX_ATTEMPTS:
+            # give up; the first tool call for it will fetch on demand
+            self._pending.pop(accession)
+            self._mark_seen(accession)
+            self.stats["failed"] += 1
+        else:
+            self.stats["retried"] += 1
+            # put back later without blocking the stage that is draining this queue
+            asyncio.get_running_loop().call_later(
+                self.interval, lambda: asyncio.ensure_future(self.downloads.put(accession))
+            )
+        self._save_state()
+
+    def metrics(self) -> dict:
+        return dict(
+            self.stats,
+            pending=len(self._pending),
+            download_queue=self.downloads.qsize(),
+            convert_queue=self.conversions.qsize(),
+            detect_lag_s=_percentiles(self.lag["detect"]),
+            ingest_lag_s=_percentiles(self.lag["ingest"]),
+        )
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        # everything the pipeline fetches yields to tool calls
+        with priority(BACKGROUND):
+            await self._run(stop or asyncio.Event())
+
+    async def _run(self, stop: asyncio.Event):
+        tasks = [asyncio.ensure_future(self._download_stage()) for _ in range(DOWNLOADERS)]
+        tasks += [asyncio.ensure_future(self._convert_stage()) for _ in range(max(1, POOL.workers))]
+        try:
+            # resume whatever was in flight when the last run stopped
+            for acc in list(self._pending):
+                await self.downloads.put(acc)
+            while not stop.is_set():
+                started = time.monotonic()
+                await self.poll_once()
+                try:
+                    await asyncio.wait_for(stop.wait(), max(0.0, self.interval - (time.monotonic() - started)))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._save_state()
+
+
+async def poll_current_feed(watchlist_ciks: list[str]) -> None:
+    """Poll the EDGAR current feed forever, pre-warming caches for watchlist filings."""
+    await FeedPipeline(watchlist_ciks).run()
@@ -23,11 +23,32 @@ class FinancialsSnapshot(BaseModel):
     cash_flow: dict = Field(default_factory=dict)
     derived: dict = Field(default_factory=dict)  # margins, FCF, ratios
 
+class FinancialsPanel(BaseModel):
+    # one row per (cik, period), values in `columns` order; None when not reported
+    columns: List[str]
+    rows: List[list]
+    errors: Dict[str, str] = Field(default_factory=dict)  # input company -> reason it was skipped
+
+class ScreenResult(BaseModel):
+    period: str
+    frames: List[str]  # calendar frames read, e.g. CY2023 and CY2023Q4I; the fiscal period offline
+    # one row per company: cik, name, then values in `columns` order; None when not reported
+    columns: List[str]
+    rows: List[list]
+    matched: int  # companies passing every filter, before the limit
+    universe: int  # companies reporting any of the concepts read
+
 class ErrorPayload(BaseModel):
     error_code: str
     hint: Optional[str] = None
     retry_after_ms: Optional[int] = None
 
+class BatchItem(BaseModel):
+    index: int  # position in the request
+    key: str  # the input it answers (accession, query)
+    result: Optional[dict] = None
+    error: Optional[ErrorPayload] = None
+
 
 # New schemas for agent-ready pull tools
 class FilingText(BaseModel):
@@ -38,8 +59,25 @@ class FilingText(BaseModel):
     source_url: str
     text: str
     spans: Optional[List[Dict[str, int]]] = None
+    offset: int = 0  # of text within the whole document
+    total_length: Optional[int] = None
+    next_cursor: Optional[str] = None  # pass back as cursor for the next window
 
-SectionName = Literal["MDA", "RiskFactors", "Business", "Footnotes"]
+SectionName = Literal[
+    # 10-K Part I
+    "Business", "RiskFactors", "UnresolvedStaffComments", "Cybersecurity", "Properties", "LegalProceedings",
+    "MineSafetyDisclosures",
+    # 10-K Part II
+    "MarketForEquity", "Reserved", "MDA", "MarketRisk", "FinancialStatements", "ChangesInAccountants",
+    "ControlsAndProcedures", "OtherInformation", "ForeignJurisdictionInspections",
+    # 10-K Parts III-IV
+    "DirectorsAndGovernance", "ExecutiveCompensation", "SecurityOwnership", "RelatedTransactions", "AccountantFees",
+    "Exhibits", "Form10KSummary",
+    # 10-Q Part II only
+    "UnregisteredSales", "DefaultsUponSeniorSecurities",
+    # notes to the financial statements, nested inside FinancialStatements
+    "Footnotes",
+]
 
 class SectionSlice(BaseModel):
     name: SectionName
@@ -47,6 +85,7 @@ class SectionSlice(BaseModel):
     end: int
     heading: Optional[str] = None
     text: str
+    complete: bool = True  # False when a window cut the section short
 
 class FilingSections(BaseModel):
     accession: str
@@ -55,6 +94,30 @@ class FilingSections(BaseModel):
     filed_at: str
     source_url: str
     sections: List[SectionSlice]
+    next_cursor: Optional[str] = None
+
+class TextHit(BaseModel):
+    accession: str
+    cik: str
+    form: str
+    filed: str  # YYYY-MM-DD
+    section: Optional[SectionName] = None  # None outside any recognised section
+    start: int  # matching chunk, as offsets into the filing text
+    end: int
+    score: float  # bm25, higher is better
+    snippet: Optional[str] = None  # None when the text is no longer stored
+    snippet_start: Optional[int] = None
+    matches: List[List[int]] = Field(default_factory=list)  # [start, end) of each term found in the chunk
+
+class TextSearchResult(BaseModel):
+    query: str
+    hits: List[TextHit]
+    indexed_filings: int  # filings read through get_filing_text or get_sections so far
+
+class ModifiedSentence(BaseModel):
+    old: str
+    new: str
+    score: int  # rapidfuzz token_set_ratio, 0-100
 
 class SectionDiff(BaseModel):
     accession_a: str
@@ -66,7 +129,33 @@ class SectionDiff(BaseModel):
     filed_at_b: str
     added: List[str]
     removed: List[str]
+    modified: List[ModifiedSentence] = Field(default_factory=list)
     summary: Optional[str] = None
     source_urls: List[str]
 
+class SentenceEdit(BaseModel):
+    accession: str  # filing in which the new wording first appears
+    old: str
+    new: str
+    score: int
+
+class SentenceHistory(BaseModel):
+    text: str  # wording in the last filing that contains the sentence
+    first_seen: str  # accession
+    last_seen: str  # accession
+    edits: List[SentenceEdit] = Field(default_factory=list)
 
+class HistoryStep(BaseModel):
+    accession_a: str
+    accession_b: str
+    added: int
+    removed: int
+    modified: int
+
+class SectionHistory(BaseModel):
+    cik: str
+    form: str
+    section: SectionName
+    filings: List[Filing]  # oldest first
+    steps: List[HistoryStep]
+    sentences: List[SentenceHistory]
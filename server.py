@@ -1,15 +1,94 @@
-import asyncio
+import asyncio, os
 from mcp.server.fastapi import FastAPIServer
 from mcp.types import Tool, ToolRequest, TextContent
-from schemas.models import ErrorPayload
-from tools.company import find_company_impl
+from starlette.responses import Response
+from adapters import sec_api
+from adapters.bulk_store import OFFLINE
+from adapters.metrics import CONTENT_TYPE, METRICS, instrumented, record_error, stage
+from adapters.workers import POOL
+from tools.company import find_company_impl, search_companies_impl
 from tools.filings import search_filings_impl
-from tools.financials import get_financials_impl
+from tools.financials import get_financials_impl, get_financials_panel_impl
+from tools.screener import screen_companies_impl
 from tools.filing_text import get_filing_text_impl
 from tools.sections import get_sections_impl
-from tools.diff import diff_last_two_impl
+from tools.search import search_text_impl
+from tools.diff import diff_history_impl, diff_last_two_impl
+from tools.batch import error_payload, run_batch
+from ingestion.rss import FeedPipeline
+
+# Comma-separated CIKs whose new 10-K/10-Q/8-K filings are pre-fetched from the current feed.
+WATCHLIST = [c.strip() for c in os.environ.get("SEC_MCP_WATCHLIST", "").split(",") if c.strip()]
 
 server = FastAPIServer("sec-mcp")
+_FEED: dict = {}
+METRICS.collect(
+    "sec_mcp_feed_events_total", "counter", "Current-feed pipeline polls and filings by outcome", ("event",),
+    lambda: [(k, v) for k, v in _FEED["pipeline"].stats.items()] if _FEED else [],
+)
+METRICS.collect(
+    "sec_mcp_feed_lag_seconds", "gauge", "Current-feed lag over recent filings: feed entry to detection, detection to warm",
+    ("stage", "stat"),
+    lambda: [
+        (name, stat, v) for name in ("detect", "ingest") for stat, v in _FEED["pipeline"].metrics()[f"{name}_lag_s"].items()
+    ] if _FEED else [],
+)
+METRICS.collect(
+    "sec_mcp_feed_backlog", "gauge", "Current-feed filings pending and queued per stage", ("queue",),
+    lambda: [(q, _FEED["pipeline"].metrics()[q]) for q in ("pending", "download_queue", "convert_queue")] if _FEED else [],
+)
+
+
+@server.on_event("startup")
+async def _open_upstream():
+    await sec_api.startup()
+    POOL.start()
+    # offline mode never reaches EDGAR, so there is no feed to follow
+    if WATCHLIST and not OFFLINE:
+        _FEED["stop"] = asyncio.Event()
+        _FEED["pipeline"] = FeedPipeline(WATCHLIST)
+        _FEED["task"] = asyncio.ensure_future(_FEED["pipeline"].run(_FEED["stop"]))
+
+
+@server.on_event("shutdown")
+async def _close_upstream():
+    if _FEED:
+        _FEED["stop"].set()
+        await asyncio.gather(_FEED["task"], return_exceptions=True)
+    await sec_api.shutdown()
+    POOL.shutdown()
+
+
+def _error_payload(e: Exception, error_code: str):
+    payload = error_payload(e, error_code)
+    record_error(e, payload.error_code)
+    return [TextContent(type="text", text=payload.model_dump_json())]
+
+
+def _json(model):
+    with stage("serialize"):
+        return [TextContent(type="text", text=model.model_dump_json())]
+
+
+def _window(args: dict) -> dict:
+    return {k: args[k] for k in ("offset", "length", "max_tokens", "cursor") if args.get(k) is not None}
+
+
+async def _batch(keys, fn, error_code: str = "BAD_REQUEST"):
+    # one content block per item, ordered by completion and tagged with its index;
+    # the response itself is sent once the slowest item has finished
+    out = []
+    async for item in run_batch(list(keys), fn, error_code):
+        with stage("serialize"):
+            out.append(TextContent(type="text", text=item.model_dump_json()))
+    return out
+
+
+@server.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint; each server process reports its own series."""
+    return Response(METRICS.render(), media_type=CONTENT_TYPE)
+
 
 @server.tool(
     Tool(
@@ -17,13 +96,22 @@ server = FastAPIServer("sec-mcp")
         description="Resolve a ticker, company name, or CIK to canonical company metadata"
     )
 )
+@instrumented("find_company")
 async def find_company(req: ToolRequest):
     try:
         query = req.arguments["query"]
-        company = await find_company_impl(query)
-        return [TextContent(type="text", text=company.model_dump_json())]
+        limit = req.arguments.get("limit")
+        if limit is None:
+            company = await find_company_impl(query)
+            return _json(company)
+        # Ranked candidates, best first, as JSON lines
+        companies = await search_companies_impl(query, int(limit))
+        if not companies:
+            raise ValueError("Company not found")
+        with stage("serialize"):
+            return [TextContent(type="text", text="\n".join(c.model_dump_json() for c in companies))]
     except Exception as e:
-        return [TextContent(type="text", text=ErrorPayload(error_code="NOT_FOUND", hint=str(e)).model_dump_json())]
+        return _error_payload(e, "NOT_FOUND")
 
 @server.tool(
     Tool(
@@ -31,6 +119,7 @@ async def find_company(req: ToolRequest):
         description="Search filings for a company"
     )
 )
+@instrumented("search_filings")
 async def search_filings(req: ToolRequest):
     try:
         cik = req.arguments["cik"]
@@ -40,10 +129,11 @@ async def search_filings(req: ToolRequest):
         limit = int(req.arguments.get("limit", 10))
         filings = await search_filings_impl(cik, forms, start_date, end_date, limit)
         # Return as JSON lines for easier parsing at scale
-        text = "\n".join(f.model_dump_json() for f in filings)
+        with stage("serialize"):
+            text = "\n".join(f.model_dump_json() for f in filings)
         return [TextContent(type="text", text=text)]
     except Exception as e:
-        return [TextContent(type="text", text=ErrorPayload(error_code="BAD_REQUEST", hint=str(e)).model_dump_json())]
+        return _error_payload(e, "BAD_REQUEST")
 
 @server.tool(
     Tool(
@@ -51,14 +141,51 @@ async def search_filings(req: ToolRequest):
         description="Return structured XBRL financials snapshot"
     )
 )
+@instrumented("get_financials")
 async def get_financials(req: ToolRequest):
     try:
         cik = req.arguments["cik"]
         period = req.arguments["period"]
         snap = await get_financials_impl(cik, period)
-        return [TextContent(type="text", text=snap.model_dump_json())]
+        return _json(snap)
+    except Exception as e:
+        return _error_payload(e, "BAD_REQUEST")
+
+@server.tool(
+    Tool(
+        name="get_financials_panel",
+        description="Return selected XBRL concepts and derived metrics for many companies and periods as one table"
+    )
+)
+@instrumented("get_financials_panel")
+async def get_financials_panel(req: ToolRequest):
+    try:
+        companies = req.arguments["companies"]
+        periods = req.arguments["periods"]
+        concepts = req.arguments.get("concepts")
+        derived = req.arguments.get("derived")
+        panel = await get_financials_panel_impl(companies, periods, concepts, derived)
+        return _json(panel)
+    except Exception as e:
+        return _error_payload(e, "BAD_REQUEST")
+
+@server.tool(
+    Tool(
+        name="screen_companies",
+        description="Filter and rank every XBRL filer by concepts and derived metrics for one calendar period, from the frames API"
+    )
+)
+@instrumented("screen_companies")
+async def screen_companies(req: ToolRequest):
+    try:
+        args = req.arguments
+        result = await screen_companies_impl(
+            args["period"], args.get("filters"), args.get("sort_by"), bool(args.get("descending", True)),
+            int(args.get("limit", 50)), args.get("columns"),
+        )
+        return _json(result)
     except Exception as e:
-        return [TextContent(type="text", text=ErrorPayload(error_code="BAD_REQUEST", hint=str(e)).model_dump_json())]
+        return _error_payload(e, "BAD_REQUEST")
 
 @server.tool(
     Tool(
@@ -66,13 +193,16 @@ async def get_financials(req: ToolRequest):
         description="Return raw text and provenance for a filing by accession"
     )
 )
+@instrumented("get_filing_text")
 async def get_filing_text(req: ToolRequest):
     try:
         accession = req.arguments["accession"]
-        ft = await get_filing_text_impl(accession)
-        return [TextContent(type="text", text=ft.model_dump_json())]
+        ft = await get_filing_text_impl(
+            accession, include_spans=bool(req.arguments.get("include_spans")), **_window(req.arguments)
+        )
+        return _json(ft)
     except Exception as e:
-        return [TextContent(type="text", text=ErrorPayload(error_code="BAD_REQUEST", hint=str(e)).model_dump_json())]
+        return _error_payload(e, "BAD_REQUEST")
 
 @server.tool(
     Tool(
@@ -80,14 +210,33 @@ async def get_filing_text(req: ToolRequest):
         description="Return selected sections for a 10-K or 10-Q filing"
     )
 )
+@instrumented("get_sections")
 async def get_sections(req: ToolRequest):
     try:
         accession = req.arguments["accession"]
         sections = req.arguments.get("sections")
-        fs = await get_sections_impl(accession, sections)
-        return [TextContent(type="text", text=fs.model_dump_json())]
+        fs = await get_sections_impl(accession, sections, **_window(req.arguments))
+        return _json(fs)
+    except Exception as e:
+        return _error_payload(e, "BAD_REQUEST")
+
+@server.tool(
+    Tool(
+        name="search_text",
+        description="Full-text search over filings already read with get_filing_text or get_sections; ranked hits with match offsets"
+    )
+)
+@instrumented("search_text")
+async def search_text(req: ToolRequest):
+    try:
+        args = req.arguments
+        result = await search_text_impl(
+            args["query"], args.get("cik"), args.get("form_types"), args.get("start_date"), args.get("end_date"),
+            args.get("sections"), int(args.get("limit", 10)), int(args.get("per_filing", 3)),
+        )
+        return _json(result)
     except Exception as e:
-        return [TextContent(type="text", text=ErrorPayload(error_code="BAD_REQUEST", hint=str(e)).model_dump_json())]
+        return _error_payload(e, "BAD_REQUEST")
 
 @server.tool(
     Tool(
@@ -95,15 +244,74 @@ async def get_sections(req: ToolRequest):
         description="Diff the requested section across the last two filings of a form"
     )
 )
+@instrumented("diff_last_two")
 async def diff_last_two(req: ToolRequest):
     try:
         cik_or_ticker = req.arguments["cik_or_ticker"]
         form = req.arguments["form"]
         section = req.arguments["section"]
         diff = await diff_last_two_impl(cik_or_ticker, form, section)
-        return [TextContent(type="text", text=diff.model_dump_json())]
+        return _json(diff)
+    except Exception as e:
+        return _error_payload(e, "BAD_REQUEST")
+
+@server.tool(
+    Tool(
+        name="diff_history",
+        description="Track how a section changed across the last N filings of a form, sentence by sentence"
+    )
+)
+@instrumented("diff_history")
+async def diff_history(req: ToolRequest):
+    try:
+        cik_or_ticker = req.arguments["cik_or_ticker"]
+        form = req.arguments["form"]
+        section = req.arguments["section"]
+        count = int(req.arguments.get("count", 5))
+        history = await diff_history_impl(cik_or_ticker, form, section, count)
+        return _json(history)
+    except Exception as e:
+        return _error_payload(e, "BAD_REQUEST")
+
+@server.tool(
+    Tool(
+        name="find_company_batch",
+        description="Resolve many tickers, names, or CIKs at once; one result or error per query"
+    )
+)
+@instrumented("find_company_batch")
+async def find_company_batch(req: ToolRequest):
+    try:
+        return await _batch(req.arguments["queries"], find_company_impl, "NOT_FOUND")
+    except Exception as e:
+        return _error_payload(e, "BAD_REQUEST")
+
+@server.tool(
+    Tool(
+        name="get_filing_text_batch",
+        description="Return text and provenance for many filings; one result or error per accession"
+    )
+)
+@instrumented("get_filing_text_batch")
+async def get_filing_text_batch(req: ToolRequest):
+    try:
+        return await _batch(req.arguments["accessions"], get_filing_text_impl)
+    except Exception as e:
+        return _error_payload(e, "BAD_REQUEST")
+
+@server.tool(
+    Tool(
+        name="get_sections_batch",
+        description="Return selected sections for many 10-K or 10-Q filings; one result or error per accession"
+    )
+)
+@instrumented("get_sections_batch")
+async def get_sections_batch(req: ToolRequest):
+    try:
+        sections = req.arguments.get("sections")
+        return await _batch(req.arguments["accessions"], lambda acc: get_sections_impl(acc, sections))
     except Exception as e:
-        return [TextContent(type="text", text=ErrorPayload(error_code="BAD_REQUEST", hint=str(e)).model_dump_json())]
+        return _error_payload(e, "BAD_REQUEST")
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,70 @@
+import hashlib, os, pathlib, sys, tempfile
+from types import SimpleNamespace
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+# modules import each other from the repository root, as when server.py runs
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# module-level stores open under .cache/ in the working directory
+os.chdir(tempfile.mkdtemp(prefix="sec-mcp-tests-"))
+# CPU-bound jobs run on the thread executor instead of spawned workers
+os.environ.setdefault("SEC_MCP_WORKERS", "0")
+
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def store_filing():
+    """Put a converted filing (plain text plus section offsets) in the shared document store."""
+    from adapters.docstore import text_checkpoints
+    from tools.common import DOCS
+    from tools.sectioner import SECTIONER_VERSION
+
+    def put(accession: str, text: str, sections: dict, form: str = "10-K", cik: str = "0000320193"):
+        meta = {
+            "accession": accession, "cik": cik, "form": form, "filed_at": "2024-02-01T00:00:00Z",
+            "doc_url": f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{accession.replace('-', '')}/doc.htm",
+        }
+        objects = DOCS.objects
+        DOCS.attach_text(
+            accession, objects.put_plain(text.encode("utf-8")), objects.put(text_checkpoints(text).tobytes()), len(text), meta
+        )
+        return DOCS.put_sections(accession, sections, SECTIONER_VERSION)
+
+    return put
+
+
+@pytest.fixture
+def edgar(tmp_path, monkeypatch):
+    """Files under tmp_path served as EDGAR through the shared client: put(path, body) adds one, requests logs each GET."""
+    from adapters import sec_api
+
+    root = tmp_path / "edgar"
+    requests = []
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        fp = root / request.url.path.lstrip("/")
+        if not fp.is_file():
+            return httpx.Response(404, text="Not Found")
+        body = fp.read_bytes()
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=body, headers={"ETag": etag})
+
+    monkeypatch.setattr(
+        sec_api, "_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(respond), headers={"User-Agent": sec_api.USER_AGENT})
+    )
+
+    def put(path: str, body: str):
+        fp = root / path
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fp.write_text(body)
+
+    def count(prefix: str) -> int:
+        return sum(r.url.path.startswith(prefix) for r in requests)
+
+    return SimpleNamespace(put=put, requests=requests, count=count)
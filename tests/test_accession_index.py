@@ -0,0 +1,114 @@
+import asyncio, json, time
+from datetime import datetime
+
+import pytest
+
+import tools.common
+import tools.filings
+from adapters.accession_index import OPEN_QUARTER_TTL, AccessionIndex, parse_master_index
+from adapters.rate_limit import UpstreamThrottled
+
+MASTER = """Description:           Master Index of EDGAR Dissemination Feed
+Last Data Received:    March 31, 2024
+Comments:              webmaster@sec.gov
+Anonymous FTP:         ftp://ftp.sec.gov/edgar/
+
+CIK|Company Name|Form Type|Date Filed|Filename
+--------------------------------------------------------------------------------
+320193|Apple Inc.|10-Q|2024-02-02|edgar/data/320193/0000320193-24-000006.txt
+789019|MICROSOFT CORP|8-K|2024-01-30|edgar/data/789019/0001193125-24-019071.txt
+1018724|AMAZON COM INC|4|2024-03-01|edgar/data/1018724/0001127602-24-008010.txt
+789019|MICROSOFT CORP|8-K|2024-01-30|edgar/data/789019/0001193125-24-019071.txt
+malformed line
+"""
+
+
+def test_master_index_parse_and_lookup(tmp_path):
+    assert next(parse_master_index(MASTER)) == ("0000320193-24-000006", 320193, "10-Q", "2024-02-02")
+    idx = AccessionIndex(tmp_path / "accessions.sqlite")
+    idx.load_quarter(2024, 1, MASTER)
+    # agent-filed: the accession prefix is the agent, the row carries the issuer
+    assert idx.get("0001193125-24-019071") == {
+        "accession": "0001193125-24-019071", "cik": 789019, "form": "8-K", "filed": "2024-01-30", "primary_doc": None,
+    }
+    assert idx.get("0000000000-24-000000") is None
+    assert idx.has_quarter(2024, 1) and not idx.has_quarter(2024, 2)
+
+
+def test_open_quarter_expires(tmp_path):
+    idx = AccessionIndex(tmp_path / "accessions.sqlite")
+    now = datetime.now()
+    current = (now.year, (now.month - 1) // 3 + 1)
+    idx.load_quarter(*current, MASTER)
+    assert idx.has_quarter(*current)
+    idx.db.execute("UPDATE quarters SET loaded_at = ?", (time.time() - OPEN_QUARTER_TTL - 1,))
+    assert not idx.has_quarter(*current)
+    # a closed quarter loaded well after its end never expires
+    idx.load_quarter(2020, 1, MASTER)
+    idx.db.execute("UPDATE quarters SET loaded_at = ? WHERE year = 2020", (datetime(2020, 6, 1).timestamp(),))
+    assert idx.has_quarter(2020, 1)
+
+
+def test_quarter_load_does_not_hide_throttling(monkeypatch, tmp_path):
+    async def throttled(url):
+        raise UpstreamThrottled(2000)
+
+    monkeypatch.setattr(tools.common, "ACCESSIONS", AccessionIndex(tmp_path / "accessions.sqlite"))
+    monkeypatch.setattr(tools.common, "fetch_text", throttled)
+    with pytest.raises(UpstreamThrottled):
+        asyncio.run(tools.common._load_quarter_indexes("0001193125-20-000001", 2020))
+
+
+def test_event_loop_writes_do_not_wait_on_a_quarter_load(monkeypatch, tmp_path):
+    import threading
+
+    idx = AccessionIndex(tmp_path / "accessions.sqlite")
+    monkeypatch.setattr(tools.filings, "ACCESSIONS", idx)
+    held, release = threading.Event(), threading.Event()
+
+    def quarter_load():
+        # stands in for a long load_quarter transaction in its worker thread
+        with idx._lock:
+            held.set()
+            release.wait(5)
+
+    async def run():
+        worker = threading.Thread(target=quarter_load)
+        worker.start()
+        held.wait(5)
+        cols = {"accessionNumber": ["0000320193-24-000006"], "form": ["10-Q"], "filingDate": ["2024-02-02"], "primaryDocument": ["q.htm"]}
+        record = asyncio.ensure_future(tools.filings._record("0000320193", cols))
+        ticks = 0
+        while not record.done() and ticks < 5:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+        await record
+        worker.join()
+        return ticks
+
+    assert asyncio.run(run()) == 5
+    assert idx.get("0000320193-24-000006")["primary_doc"] == "q.htm"
+
+
+def test_agent_filed_accession_resolves_through_the_full_index(edgar, monkeypatch, tmp_path):
+    idx = AccessionIndex(tmp_path / "accessions.sqlite")
+    monkeypatch.setattr(tools.common, "ACCESSIONS", idx)
+    monkeypatch.setattr(tools.filings, "ACCESSIONS", idx)
+    # the agent's own submissions do not list filings made for clients; the issuer's do
+    edgar.put("submissions/CIK0001193125.json", json.dumps({"cik": "1193125", "filings": {"recent": {}}}))
+    edgar.put("Archives/edgar/full-index/2020/QTR1/master.idx", MASTER.split("---")[0])
+    edgar.put("Archives/edgar/full-index/2020/QTR2/master.idx", MASTER.replace("2024-01-30", "2020-05-04").replace("-24-019071", "-20-000111"))
+    recent = {"accessionNumber": ["0001193125-20-000111"], "form": ["8-K"], "filingDate": ["2020-05-04"], "primaryDocument": ["d8k.htm"]}
+    edgar.put("submissions/CIK0000789019.json", json.dumps({"cik": "789019", "filings": {"recent": recent}}))
+
+    row = asyncio.run(tools.common.resolve_accession("0001193125-20-000111"))
+    assert (row["cik"], row["form"], row["primary_doc"]) == (789019, "8-K", "d8k.htm")
+    paths = [r.url.path for r in edgar.requests]
+    assert paths[0] == "/submissions/CIK0001193125.json"
+    # the lookup stopped at the quarter that held the accession
+    assert "/Archives/edgar/full-index/2020/QTR2/master.idx" in paths
+    assert not any("QTR3" in p for p in paths)
+    # later lookups are one index probe
+    asyncio.run(tools.common.resolve_accession("0001193125-20-000111"))
+    assert len(edgar.requests) == len(paths)
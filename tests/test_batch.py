@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from adapters.rate_limit import PREFETCH, current_lane
+from schemas.models import Company
+from tools.batch import MAX_BATCH, run_batch
+
+
+def test_items_arrive_as_they_finish_and_fail_alone():
+    delays = {"slow": 0.05, "fast": 0.0, "bad": 0.01}
+    lanes = []
+
+    async def fn(key):
+        lanes.append(current_lane())
+        await asyncio.sleep(delays[key])
+        if key == "bad":
+            raise ValueError("Company not found")
+        return Company(cik="0000000001", name=key)
+
+    async def collect():
+        return [item async for item in run_batch(["slow", "fast", "bad"], fn)]
+
+    items = asyncio.run(collect())
+    assert [i.key for i in items] == ["fast", "bad", "slow"]
+    assert [i.index for i in items] == [1, 2, 0]
+    assert items[0].result["name"] == "fast" and items[0].error is None
+    assert items[1].error.error_code == "BAD_REQUEST" and items[1].result is None
+    assert set(lanes) == {PREFETCH}
+
+
+def test_oversized_batch_is_rejected():
+    async def collect():
+        return [item async for item in run_batch(["x"] * (MAX_BATCH + 1), asyncio.sleep)]
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect())
@@ -0,0 +1,67 @@
+import asyncio, json, threading
+
+import httpx
+
+from adapters import sec_api
+from bench import fixtures, suite
+from bench.standin import StandIn
+
+
+def _synth(tmp_path):
+    out = tmp_path / "fixtures"
+    fixtures.synth(out, companies=2, years=2, doc_kb=20, universe=20, facts_filler=5, seed=7)
+    return out
+
+
+def _serve(root, **limits):
+    srv = StandIn(("127.0.0.1", 0), root, 0.0, 0.0, limits.get("throttle", 0.0), limits.get("max_rps", 0.0))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+
+def test_standin_answers_for_both_edgar_hosts(tmp_path, monkeypatch):
+    root = _synth(tmp_path)
+    manifest = json.loads((root / "manifest.json").read_text())
+    cik10 = manifest["companies"][0]["cik"]
+    srv, base = _serve(root)
+    monkeypatch.setattr(sec_api, "UPSTREAM", base)
+    # each test runs its own event loop; the pooled client belongs to the previous one
+    monkeypatch.setattr(sec_api, "_CLIENT", None)
+
+    async def run():
+        try:
+            subs = await sec_api.fetch_json(
+                f"https://data.sec.gov/submissions/CIK{cik10}.json", cache_key=f"bench_subs_{cik10}", cache_ttl=0
+            )
+            tickers = await sec_api.fetch_text("https://www.sec.gov/files/company_tickers.json")
+            return subs, tickers
+        finally:
+            await sec_api.shutdown()
+
+    subs, tickers = asyncio.run(run())
+    assert subs["cik"].lstrip("0") == cik10.lstrip("0") and tickers
+    assert srv.counts["families"] == {"subs": 1, "company_tickers": 1}
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_standin_throttles_like_edgar(tmp_path):
+    srv, base = _serve(_synth(tmp_path), max_rps=1.0)
+    with httpx.Client() as client:
+        codes = [client.get(f"{base}/files/company_tickers.json").status_code for _ in range(3)]
+        stats = client.get(f"{base}/__stats").json()
+    srv.shutdown()
+    srv.server_close()
+    assert codes[0] == 200 and 429 in codes
+    assert stats["status"]["429"] == codes.count(429)
+
+
+def test_suite_runs_every_phase(tmp_path):
+    root, out = _synth(tmp_path), tmp_path / "results.json"
+    args = ["--fixtures", str(root), "--requests", "6", "--concurrency", "2", "--latency-ms", "0", "--jitter-ms", "0"]
+    assert suite.main(args + ["--workers", "0", "--out", str(out)]) == 0
+    phases = json.loads(out.read_text())["phases"]
+    assert set(phases) == set(suite.PHASES)
+    assert not phases["cold"]["errors"] and phases["cold"]["upstream"]["requests"] > 0
+    # the warm phase repeats the cold calls and is answered from the caches
+    assert phases["warm"]["upstream"]["requests"] == 0
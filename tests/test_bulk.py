@@ -0,0 +1,81 @@
+import asyncio, json, zipfile
+
+import pytest
+
+import ingestion.bulk
+import tools.company, tools.filings, tools.financials
+from adapters.bulk_store import BulkStore
+from tools.company import find_company_impl
+from tools.filings import search_filings_impl
+from tools.financials import FACT_TABLE_VERSION, FactTable, get_financials_impl
+
+SUBMISSIONS = {
+    "cik": "80", "name": "Offline Corp", "tickers": ["OFFL"],
+    "filings": {
+        "recent": {
+            "accessionNumber": ["0000000080-24-000002"], "form": ["10-K"], "filingDate": ["2024-02-01"],
+            "primaryDocument": ["off-2023.htm"],
+        },
+        "files": [{"name": "CIK0000000080-submissions-001.json", "filingFrom": "2020-01-01", "filingTo": "2020-12-31"}],
+    },
+}
+SHARD = {"accessionNumber": ["0000000080-20-000001"], "form": ["10-K"], "filingDate": ["2020-02-01"], "primaryDocument": ["off-2019.htm"]}
+
+
+def _facts(revenue: int) -> dict:
+    row = {"val": revenue, "start": "2023-01-01", "end": "2023-12-31", "fy": 2023, "fp": "FY", "form": "10-K", "filed": "2024-02-01"}
+    return {"cik": 80, "facts": {"us-gaap": {"Revenues": {"units": {"USD": [row]}}}}}
+
+
+def _zip(path, members: dict):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, doc in members.items():
+            zf.writestr(name, json.dumps(doc))
+    return str(path)
+
+
+@pytest.fixture
+def bulk(tmp_path, monkeypatch):
+    store = BulkStore(tmp_path / "bulk.sqlite")
+    monkeypatch.setattr(ingestion.bulk, "BULK", store)
+    for mod in (tools.company, tools.filings, tools.financials):
+        monkeypatch.setattr(mod, "BULK", store)
+        monkeypatch.setattr(mod, "OFFLINE", True)
+    monkeypatch.setattr(tools.company, "_INDEX", None)
+    ingestion.bulk.load_submissions(_zip(
+        tmp_path / "submissions.zip",
+        {"CIK0000000080.json": SUBMISSIONS, "CIK0000000080-submissions-001.json": SHARD},
+    ))
+    ingestion.bulk.load_companyfacts(_zip(tmp_path / "companyfacts.zip", {"CIK0000000080.json": _facts(500)}), workers=1)
+    return store
+
+
+def test_offline_tools_answer_from_the_store(bulk, edgar):
+    company = asyncio.run(find_company_impl("OFFL"))
+    assert (company.cik, company.name) == ("0000000080", "Offline Corp")
+    filings = asyncio.run(search_filings_impl("80", ["10-K"], "2019-01-01", None, 10))
+    # the history shard is read from the store as well
+    assert [f.accession for f in filings] == ["0000000080-24-000002", "0000000080-20-000001"]
+    assert asyncio.run(get_financials_impl("80", "FY2023")).income_statement["Revenue"] == 500
+    assert edgar.requests == []
+
+
+def test_reload_rewrites_only_changed_members(bulk, tmp_path):
+    path = _zip(tmp_path / "companyfacts.zip", {"CIK0000000080.json": _facts(500)})
+    assert ingestion.bulk.load_companyfacts(path, workers=1) == {"changed": 0, "dropped": 0}
+    path = _zip(tmp_path / "companyfacts.zip", {"CIK0000000080.json": _facts(650)})
+    assert ingestion.bulk.load_companyfacts(path, workers=1) == {"changed": 1, "dropped": 0}
+    assert asyncio.run(get_financials_impl("80", "FY2023")).income_statement["Revenue"] == 650
+    path = _zip(tmp_path / "submissions.zip", {"CIK0000000080.json": SUBMISSIONS})
+    assert ingestion.bulk.load_submissions(path) == {"changed": 0, "dropped": 1}
+
+
+def test_tables_from_an_older_fact_table_are_rebuilt(bulk, tmp_path, monkeypatch):
+    path = _zip(tmp_path / "companyfacts.zip", {"CIK0000000080.json": _facts(500)})
+    # written by a FactTable whose row selection has since changed
+    bulk.set_meta("fact_table_version", FACT_TABLE_VERSION - 1)
+    assert ingestion.bulk.load_companyfacts(path, workers=1) == {"changed": 1, "dropped": 0}
+    assert bulk.meta("fact_table_version") == FACT_TABLE_VERSION
+    monkeypatch.setattr(tools.financials, "FACT_TABLE_VERSION", FACT_TABLE_VERSION + 1)
+    with pytest.raises(ValueError, match="reload"):
+        FactTable.from_bytes(bulk.facts_blob(80))
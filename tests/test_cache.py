@@ -0,0 +1,51 @@
+import time
+
+from adapters.cache import TieredCache
+
+FACTS = {"facts": {"us-gaap": {"Revenues": {"units": {"USD": [{"val": 1, "fy": 2023}]}}}}}
+
+
+def test_memory_hits_return_the_decoded_object(tmp_path):
+    cache = TieredCache(tmp_path)
+    cache.set("facts_0000000001", {"url": "u"}, FACTS)
+    assert cache.get("facts_0000000001", {"url": "u"}, 60) is FACTS
+    assert cache.stats["facts"]["memory_hits"] == 1
+
+
+def test_disk_tier_outlives_the_process(tmp_path):
+    TieredCache(tmp_path).set("subs_0000000001", {"url": "u"}, {"name": "Example"})
+    cache = TieredCache(tmp_path)
+    assert cache.get("subs_0000000001", {"url": "u"}, 60) == {"name": "Example"}
+    assert cache.get("subs_0000000001", {"url": "u"}, 60) == {"name": "Example"}
+    assert (cache.stats["subs"]["disk_hits"], cache.stats["subs"]["memory_hits"]) == (1, 1)
+    # expired for this caller, though still on disk
+    assert cache.get("subs_0000000001", {"url": "u"}, -1) is None
+    assert cache.stats["subs"]["stale"] == 1
+
+
+def test_reload_sees_another_process_write(tmp_path):
+    cache, other = TieredCache(tmp_path), TieredCache(tmp_path)
+    cache.set("subs_0000000001", {"url": "u"}, {"name": "Old"})
+    ts = cache.lookup("subs_0000000001", {"url": "u"}).ts
+    assert cache.reload("subs_0000000001", {"url": "u"}, ts) is None
+    time.sleep(0.01)
+    other.set("subs_0000000001", {"url": "u"}, {"name": "New"})
+    assert cache.reload("subs_0000000001", {"url": "u"}, ts).data == {"name": "New"}
+    assert cache.get("subs_0000000001", {"url": "u"}, 60) == {"name": "New"}
+
+
+def test_tiers_evict_least_recently_used_within_their_budgets(tmp_path):
+    cache = TieredCache(tmp_path, memory_bytes=150, disk_bytes=10**6)
+    big = {"text": "x" * 60}
+    for cik in (1, 2, 3):
+        cache.set(f"subs_{cik:010d}", {}, big)
+    assert cache.stats["subs"]["memory_evictions"] == 1
+    # the evicted entry comes back from disk
+    assert cache.get("subs_0000000001", {}, 60) == big
+    assert cache.stats["subs"]["disk_hits"] == 1
+
+    sizes = [fp.stat().st_size for fp in tmp_path.glob("*.json.z")]
+    small = TieredCache(tmp_path, disk_bytes=sum(sizes) - 1)
+    assert len(list(tmp_path.glob("*.json.z"))) == 2
+    assert small.stats["subs"]["disk_evictions"] == 1
+    assert not list(tmp_path.glob(".*.tmp"))
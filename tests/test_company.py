@@ -0,0 +1,47 @@
+import asyncio, json
+
+import pytest
+
+from adapters import sec_api
+from adapters.cache import TieredCache
+from tools import company
+from tools.company import CompanyIndex, find_company_impl, search_companies_impl
+
+TICKERS = {
+    "0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+    "1": {"cik_str": 1418121, "ticker": "APLE", "title": "Apple Hospitality REIT, Inc."},
+    "2": {"cik_str": 789019, "ticker": "MSFT", "title": "MICROSOFT CORP"},
+    "3": {"cik_str": 1652044, "ticker": "GOOGL", "title": "Alphabet Inc."},
+    "4": {"cik_str": 1018724, "ticker": "AMZN", "title": "AMAZON COM INC"},
+}
+
+
+@pytest.fixture
+def tickers(edgar, tmp_path, monkeypatch):
+    monkeypatch.setattr(sec_api, "CACHE", TieredCache(tmp_path / "cache"))
+    monkeypatch.setattr(company, "_INDEX", None)
+    edgar.put("files/company_tickers.json", json.dumps(TICKERS))
+    return edgar
+
+
+def test_exact_name_outranks_longer_prefix_matches():
+    idx = CompanyIndex(TICKERS)
+    ranked = [idx.records[i]["ticker"] for i, _ in idx.search("apple", k=2)]
+    assert ranked == ["AAPL", "APLE"]
+    assert idx.records[idx.search("microsoft")[0][0]]["ticker"] == "MSFT"
+    assert idx.search("!!!") == []
+
+
+def test_ticker_and_cik_lookups_come_first(tickers):
+    assert asyncio.run(find_company_impl("googl")).cik == "0001652044"
+    assert asyncio.run(find_company_impl("789019")).ticker == "MSFT"
+    found = asyncio.run(search_companies_impl("apple", limit=5))
+    assert [c.ticker for c in found] == ["AAPL", "APLE"]
+    with pytest.raises(ValueError):
+        asyncio.run(find_company_impl("zzzzqqq"))
+
+
+def test_index_is_built_once_per_refresh_of_the_file(tickers):
+    first = asyncio.run(company.company_index())
+    assert asyncio.run(company.company_index()) is first
+    assert tickers.count("/files/") == 1
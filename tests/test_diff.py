@@ -0,0 +1,38 @@
+import asyncio, json
+
+from tools.diff import diff_history_impl
+
+YEARS = {
+    "2022": "We sell phones in many markets. Supply risk is high.",
+    "2023": "We sell phones and tablets in many markets. Supply risk is high.",
+    "2024": "We sell phones and tablets in many markets around the world. Interest rates may rise.",
+}
+
+
+def _put_10ks(edgar, cik: int):
+    recent = {"accessionNumber": [], "form": [], "filingDate": [], "primaryDocument": []}
+    for n, (year, body) in enumerate(sorted(YEARS.items(), reverse=True)):
+        acc = f"{cik:010d}-{year[2:]}-00000{n + 1}"
+        recent["accessionNumber"].append(acc)
+        recent["form"].append("10-K")
+        recent["filingDate"].append(f"{year}-02-01")
+        recent["primaryDocument"].append("10k.htm")
+        doc = f"<html><body><p>Item 1A. Risk Factors</p><p>{body}</p><p>Item 1B. Unresolved Staff Comments</p></body></html>"
+        edgar.put(f"Archives/edgar/data/{cik}/{acc.replace('-', '')}/10k.htm", doc)
+    edgar.put(f"submissions/CIK{cik:010d}.json", json.dumps({"cik": str(cik), "filings": {"recent": recent}}))
+
+
+def test_history_chains_the_section_across_filings(edgar):
+    _put_10ks(edgar, 70)
+    history = asyncio.run(diff_history_impl("70", "10-K", "RiskFactors", count=3))
+    assert [f.filed for f in history.filings] == ["2022-02-01", "2023-02-01", "2024-02-01"]
+    assert [(s.added, s.removed, s.modified) for s in history.steps] == [(0, 0, 1), (1, 1, 1)]
+    phones = next(s for s in history.sentences if "We sell" in s.text)
+    assert phones.first_seen == history.filings[0].accession and len(phones.edits) == 2
+    supply = next(s for s in history.sentences if "Supply" in s.text)
+    assert supply.last_seen == history.filings[1].accession
+
+    # sentences and fingerprints are stored per filing; a repeat fetches nothing
+    fetched = len(edgar.requests)
+    asyncio.run(diff_history_impl("70", "10-K", "RiskFactors", count=3))
+    assert len(edgar.requests) == fetched
@@ -0,0 +1,109 @@
+import asyncio, os, pathlib, time
+from array import array
+
+from adapters.docstore import GC_GRACE, DocStore, text_checkpoints
+from tools.filing_text import get_filing_text_impl
+from tools.sections import get_sections_impl
+
+SUBMISSIONS = '{"cik": "46", "filings": {"recent": {"accessionNumber": ["0000000046-24-000001"], "form": ["10-K"], "filingDate": ["2024-02-01"], "primaryDocument": ["ex-10k.htm"]}}}'
+DOC = "<html><body><p>Item 1A. Risk Factors</p><p>We depend on suppliers.</p></body></html>"
+
+
+def test_repeat_reads_of_a_filing_touch_no_network(edgar):
+    edgar.put("submissions/CIK0000000046.json", SUBMISSIONS)
+    edgar.put("Archives/edgar/data/46/000000004624000001/ex-10k.htm", DOC)
+
+    async def run():
+        first = await get_filing_text_impl("0000000046-24-000001")
+        again = await get_filing_text_impl("0000000046-24-000001")
+        sections = await get_sections_impl("0000000046-24-000001", ["RiskFactors"])
+        return first, again, sections
+
+    first, again, sections = asyncio.run(run())
+    assert first.text == again.text and "We depend on suppliers." in first.text
+    assert [s.name for s in sections.sections] == ["RiskFactors"]
+    assert len(edgar.requests) == 2  # submissions and the document, once each
+
+
+TEXT = "ITEM 1A. RISK FACTORS\nWe depend on suppliers.\n" * 50
+
+
+def _convert(store: DocStore, accession: str) -> dict:
+    # what a conversion worker hands back: blobs already in the object store
+    objects = store.objects
+    return store.attach_text(
+        accession,
+        objects.put_plain((accession + TEXT).encode()),
+        objects.put(text_checkpoints(accession + TEXT).tobytes()),
+        len(accession + TEXT),
+        spans=objects.put(array("q", [int(accession[:10])]).tobytes()),
+        sections=({"RiskFactors": {"start": 0, "end": 20}}, 3),
+    )
+
+
+def _age(store: DocStore):
+    stale = time.time() - GC_GRACE - 60
+    for fp in store.objects.root.glob("*/*.[zu]"):
+        os.utime(fp, (stale, stale))
+
+
+def test_eviction_keeps_blobs_not_yet_referenced(tmp_path):
+    store = DocStore(tmp_path, max_bytes=1)
+    _convert(store, "0000000001-24-000001")
+    # a worker has written the next filing's text but its record is not saved yet
+    pending = store.objects.put_plain(b"not referenced yet")[0]
+    rec = _convert(store, "0000000002-24-000002")
+    assert store.stats["evictions"] == 1
+    assert store.objects.plain_path(pending).exists()
+    assert store.has_text(rec) and store.load_spans(rec) is not None
+    assert store.load_sections(rec, 3) == {"RiskFactors": {"start": 0, "end": 20}}
+
+
+def test_garbage_past_the_grace_period_is_collected(tmp_path):
+    store = DocStore(tmp_path, max_bytes=1)
+    old = _convert(store, "0000000001-24-000001")
+    _age(store)
+    _convert(store, "0000000002-24-000002")
+    assert not store.objects.plain_path(old["text"]).exists()
+    assert not store.objects.path(old["spans"]).exists()
+
+
+def test_eviction_collects_garbage_without_scanning_the_store(tmp_path, monkeypatch):
+    store = DocStore(tmp_path, max_bytes=1)
+    old = store.attach("0000000001-24-000001", "raw", *store.objects.put(b"<html>exhibit</html>"))
+    _age(store)
+    reads = []
+
+    def no_glob(*args):
+        raise AssertionError("eviction scanned the store")
+
+    read_text = pathlib.Path.read_text
+    monkeypatch.setattr(pathlib.Path, "glob", no_glob)
+    monkeypatch.setattr(pathlib.Path, "read_text", lambda fp, *a: reads.append(fp.stem) or read_text(fp, *a))
+    rec = _convert(store, "0000000002-24-000002")
+    assert store.stats["evictions"] == 1
+    assert not store.objects.path(old["raw"]).exists()
+    assert store.has_text(rec)
+    # only the record being saved is read back
+    assert set(reads) == {"0000000002-24-000002"}
+
+
+def test_shared_blob_outlives_the_first_record_evicted(tmp_path):
+    store = DocStore(tmp_path, max_bytes=10**9)
+    first = store.attach("0000000001-24-000001", "raw", *store.objects.put(b"<html>same exhibit</html>"))
+    store.attach("0000000002-24-000002", "raw", *store.objects.put(b"<html>same exhibit</html>"))
+    _age(store)
+    store.max_bytes = store._sizes["0000000002-24-000002"]
+    store._evict()
+    assert store.stats["evictions"] == 1
+    assert store.load_raw(first) == "<html>same exhibit</html>"
+
+
+def test_orphans_past_the_grace_period_are_collected_at_startup(tmp_path):
+    store = DocStore(tmp_path)
+    rec = _convert(store, "0000000001-24-000001")
+    orphan = store.objects.put(b"conversion whose record was never saved")[0]
+    _age(store)
+    store = DocStore(tmp_path)
+    assert not store.objects.path(orphan).exists()
+    assert store.has_text(store.get("0000000001-24-000001")) and store.load_spans(rec) is not None
@@ -0,0 +1,103 @@
+import asyncio, json
+
+import pytest
+
+from ingestion.rss import FeedPipeline, parse_feed
+from tools.common import DOCS
+from tools.filings import load_history
+
+DOC = "<html><body><p>ITEM 1A. RISK FACTORS</p><p>We depend on third-party suppliers.</p></body></html>"
+FEED = """<?xml version="1.0" encoding="ISO-8859-1" ?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<entry>
+<title>10-K - Example Corp ({cik:010d}) (Filer)</title>
+<category scheme="https://www.sec.gov/" label="form type" term="10-K"/>
+<id>urn:tag:sec.gov,2008:accession-number={acc}</id>
+<updated>2024-11-01T06:01:36-04:00</updated>
+</entry>
+</feed>
+"""
+INDEX = """<html><body><table class="tableFile" summary="Document Format Files">
+<tr><th>Seq</th><th>Description</th><th>Document</th><th>Type</th></tr>
+<tr><td>1</td><td>10-K</td><td><a href="/ix?doc=/Archives/edgar/data/{cik}/{nodash}/{doc}">{doc}</a></td><td>10-K</td></tr>
+<tr><td></td><td>Complete submission text file</td><td><a href="/Archives/edgar/data/{cik}/{nodash}/{acc}.txt">{acc}.txt</a></td></tr>
+</table></body></html>"""
+
+
+def _submissions(cik: int, rows):
+    cols = {"accessionNumber": [], "filingDate": [], "form": [], "primaryDocument": []}
+    for acc, doc in rows:
+        for k, v in zip(cols, (acc, "2024-11-01", "10-K", doc)):
+            cols[k].append(v)
+    return json.dumps({"cik": str(cik), "name": "Example Corp", "filings": {"recent": cols, "files": []}})
+
+
+async def _drain(pipeline: FeedPipeline, timeout: float = 20.0):
+    stop = asyncio.Event()
+    task = asyncio.ensure_future(pipeline.run(stop))
+    deadline = asyncio.get_running_loop().time() + timeout
+    while pipeline.stats["done"] + pipeline.stats["failed"] < 1 and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.05)
+    stop.set()
+    await task
+
+
+@pytest.mark.parametrize("listed", [True, False], ids=["submissions-revalidated", "index-page"])
+def test_feed_warms_a_filing_missing_from_cached_submissions(edgar, tmp_path, listed):
+    cik = 111111 if listed else 222222
+    acc = f"{cik:010d}-24-000123"
+    nodash, doc = acc.replace("-", ""), "example-20240928.htm"
+    edgar.put(f"submissions/CIK{cik:010d}.json", _submissions(cik, [(f"{cik:010d}-24-000001", "old.htm")]))
+    edgar.put("cgi-bin/browse-edgar", FEED.format(cik=cik, acc=acc))
+    edgar.put(f"Archives/edgar/data/{cik}/{nodash}/{doc}", DOC)
+    edgar.put(f"Archives/edgar/data/{cik}/{nodash}/{acc}-index.htm", INDEX.format(cik=cik, nodash=nodash, acc=acc, doc=doc))
+
+    async def run():
+        # the issuer's submissions are cached before the filing exists
+        await load_history(f"{cik:010d}")
+        if listed:
+            edgar.put(f"submissions/CIK{cik:010d}.json", _submissions(cik, [(f"{cik:010d}-24-000001", "old.htm"), (acc, doc)]))
+        pipeline = FeedPipeline([str(cik)], forms=("10-K",), state_path=str(tmp_path / "state.json"), interval=0.05)
+        await _drain(pipeline)
+        return pipeline.metrics()
+
+    stats = asyncio.run(run())
+    assert stats["done"] == 1 and stats["failed"] == 0
+    rec = DOCS.get(acc)
+    assert rec["meta"]["doc_url"].endswith(f"/{nodash}/{doc}")
+    assert "third-party suppliers" in DOCS.load_text(rec)
+    assert "RiskFactors" in rec["sections"]["offsets"]
+    assert stats["detect_lag_s"] and stats["ingest_lag_s"]
+
+
+MULTI = """<?xml version="1.0" encoding="ISO-8859-1" ?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<entry>
+<title>8-K - Parent Holdings Inc (0000333333) (Filer)</title>
+<category scheme="https://www.sec.gov/" label="form type" term="8-K"/>
+<id>urn:tag:sec.gov,2008:accession-number=0000333333-24-000007</id>
+<updated>2024-11-01T16:05:12-04:00</updated>
+</entry>
+<entry>
+<title>8-K - Operating Subsidiary LLC (0000444444) (Filer)</title>
+<category scheme="https://www.sec.gov/" label="form type" term="8-K"/>
+<id>urn:tag:sec.gov,2008:accession-number=0000333333-24-000007</id>
+<updated>2024-11-01T16:05:12-04:00</updated>
+</entry>
+</feed>
+"""
+
+
+def test_co_registrant_filings_match_any_listed_filer(edgar, tmp_path):
+    (entry,) = parse_feed(MULTI)
+    assert (entry.accession, entry.cik, entry.ciks) == ("0000333333-24-000007", 333333, [333333, 444444])
+
+    edgar.put("cgi-bin/browse-edgar", MULTI)
+
+    async def poll(watchlist):
+        pipeline = FeedPipeline(watchlist, forms=("8-K",), state_path=str(tmp_path / f"{watchlist[0]}.json"))
+        return [e.accession for e in await pipeline.poll_once()]
+
+    # the watched company is the second filer listed
+    assert asyncio.run(poll(["444444"])) == ["0000333333-24-000007"]
+    assert asyncio.run(poll(["555555"])) == []
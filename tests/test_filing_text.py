@@ -0,0 +1,35 @@
+import asyncio
+from array import array
+
+from tools.common import DOCS
+from tools.filing_text import get_filing_text_impl
+
+ACC = "0000320193-24-000030"
+TEXT = "Cover page\nITEM 1A. RISK FACTORS\nWe depend on suppliers.\n"
+SECTIONS = {"RiskFactors": {"start": 11, "end": len(TEXT), "heading": "ITEM 1A. RISK FACTORS"}}
+# one html element per line: (html_start, html_end, text_start, text_end)
+SPANS = [(0, 20, 0, 10), (30, 60, 11, 32), (70, 99, 33, 56)]
+
+
+def _store(store_filing):
+    store_filing(ACC, TEXT, SECTIONS)
+    DOCS.attach(ACC, "spans", *DOCS.objects.put(array("q", [v for s in SPANS for v in s]).tobytes()))
+
+
+def test_spans_are_opt_in(store_filing):
+    _store(store_filing)
+    ft = asyncio.run(get_filing_text_impl(ACC))
+    assert ft.text == TEXT and ft.spans is None
+    ft = asyncio.run(get_filing_text_impl(ACC, include_spans=True))
+    assert [s["text_start"] for s in ft.spans] == [0, 11, 33]
+
+
+def test_spans_cover_only_the_window(store_filing):
+    _store(store_filing)
+    ft = asyncio.run(get_filing_text_impl(ACC, offset=11, length=40, include_spans=True))
+    assert ft.text.startswith("ITEM 1A.") and ft.offset == 11
+    assert ft.spans == [{"html_start": 30, "html_end": 60, "text_start": 11, "text_end": 32}]
+    assert ft.next_cursor is not None
+    rest = asyncio.run(get_filing_text_impl(ACC, cursor=ft.next_cursor, include_spans=True))
+    assert ft.text + rest.text == TEXT[11:] and rest.next_cursor is None
+    assert [s["html_start"] for s in rest.spans] == [70]
@@ -0,0 +1,58 @@
+import asyncio, json
+
+from tools.filings import search_filings_impl
+
+
+def _cols(rows):
+    return {
+        "accessionNumber": [a for a, _, _ in rows],
+        "form": [f for _, f, _ in rows],
+        "filingDate": [d for _, _, d in rows],
+        "primaryDocument": [f"{a}.htm" for a, _, _ in rows],
+    }
+
+
+RECENT = [
+    ("0000000050-24-000003", "10-K", "2024-02-10"),
+    ("0000000050-23-000009", "8-K", "2023-11-02"),
+    ("0000000050-23-000004", "10-Q", "2023-08-01"),
+    ("0000000050-23-000002", "10-Q", "2023-05-01"),
+]
+OLDER = [
+    ("0000000050-22-000007", "10-K", "2022-02-11"),
+    ("0000000050-21-000001", "10-K", "2021-02-12"),
+]
+
+
+def _put(edgar, cik: int):
+    shard = f"CIK{cik:010d}-submissions-001.json"
+    subs = {
+        "cik": str(cik),
+        "filings": {
+            "recent": _cols(RECENT),
+            "files": [{"name": shard, "filingFrom": "2021-01-01", "filingTo": "2022-12-31"}],
+        },
+    }
+    edgar.put(f"submissions/CIK{cik:010d}.json", json.dumps(subs))
+    edgar.put(f"submissions/{shard}", json.dumps(_cols(OLDER)))
+
+
+def test_recent_rows_answer_without_loading_older_shards(edgar):
+    _put(edgar, 50)
+    found = asyncio.run(search_filings_impl("50", ["10-Q", "10-K"], None, None, 2))
+    assert [f.accession for f in found] == ["0000000050-24-000003", "0000000050-23-000004"]
+    assert found[0].url.endswith("/50/000000005024000003/0000000050-24-000003.txt")
+    found = asyncio.run(search_filings_impl("50", [], "2023-06-01", "2023-12-31", 10))
+    assert [f.form for f in found] == ["8-K", "10-Q"]
+    assert edgar.count("/submissions/") == 1
+
+
+def test_older_shard_is_fetched_once_the_range_reaches_it(edgar):
+    _put(edgar, 51)
+    found = asyncio.run(search_filings_impl("51", ["10-K"], None, None, 3))
+    assert [f.filed for f in found] == ["2024-02-10", "2022-02-11", "2021-02-12"]
+    assert edgar.count("/submissions/CIK0000000051-submissions-") == 1
+    # the merged index now answers from memory
+    found = asyncio.run(search_filings_impl("51", ["10-K"], "2021-01-01", "2021-12-31", 5))
+    assert [f.accession for f in found] == ["0000000050-21-000001"]
+    assert edgar.count("/submissions/") == 2
@@ -0,0 +1,83 @@
+import asyncio, json
+
+from tools.financials import FactTable, get_financials_impl
+
+
+def _fact(val, end, fy, fp, form, filed):
+    return {"val": val, "end": end, "fy": fy, "fp": fp, "form": form, "filed": filed}
+
+
+# A 10-Q balance sheet carries the prior fiscal year-end as its comparative,
+# and companyfacts tags that column with the 10-Q's own fy/fp.
+FACTS = {"facts": {"us-gaap": {"AssetsCurrent": {"units": {"USD": [
+    _fact(90, "2022-12-31", 2023, "FY", "10-K", "2024-02-01"),
+    _fact(100, "2023-12-31", 2023, "FY", "10-K", "2024-02-01"),
+    _fact(100, "2023-12-31", 2024, "Q1", "10-Q", "2024-05-01"),
+    _fact(200, "2024-03-31", 2024, "Q1", "10-Q", "2024-05-01"),
+    _fact(100, "2023-12-31", 2024, "Q2", "10-Q", "2024-08-01"),
+    _fact(300, "2024-06-30", 2024, "Q2", "10-Q", "2024-08-01"),
+]}}}}}
+
+
+def test_quarter_balance_is_not_the_year_end_comparative():
+    for table in (FactTable(FACTS), FactTable.from_bytes(FactTable(FACTS).to_bytes())):
+        assert table.value("AssetsCurrent", 2024, "Q1") == 200
+        assert table.value("AssetsCurrent", 2024, "Q2") == 300
+        assert table.value("AssetsCurrent", 2023, "FY") == 100
+        assert table.value("AssetsCurrent", 2023, "Q4") == 100
+        assert table.value("AssetsCurrent", 2022, "FY") == 90
+
+
+def test_comparative_fills_a_missing_period():
+    only_q2 = {"facts": {"us-gaap": {"AssetsCurrent": {"units": {"USD": FACTS["facts"]["us-gaap"]["AssetsCurrent"]["units"]["USD"][4:]}}}}}
+    assert FactTable(only_q2).value("AssetsCurrent", 2023, "FY") == 100
+
+
+def _duration(val, start, end, fy, fp, form, filed):
+    return dict(_fact(val, end, fy, fp, form, filed), start=start)
+
+
+REVENUE = [
+    _duration(1000, "2023-01-01", "2023-12-31", 2023, "FY", "10-K", "2024-02-01"),
+    _duration(700, "2023-01-01", "2023-09-30", 2023, "Q3", "10-Q", "2023-11-01"),
+    _duration(240, "2023-07-01", "2023-09-30", 2023, "Q3", "10-Q", "2023-11-01"),
+    _duration(260, "2024-01-01", "2024-03-31", 2024, "Q1", "10-Q", "2024-05-01"),
+    # six-month year-to-date: never the answer for a quarter
+    _duration(510, "2024-01-01", "2024-06-30", 2024, "Q2", "10-Q", "2024-08-01"),
+    _duration(250, "2024-04-01", "2024-06-30", 2024, "Q2", "10-Q", "2024-08-01"),
+]
+
+
+def test_durations_match_the_requested_period():
+    table = FactTable({"facts": {"us-gaap": {"Revenues": {"units": {"USD": REVENUE}}}}})
+    assert table.value("Revenues", 2023, "FY") == 1000
+    assert table.value("Revenues", 2023, "Q3") == 240
+    # fiscal year less the nine-month year-to-date
+    assert table.value("Revenues", 2023, "Q4") == 300
+    assert table.value("Revenues", 2024, "Q2") == 250
+    assert table.value("Revenues", 2024, "Q3") is None
+
+
+def test_snapshot_reads_one_parsed_table(edgar):
+    facts = {"facts": {"us-gaap": {"Revenues": {"units": {"USD": REVENUE}}, **FACTS["facts"]["us-gaap"]}}}
+    edgar.put("api/xbrl/companyfacts/CIK0000000060.json", json.dumps(facts))
+    q2 = asyncio.run(get_financials_impl("60", "Q2 2024"))
+    assert q2.income_statement["Revenue"] == 250 and q2.balance_sheet["CurrentAssets"] == 300
+    fy = asyncio.run(get_financials_impl("60", "FY2023"))
+    assert fy.income_statement["Revenue"] == 1000 and fy.balance_sheet["CurrentAssets"] == 100
+    assert edgar.count("/api/xbrl/companyfacts/") == 1
+
+
+def test_panel_rows_and_derived_columns(edgar):
+    from tools.financials import get_financials_panel_impl
+
+    cost = [_duration(600, "2023-01-01", "2023-12-31", 2023, "FY", "10-K", "2024-02-01")]
+    facts = {"facts": {"us-gaap": {"Revenues": {"units": {"USD": REVENUE}}, "CostOfRevenue": {"units": {"USD": cost}}}}}
+    edgar.put("api/xbrl/companyfacts/CIK0000000061.json", json.dumps(facts))
+    panel = asyncio.run(
+        get_financials_panel_impl(["61", "62"], ["FY2023", "Q2 2024"], ["Revenue", "CostOfRevenue"], ["gross_margin"])
+    )
+    assert panel.columns == ["cik", "period", "Revenue", "CostOfRevenue", "gross_margin"]
+    assert panel.rows == [["0000000061", "FY2023", 1000, 600, 0.4], ["0000000061", "Q2 2024", 250, None, None]]
+    # one company failing does not sink the panel
+    assert list(panel.errors) == ["62"]
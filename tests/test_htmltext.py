@@ -0,0 +1,40 @@
+from html import unescape
+
+from tools.htmltext import HtmlTextStream
+
+DOC = (
+    "<html><head><title>Form 10-K</title><style>p { margin: 0 }</style></head><body>"
+    "<div style='display:none'><ix:header><ix:hidden>dei:EntityCentralIndexKey 0000320193</ix:hidden></ix:header></div>"
+    "<!-- generated by a filing agent -->"
+    '<p class="cover">Apple Inc.</p>'
+    "<script>if (a < b && c > d) { render('<p>not text</p>') }</script>"
+    "<div><b>ITEM 1A.</b>&nbsp;RISK&#160;FACTORS</div>"
+    "<p>Supply &amp; demand <span>for</span> components</p>"
+    "<br/><![CDATA[ raw ]]><p>  </p><p>Tail &lt;end&gt;</p>"
+    "</body></html>"
+)
+
+
+def _convert(doc: str, size: int):
+    conv = HtmlTextStream()
+    for i in range(0, len(doc), size):
+        conv.feed(doc[i : i + size])
+    text, spans = conv.close()
+    return text, list(spans)
+
+
+def test_chunked_conversion_matches_whole_document():
+    text, spans = _convert(DOC, len(DOC))
+    assert text.split("\n") == [
+        "Apple Inc.", "ITEM 1A.", "RISK\xa0FACTORS", "Supply & demand", "for", "components", "Tail <end>"
+    ]
+    # every split point, including inside tags, comments, entities and the script body
+    for size in (1, 2, 3, 7, 64):
+        assert _convert(DOC, size) == (text, spans), size
+
+
+def test_spans_map_text_back_to_the_html():
+    text, spans = _convert(DOC, 5)
+    for i in range(0, len(spans), 4):
+        h0, h1, t0, t1 = spans[i : i + 4]
+        assert unescape(DOC[h0:h1]).strip() == text[t0:t1]
@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from adapters.metrics import METRICS, instrumented
+from tools.common import DOCS
+from tools.filing_text import get_filing_text_impl
+
+DOC = "<html><body><p>Cover</p><p>ITEM 1A. RISK FACTORS</p><p>We depend on suppliers.</p></body></html>"
+TEXT = "Cover\nITEM 1A. RISK FACTORS\nWe depend on suppliers.\n"
+SECTIONS = {"RiskFactors": {"start": 6, "end": len(TEXT), "heading": "ITEM 1A. RISK FACTORS"}}
+
+
+def test_tool_and_stage_series_share_one_registry():
+    # downloaded but not yet converted, so the call parses it
+    acc = "0000320193-24-000001"
+    meta = {
+        "accession": acc, "cik": "0000320193", "form": "10-K", "filed_at": "2024-02-01T00:00:00Z",
+        "doc_url": "https://www.sec.gov/Archives/edgar/data/320193/000032019324000001/doc.htm",
+    }
+    DOCS.attach(acc, "raw", *DOCS.objects.put(DOC.encode()), meta=meta)
+
+    @instrumented("get_filing_text")
+    async def handler(req):
+        return await get_filing_text_impl(req.arguments["accession"])
+
+    ft = asyncio.run(handler(SimpleNamespace(arguments={"accession": acc})))
+    assert "We depend on suppliers." in ft.text
+    page = METRICS.render()
+    assert 'sec_mcp_tool_seconds_count{tool="get_filing_text",outcome="ok"}' in page
+    # recorded by tools.common, which converts the document in a worker
+    assert 'sec_mcp_stage_seconds_count{stage="html_parse"}' in page
+    # recorded by tools.search, which indexes the text on the way out
+    assert 'sec_mcp_stage_seconds_count{stage="text_index"}' in page
+    assert "sec_mcp_docstore_events_total" in page
+
+
+def test_metrics_endpoint_after_tool_call(store_filing):
+    pytest.importorskip("mcp.server.fastapi")
+    import server
+
+    store_filing("0000320193-24-000002", TEXT, SECTIONS)
+    out = asyncio.run(server.get_filing_text(SimpleNamespace(arguments={"accession": "0000320193-24-000002"})))
+    assert '"error_code"' not in out[0].text
+    page = asyncio.run(server.metrics()).body.decode()
+    assert 'sec_mcp_tool_seconds_count{tool="get_filing_text",outcome="ok"}' in page
+    assert 'sec_mcp_stage_seconds_count{stage="serialize"}' in page
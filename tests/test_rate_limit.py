@@ -0,0 +1,78 @@
+import asyncio, sys, time
+
+import pytest
+
+from adapters.rate_limit import BACKGROUND, Scheduler, UpstreamThrottled, _SharedBucket
+
+
+def test_shared_bucket_follows_configured_rate(tmp_path):
+    path = str(tmp_path / "bucket.bin")
+    with _SharedBucket(path, 10.0).locked() as b:
+        assert b.rate == 10.0
+        b.rate = 7.5  # backed off after a 429
+    with _SharedBucket(path, 10.0).locked() as b:
+        assert b.rate == 7.5
+    # lowering SEC_MCP_MAX_RPS takes effect despite the persisted bucket
+    with _SharedBucket(path, 2.0).locked() as b:
+        assert b.rate == 2.0
+
+
+def test_processes_share_one_budget(tmp_path):
+    # one scheduler per server process, all on the same bucket file
+    a, b = (Scheduler(max_rate=4.0, shared=str(tmp_path / "bucket.bin")) for _ in range(2))
+    assert a._take()
+    assert not b._take()
+    # a 429 seen by one process slows the other
+    a.feedback(429)
+    assert b.rate == 2.0 and b.predicted_wait() > 0
+
+
+def test_one_copy_of_adapters():
+    import ingestion.rss, tools.batch, tools.common, tools.diff, tools.financials, tools.search  # noqa: F401
+
+    assert not [m for m in sys.modules if m.endswith(".adapters.sec_api")]
+    # the throttle raised by sec_api is the class batch error handling checks for
+    assert sys.modules["adapters.sec_api"].UpstreamThrottled is UpstreamThrottled
+    payload = tools.batch.error_payload(UpstreamThrottled(1500), "BAD_REQUEST")
+    assert payload.retry_after_ms == 1500
+
+
+def _drained(sched):
+    with sched.bucket.locked() as b:
+        b.tokens, b.last = 0.0, time.time()
+
+
+def test_cancelled_waiter_already_pruned_by_dispatch():
+    sched = Scheduler(max_rate=1.0, max_wait=60.0)
+
+    async def run():
+        _drained(sched)
+        task = asyncio.ensure_future(sched.acquire(BACKGROUND))
+        await asyncio.sleep(0)
+        task.cancel()
+        sched._dispatch()  # prunes the cancelled future before the task resumes
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not any(sched._lanes)
+        sched._timer and sched._timer.cancel()
+
+    asyncio.run(run())
+
+
+def test_token_granted_to_a_cancelled_waiter_is_returned():
+    sched = Scheduler(max_rate=1.0, max_wait=60.0)
+
+    async def run():
+        _drained(sched)
+        task = asyncio.ensure_future(sched.acquire(BACKGROUND))
+        await asyncio.sleep(0)
+        with sched.bucket.locked() as b:
+            b.tokens = 1.0
+        sched._dispatch()  # grants the token
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        with sched.bucket.locked() as b:
+            assert b.tokens >= 1.0
+
+    asyncio.run(run())
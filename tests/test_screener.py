@@ -0,0 +1,107 @@
+import asyncio, json, threading, zlib
+from collections import OrderedDict
+
+import tools.screener
+from adapters.bulk_store import BulkStore
+from tools.financials import FactTable
+from tools.screener import screen_companies_impl
+
+
+def _facts(revenue, cost):
+    def fact(val):
+        return [{"val": val, "start": "2023-01-01", "end": "2023-12-31", "fy": 2023, "fp": "FY", "form": "10-K", "filed": "2024-02-01"}]
+
+    gaap = {"Revenues": {"units": {"USD": fact(revenue)}}}
+    if cost is not None:
+        gaap["CostOfRevenue"] = {"units": {"USD": fact(cost)}}
+    return {"facts": {"us-gaap": gaap}}
+
+
+def _bulk(tmp_path):
+    bulk = BulkStore(tmp_path / "bulk.sqlite")
+    rows = []
+    for cik, revenue, cost in [(1, 500, 100), (2, 50, 10), (3, 900, None)]:
+        table = FactTable(_facts(revenue, cost))
+        rows.append((f"CIK{cik:010d}.json", cik, cik, 1, table.to_bytes(), table.concepts))
+    bulk.put_facts(rows)
+    bulk.put_submissions([("CIK0000000001.json", 1, 1, 1, zlib.compress(b"{}"))], [(1, "Alpha Corp", ["ALP"])])
+    return bulk
+
+
+def test_offline_screen_reads_bulk_companyfacts(tmp_path, monkeypatch):
+    bulk = _bulk(tmp_path)
+    monkeypatch.setattr(tools.screener, "OFFLINE", True)
+    monkeypatch.setattr(tools.screener, "BULK", bulk)
+    loads = []
+    blob = bulk.facts_blob
+    monkeypatch.setattr(bulk, "facts_blob", lambda cik: loads.append(cik) or blob(cik))
+
+    res = asyncio.run(screen_companies_impl("FY2023", ["Revenue > 100"], sort_by="Revenue", columns=["gross_margin"]))
+    assert res.columns == ["cik", "name", "gross_margin", "Revenue"]
+    assert res.rows == [["0000000003", "", None, 900], ["0000000001", "Alpha Corp", 0.8, 500]]
+    assert (res.matched, res.universe) == (2, 3)
+    # each filer's table is decoded once for every tag, and only once per store generation
+    assert loads == [1, 2, 3]
+    asyncio.run(screen_companies_impl("FY2023", sort_by="gross_margin"))
+    assert loads == [1, 2, 3]
+
+
+def test_bulk_frame_cache_is_only_touched_on_the_event_loop(tmp_path, monkeypatch):
+    writers = set()
+
+    class Recording(OrderedDict):
+        def __setitem__(self, key, value):
+            writers.add(threading.get_ident())
+            super().__setitem__(key, value)
+
+        def move_to_end(self, key, last=True):
+            writers.add(threading.get_ident())
+            super().move_to_end(key, last)
+
+    monkeypatch.setattr(tools.screener, "OFFLINE", True)
+    monkeypatch.setattr(tools.screener, "BULK", _bulk(tmp_path))
+    monkeypatch.setattr(tools.screener, "_FRAMES", Recording())
+
+    async def screens():
+        return await asyncio.gather(*(screen_companies_impl("FY2023", sort_by=f) for f in ("Revenue", "gross_margin", "Revenue")))
+
+    results = asyncio.run(screens())
+    assert [r.universe for r in results] == [3, 3, 3]
+    assert writers == {threading.get_ident()}
+
+
+def _frame(rows):
+    return json.dumps({"data": [{"cik": cik, "entityName": name, "val": val} for cik, name, val in rows]})
+
+
+def test_online_screen_reads_frames_by_alias_and_caches_them(tmp_path, monkeypatch, edgar):
+    monkeypatch.setattr(tools.screener, "OFFLINE", False)
+    monkeypatch.setattr(tools.screener, "FRAMES_DIR", tmp_path / "frames")
+    monkeypatch.setattr(tools.screener, "_FRAMES", OrderedDict())
+    base = "api/xbrl/frames/us-gaap"
+    edgar.put(f"{base}/Revenues/USD/CY2023.json", _frame([(2, "Beta", 50), (1, "Alpha", 500)]))
+    # an older alias only fills filers the preferred tag left empty
+    edgar.put(f"{base}/SalesRevenueNet/USD/CY2023.json", _frame([(1, "Alpha", 1), (3, "Gamma", 900)]))
+    edgar.put(f"{base}/CostOfRevenue/USD/CY2023.json", _frame([(1, "Alpha", 100)]))
+
+    res = asyncio.run(screen_companies_impl("FY2023", ["Revenue > 100"], sort_by="Revenue", columns=["gross_margin"]))
+    assert res.frames == ["CY2023"]
+    assert res.rows == [["0000000003", "Gamma", None, 900], ["0000000001", "Alpha", 0.8, 500]]
+    assert (res.matched, res.universe) == (2, 3)
+    # three Revenue aliases and CostOfRevenue; the missing alias is an empty frame
+    assert edgar.count(f"/{base}/") == 4
+    assert sorted(p.name for p in (tmp_path / "frames").iterdir()) == [
+        "CostOfRevenue_USD_CY2023.npz", "RevenueFromContractWithCustomerExcludingAssessedTax_USD_CY2023.npz",
+        "Revenues_USD_CY2023.npz", "SalesRevenueNet_USD_CY2023.npz",
+    ]
+
+    asyncio.run(screen_companies_impl("FY2023", sort_by="Revenue"))
+    assert edgar.count(f"/{base}/") == 4
+
+    # a stale frame revalidates and keeps its columns on 304
+    monkeypatch.setattr(tools.screener, "FRAMES_TTL", -1)
+    res = asyncio.run(screen_companies_impl("FY2023", sort_by="Revenue", limit=1))
+    assert res.rows == [["0000000003", "Gamma", 900]]
+    # only the Revenue aliases are needed; the empty one has no ETag to send
+    assert edgar.count(f"/{base}/") == 7
+    assert sum("If-None-Match" in r.headers for r in edgar.requests[-3:]) == 2
@@ -0,0 +1,36 @@
+import asyncio
+
+import tools.common, tools.jobs, tools.search
+from tools.filing_text import get_filing_text_impl
+from tools.search import search_text_impl
+
+ACC = "0000320193-24-000024"
+TEXT = (
+    "ITEM 1A. RISK FACTORS\nWe depend on third-party suppliers for components.\n"
+    "ITEM 7. MANAGEMENT'S DISCUSSION\nSupply constraints eased during the year.\n"
+)
+SECTIONS = {
+    "RiskFactors": {"start": 0, "end": TEXT.index("ITEM 7"), "heading": "ITEM 1A. RISK FACTORS"},
+    "MDA": {"start": TEXT.index("ITEM 7"), "end": len(TEXT), "heading": "ITEM 7. MANAGEMENT'S DISCUSSION"},
+}
+
+
+def test_search_shares_the_converters_store_and_index():
+    assert tools.search.DOCS is tools.common.DOCS
+    assert tools.search.TEXT_INDEX is tools.jobs.TEXT_INDEX
+
+
+def test_read_filings_are_searchable_by_phrase_and_section(store_filing):
+    store_filing(ACC, TEXT, SECTIONS)
+    # reading the text is what indexes it
+    asyncio.run(get_filing_text_impl(ACC))
+
+    res = asyncio.run(search_text_impl('"third-party suppliers"', cik="320193"))
+    hit = next(h for h in res.hits if h.accession == ACC)
+    assert hit.section == "RiskFactors"
+    a, b = hit.matches[0]
+    assert TEXT[a:b] == "third-party suppliers"
+
+    res = asyncio.run(search_text_impl("suppl*", sections=["MDA"]))
+    assert [(h.accession, h.section) for h in res.hits] == [(ACC, "MDA")]
+    assert TEXT[slice(*res.hits[0].matches[0])] == "Supply"
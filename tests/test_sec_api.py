@@ -0,0 +1,116 @@
+import asyncio, json, time
+
+import tools.common
+from adapters import sec_api
+from adapters.cache import TieredCache
+from adapters.sec_api import CACHE, INFLIGHT, fetch_json, fetch_text
+from adapters.singleflight import host_lock
+
+SUBMISSIONS = '{"cik": "42", "name": "Example Corp", "filings": {"recent": {"accessionNumber": ["0000000042-24-000001"], "form": ["10-K"], "filingDate": ["2024-02-01"], "primaryDocument": ["ex-10k.htm"]}}}'
+
+
+def test_json_and_documents_share_one_client(edgar):
+    edgar.put("submissions/CIK0000000042.json", SUBMISSIONS)
+    edgar.put("Archives/edgar/data/42/000000004224000001/ex-10k.htm", "<html><body>10-K</body></html>")
+    client = sec_api.get_client()
+
+    async def run():
+        await sec_api.startup()
+        assert sec_api.get_client() is client
+        subs = await fetch_json("https://data.sec.gov/submissions/CIK0000000042.json", cache_key="subs_0000000042", cache_ttl=60)
+        doc = subs["filings"]["recent"]["primaryDocument"][0]
+        return await fetch_text(f"https://www.sec.gov/Archives/edgar/data/42/000000004224000001/{doc}")
+
+    assert asyncio.run(run()) == "<html><body>10-K</body></html>"
+    assert [r.url.path for r in edgar.requests] == [
+        "/submissions/CIK0000000042.json", "/Archives/edgar/data/42/000000004224000001/ex-10k.htm"
+    ]
+    assert all(r.headers["User-Agent"] == sec_api.USER_AGENT for r in edgar.requests)
+    # the tools module talks to the same adapter instance, not a second copy
+    assert tools.common.fetch_text is fetch_text
+
+
+def test_shutdown_closes_the_client():
+    async def run():
+        client = sec_api.get_client()
+        await sec_api.shutdown()
+        assert client.is_closed and sec_api._CLIENT is None
+        # the next call opens a fresh one
+        assert not sec_api.get_client().is_closed
+        await sec_api.shutdown()
+
+    asyncio.run(run())
+
+
+def test_concurrent_fetches_share_one_upstream_get(edgar):
+    edgar.put("submissions/CIK0000000043.json", '{"cik": "43", "name": "Other Corp"}')
+    url = "https://data.sec.gov/submissions/CIK0000000043.json"
+    before = dict(INFLIGHT.stats)
+
+    async def run():
+        return await asyncio.gather(*(fetch_json(url, cache_key="subs_0000000043", cache_ttl=60) for _ in range(8)))
+
+    results = asyncio.run(run())
+    assert all(r == {"cik": "43", "name": "Other Corp"} for r in results)
+    assert edgar.count("/submissions/") == 1
+    assert INFLIGHT.stats["executed"] - before["executed"] == 1
+    assert INFLIGHT.stats["deduplicated"] - before["deduplicated"] == 7
+    assert INFLIGHT.inflight() == 0
+
+
+def _expire(name: str, url: str, age: float):
+    entry = CACHE.lookup(name, {"url": url})
+    entry.ts = time.time() - age
+    # on disk too, where a fetch looks for a copy another process stored meanwhile
+    fp = CACHE._path(CACHE._key(name, {"url": url}))
+    head, body = fp.read_bytes().split(b"\n", 1)
+    fp.write_bytes(json.dumps({**json.loads(head), "ts": entry.ts}).encode() + b"\n" + body)
+
+
+def test_expired_entry_is_revalidated_without_a_body(edgar):
+    edgar.put("submissions/CIK0000000044.json", '{"cik": "44"}')
+    url = "https://data.sec.gov/submissions/CIK0000000044.json"
+    assert asyncio.run(fetch_json(url, cache_key="subs_0000000044", cache_ttl=60)) == {"cik": "44"}
+    _expire("subs_0000000044", url, 120)
+    assert asyncio.run(fetch_json(url, cache_key="subs_0000000044", cache_ttl=60)) == {"cik": "44"}
+    first, second = edgar.requests
+    assert "If-None-Match" not in first.headers
+    assert second.headers["If-None-Match"] == CACHE.lookup("subs_0000000044", {"url": url}).meta["etag"]
+    # the 304 restarted the entry's ttl
+    assert time.time() - CACHE.lookup("subs_0000000044", {"url": url}).ts < 60
+
+
+def test_stale_while_revalidate_answers_at_once(edgar):
+    edgar.put("submissions/CIK0000000045.json", '{"cik": "45", "v": 1}')
+    url = "https://data.sec.gov/submissions/CIK0000000045.json"
+
+    async def run():
+        await fetch_json(url, cache_key="subs_0000000045", cache_ttl=60)
+        _expire("subs_0000000045", url, 120)
+        edgar.put("submissions/CIK0000000045.json", '{"cik": "45", "v": 2}')
+        stale = await fetch_json(url, cache_key="subs_0000000045", cache_ttl=60, stale_while_revalidate=True)
+        assert len(edgar.requests) == 1  # nothing was awaited upstream
+        while INFLIGHT.inflight():
+            await asyncio.sleep(0.01)
+        return stale, await fetch_json(url, cache_key="subs_0000000045", cache_ttl=60)
+
+    stale, fresh = asyncio.run(run())
+    assert (stale["v"], fresh["v"]) == (1, 2)
+    assert len(edgar.requests) == 2
+
+
+def test_fetch_waiting_on_another_process_reads_its_result(edgar):
+    edgar.put("submissions/CIK0000000049.json", '{"cik": "49", "name": "Fetched Again"}')
+    url = "https://data.sec.gov/submissions/CIK0000000049.json"
+    other = TieredCache(CACHE.base_dir)  # a second server process on the same cache directory
+
+    async def run():
+        async with host_lock(url):
+            task = asyncio.ensure_future(fetch_json(url, cache_key="subs_0000000049", cache_ttl=60))
+            await asyncio.sleep(0.2)
+            assert not task.done()
+            other.set("subs_0000000049", {"url": url}, {"cik": "49", "name": "Shared"})
+        return await task
+
+    assert asyncio.run(run())["name"] == "Shared"
+    assert edgar.count("/submissions/CIK0000000049") == 0
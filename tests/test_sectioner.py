@@ -0,0 +1,60 @@
+from tools.sectioner import extract_sections
+
+BODY = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20 + "\n"
+# dot leaders and page numbers make each contents line longer than the short item's body
+TOC = "".join(
+    f"Item {n}. {title} .......... {page}\n" for page, (n, title) in enumerate([
+        ("1", "Business"), ("1A", "Risk Factors"), ("1B", "Unresolved Staff Comments"), ("1C", "Cybersecurity"),
+        ("2", "Properties"), ("7", "Management's Discussion and Analysis"), ("8", "Financial Statements"),
+    ], start=3)
+)
+TEXT = (
+    "ANNUAL REPORT ON FORM 10-K\nTABLE OF CONTENTS\n" + TOC + "PART I\n"
+    + "Item 1. Business\n" + BODY
+    + "Item 7 of this report discusses our results; see also Item 1A.\n" + BODY
+    + "Item 1A. Risk Factors\n" + BODY
+    + "Item 1B. Unresolved Staff Comments\nNone.\n"
+    + "Item 1C. Cybersecurity\n" + BODY
+    + "Item 2. Properties\n" + BODY
+    + "PART II\nItem 7. Management's Discussion and Analysis\n" + BODY
+    + "Item 8. Financial Statements\n" + BODY
+)
+
+
+def test_short_item_and_cross_reference_are_not_toc():
+    sections = extract_sections(TEXT, "10-K")
+    body = TEXT.index("PART I\n")
+    assert all(s["start"] > body for s in sections.values())
+    staff = sections["UnresolvedStaffComments"]
+    assert TEXT[staff["start"] : staff["end"]] == "Item 1B. Unresolved Staff Comments\nNone.\n"
+    assert staff["heading"] == "Item 1B. Unresolved Staff Comments"
+    assert sections["MDA"]["start"] == TEXT.index("PART II\n") + len("PART II\n")
+    assert sections["Business"]["end"] == TEXT.index("Item 1A. Risk Factors\nLorem")
+
+
+INTRO = "Cautionary note regarding forward-looking statements. " * 12 + "\n"
+
+
+def test_last_toc_entry_before_intro_text_is_toc():
+    items = [("1", "Business"), ("1A", "Risk Factors"), ("7", "Management's Discussion and Analysis"),
+             ("8", "Financial Statements"), ("15", "Exhibits"), ("16", "Form 10-K Summary")]
+    toc = "".join(f"Item {n}. {title}\n" for n, title in items)
+    body = "".join(f"Item {n}. {title}\n" + BODY for n, title in items)
+    text = "TABLE OF CONTENTS\n" + toc + INTRO + "PART I\n" + body
+    sections = extract_sections(text, "10-K")
+    start = text.index("PART I\n")
+    assert all(s["start"] > start for s in sections.values())
+    summary = text.index("Item 16. Form 10-K Summary\nLorem")
+    assert sections["Form10KSummary"]["start"] == summary
+    assert sections["Exhibits"]["end"] == summary
+
+
+def test_last_toc_entry_of_a_10q_is_toc():
+    toc = ("PART I\nItem 1. Financial Statements\nItem 2. Management's Discussion\nItem 3. Market Risk\n"
+           "Item 4. Controls and Procedures\nPART II\nItem 1A. Risk Factors\nItem 6. Exhibits\n")
+    body = ("PART I\nItem 1. Financial Statements\n" + BODY + "Item 2. Management's Discussion\n" + BODY
+            + "PART II\nItem 1A. Risk Factors\n" + BODY + "Item 6. Exhibits\n" + BODY)
+    text = toc + INTRO + body
+    sections = extract_sections(text, "10-Q")
+    assert sections["Exhibits"]["start"] == text.index("Item 6. Exhibits\nLorem")
+    assert sections["FinancialStatements"]["start"] == len(toc) + len(INTRO) + len("PART I\n")
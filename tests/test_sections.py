@@ -0,0 +1,55 @@
+import asyncio
+
+from tools.sections import get_sections_impl
+
+ACC = "0000320193-24-000020"
+LINES = ["ITEM 7. MANAGEMENT'S DISCUSSION", "Revenue grew.", "ITEM 8. FINANCIAL STATEMENTS", "Balance sheet.",
+         "NOTES TO CONSOLIDATED FINANCIAL STATEMENTS", "Note 1. Basis of presentation.", "Note 2. Revenue.",
+         "Report of independent auditors."]
+TEXT = "".join(line + "\n" for line in LINES)
+
+
+def _at(line: int) -> int:
+    return sum(len(x) + 1 for x in LINES[:line])
+
+
+SECTIONS = {
+    "MDA": {"start": 0, "end": _at(2), "heading": LINES[0]},
+    "FinancialStatements": {"start": _at(2), "end": len(TEXT), "heading": LINES[2]},
+    # nested inside FinancialStatements
+    "Footnotes": {"start": _at(4), "end": _at(7), "heading": LINES[4]},
+}
+
+
+def _get(sections=None, **window):
+    return asyncio.run(get_sections_impl(ACC, sections, **window))
+
+
+def test_nested_section_returned_without_a_window(store_filing):
+    store_filing(ACC, TEXT, SECTIONS)
+    for wanted in (None, ["FinancialStatements", "Footnotes"]):
+        got = {s.name: s for s in _get(wanted).sections}
+        assert set(got) >= {"FinancialStatements", "Footnotes"}
+        assert got["FinancialStatements"].text == TEXT[_at(2):]
+        assert got["Footnotes"].text == TEXT[_at(4):_at(7)]
+        assert all(s.complete for s in got.values())
+
+
+def test_windows_read_each_position_once_under_the_innermost_section(store_filing):
+    store_filing(ACC, TEXT, SECTIONS)
+    whole = _get(["FinancialStatements", "Footnotes"], offset=0)
+    assert [(s.name, s.start, s.end) for s in whole.sections] == [
+        ("FinancialStatements", _at(2), _at(4)), ("Footnotes", _at(4), _at(7)), ("FinancialStatements", _at(7), len(TEXT)),
+    ]
+    assert [s.complete for s in whole.sections] == [False, True, False]
+    assert whole.next_cursor is None
+
+    pages, cursor = [], None
+    while True:
+        page = _get(["FinancialStatements", "Footnotes"], **({"cursor": cursor} if cursor else {"offset": 0}), length=40)
+        pages.extend(page.sections)
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    assert "".join(s.text for s in pages) == TEXT[_at(2):]
+    assert "".join(s.text for s in pages if s.name == "Footnotes") == TEXT[_at(4):_at(7)]
@@ -0,0 +1,38 @@
+from tools.sentdiff import diff_sentences, fingerprint, lineage
+
+OLD = "We depend on third-party suppliers. Our results may fluctuate."
+NEW = (
+    "We depend on third-party suppliers, some of which are single-source providers located outside the "
+    "United States, for components. Our results may fluctuate."
+)
+
+
+def test_sentence_extended_with_a_clause_is_modified_not_replaced():
+    # plain ratio scores this pair 43, token_set_ratio 81
+    added, removed, modified = diff_sentences(OLD, NEW)
+    assert added == [] and removed == []
+    assert modified == [("We depend on third-party suppliers.", NEW.split(" Our")[0], 81)]
+
+
+def test_identical_sentences_pair_before_any_scoring():
+    old = "Revenue grew. Costs fell. Gross margins improved because input costs were lower."
+    new = "Costs fell.   Revenue grew. Gross margins improved because input costs were lower this year. A new risk emerged."
+    added, removed, modified = diff_sentences(old, new)
+    # whitespace and order do not make an unchanged sentence new
+    assert added == ["A new risk emerged."] and removed == []
+    assert [(a, b) for a, b, _ in modified] == [(old.split(". ")[-1], new.split(". ")[2] + ".")]
+
+
+def test_lineage_follows_a_sentence_through_its_edits():
+    versions = [
+        ["Supply risk is high.", "We sell phones in many markets."],
+        ["We sell phones and tablets in many markets.", "Supply risk is high."],
+        ["We sell phones and tablets in many markets around the world.", "Rates may rise."],
+    ]
+    lines = lineage(versions, [[fingerprint(s) for s in v] for v in versions])
+    by_pos = {(line["last"], line["pos"]): line for line in lines}
+    phones = by_pos[(2, 0)]
+    assert phones["first"] == 0 and [(v, i, j) for v, i, j, _ in phones["edits"]] == [(1, 1, 0), (2, 0, 0)]
+    # dropped in the last version, new in the last version
+    assert by_pos[(1, 1)]["first"] == 0 and by_pos[(2, 1)]["first"] == 2
+    assert len(lines) == 3
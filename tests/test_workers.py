@@ -0,0 +1,47 @@
+import asyncio, threading
+
+import pytest
+
+from adapters.docstore import ObjectStore
+from adapters.workers import Overloaded, WorkerPool
+from tools.jobs import convert_document
+
+DOC = "<html><head><title>x</title></head><body><p>Item 1A. Risk Factors</p><p>We depend on suppliers.</p></body></html>"
+
+
+def test_conversion_runs_in_a_worker_process(tmp_path):
+    objects = ObjectStore(tmp_path)
+    raw = objects.put(DOC.encode())[0]
+    pool = WorkerPool(workers=1, max_queue=1)
+
+    async def run():
+        try:
+            return await pool.run(convert_document, str(tmp_path), raw, False, "10-K")
+        finally:
+            pool.shutdown()
+
+    out = asyncio.run(run())
+    # only addresses and offsets come back; the text itself is in the store
+    assert objects.plain_path(out["text"][0]).read_text() == "Item 1A. Risk Factors\nWe depend on suppliers."
+    assert out["chars"] == len("Item 1A. Risk Factors\nWe depend on suppliers.")
+    assert out["sections"]["RiskFactors"]["start"] == 0
+    assert pool.stats["completed"] == 1
+
+
+def test_saturated_pool_turns_jobs_away():
+    pool = WorkerPool(workers=0, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        # one job running and one waiting fill a thread-backed pool with max_queue=1
+        jobs = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(Overloaded) as err:
+            await pool.run(release.wait, 5)
+        release.set()
+        await asyncio.gather(*jobs)
+        return err.value
+
+    err = asyncio.run(run())
+    assert err.retry_after_ms > 0
+    assert pool.stats["rejected"] == 1 and pool.stats["completed"] == 2 and pool.pending() == 0
@@ -0,0 +1,55 @@
+import asyncio, os
+from typing import AsyncIterator, Awaitable, Callable, List
+
+from adapters.metrics import record_error
+from adapters.rate_limit import PREFETCH, UpstreamThrottled, priority
+from adapters.workers import Overloaded
+from schemas.models import BatchItem, ErrorPayload
+
+# Items of one batch in flight at once; all of them still share the upstream scheduler.
+BATCH_CONCURRENCY = int(os.environ.get("SEC_MCP_BATCH_CONCURRENCY", "8"))
+MAX_BATCH = 100
+
+
+def error_payload(e: Exception, error_code: str) -> ErrorPayload:
+    if isinstance(e, Overloaded):
+        return ErrorPayload(error_code="OVERLOADED", hint=str(e), retry_after_ms=e.retry_after_ms)
+    if isinstance(e, UpstreamThrottled):
+        return ErrorPayload(error_code="RATE_LIMITED", hint=str(e), retry_after_ms=e.retry_after_ms)
+    return ErrorPayload(error_code=error_code, hint=str(e))
+
+
+async def run_batch(
+    keys: List[str], fn: Callable[[str], Awaitable], error_code: str = "BAD_REQUEST", concurrency: int = BATCH_CONCURRENCY
+) -> AsyncIterator[BatchItem]:
+    """Yield one BatchItem per key as each finishes, fastest first.
+
+    Callers that collect the whole batch (the MCP tools do) still wait for
+    the slowest item; the ordering only helps a consumer that streams.
+
+    Upstream requests run in the prefetch lane, so a large batch never holds
+    up single tool calls, and is queued rather than rejected when the
+    scheduler is busy.
+    """
+    if len(keys) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} items per batch")
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(i: int, key: str) -> BatchItem:
+        async with sem:
+            try:
+                result = await fn(key)
+            except Exception as e:
+                payload = error_payload(e, error_code)
+                record_error(e, payload.error_code, fails_call=False)
+                return BatchItem(index=i, key=key, error=payload)
+        return BatchItem(index=i, key=key, result=result.model_dump())
+
+    with priority(PREFETCH):
+        tasks = [asyncio.ensure_future(one(i, k)) for i, k in enumerate(keys)]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
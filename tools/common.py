@@ -1,75 +1,194 @@
+import asyncio, re
 from datetime import datetime, timezone
-from typing import Dict
+from typing import Dict, Optional
 from urllib.parse import urljoin
 
-from ..adapters.sec_api import fetch_json
+from adapters.accession_index import ACCESSIONS
+from adapters.bulk_store import OFFLINE
+from adapters.docstore import DocStore
+from adapters.metrics import METRICS, stage
+from adapters.rate_limit import UpstreamThrottled
+from adapters.sec_api import INFLIGHT, download_stream, fetch_text
+from adapters.singleflight import host_lock
+from adapters.workers import POOL
+from tools.filings import load_history
+from tools.jobs import convert_document
+
+# Primary documents and everything derived from them, keyed by accession.
+DOCS = DocStore()
+METRICS.collect(
+    "sec_mcp_docstore_events_total", "counter", "Document store hits, misses and evictions", ("event",), lambda: DOCS.stats.items()
+)
 
 
 def zero_pad_cik(cik: str) -> str:
     return str(int(cik)).zfill(10)
 
 
-def html_to_text(html: str) -> str:
-    from selectolax.parser import HTMLParser
-    tree = HTMLParser(html)
-    return tree.body.text(separator="\n", strip=True) if tree.body else ""
+class _RawSink:
+    """Write a downloading primary document straight into the object store."""
+
+    def __init__(self):
+        self.raw = DOCS.writer()
+
+    def feed(self, chunk: str):
+        self.raw.write(chunk.encode("utf-8"))
+
+    def close(self):
+        return self.raw.finish()
+
+    def abort(self):
+        self.raw.abort()
+
+
+# Document links in a filing index page; the first row of its document table is the primary document.
+_INDEX_DOC = re.compile(r'href="(?:/ix\?doc=)?/Archives/edgar/data/\d+/\d+/([^"/?#]+)"')
+
+
+async def _primary_from_index(cik: int, accession: str) -> Optional[str]:
+    url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession.replace('-', '')}/{accession}-index.htm"
+    page = await fetch_text(url)
+    m = _INDEX_DOC.search(page, max(0, page.find('class="tableFile"')))
+    return m.group(1) if m else None
+
+
+async def _load_quarter_indexes(accession: str, year: int):
+    # accession numbers carry the 2-digit year the filing was submitted in;
+    # look at that year's quarters plus the next Q1 for year-end stragglers
+    if OFFLINE:
+        # the bulk archives have no full index; only issuer submissions resolve
+        return
+    for y, q in [(year, 1), (year, 2), (year, 3), (year, 4), (year + 1, 1)]:
+        if ACCESSIONS.has_quarter(y, q):
+            continue
+        if datetime(y, 3 * q - 2, 1) > datetime.now():
+            # future quarters have no index yet
+            continue
+        try:
+            text = await fetch_text(f"https://www.sec.gov/Archives/edgar/full-index/{y}/QTR{q}/master.idx")
+        except UpstreamThrottled:
+            raise
+        except Exception:
+            continue
+        # tens of MB to parse and insert; keep the event loop serving
+        await asyncio.to_thread(ACCESSIONS.load_quarter, y, q, text)
+        if ACCESSIONS.get(accession):
+            return
+
 
+async def resolve_accession(accession: str) -> Dict[str, str]:
+    """Find the issuer, form, filing date and primary document for an accession.
 
-def _accession_to_paths(accession: str) -> Dict[str, str]:
-    # accession like 0000320193-24-000010
+    The accession prefix is the CIK of whoever submitted the filing, which for
+    filings made by agents is not the issuer, so it is only the first guess.
+    """
+    row = ACCESSIONS.get(accession)
+    if row and row["primary_doc"]:
+        return row
+    yy = int(accession.split("-")[1])
+    year = 2000 + yy if yy < 90 else 1900 + yy
+    if row is None:
+        # cheap guess first: self-filed accessions are prefixed with the issuer CIK
+        try:
+            await load_history(zero_pad_cik(accession.split("-")[0]), f"{year}-01-01", f"{year + 1}-12-31")
+        except UpstreamThrottled:
+            raise
+        except Exception:
+            # filing agents may have no submissions document of their own
+            pass
+        row = ACCESSIONS.get(accession)
+    if row is None:
+        await _load_quarter_indexes(accession, year)
+        row = ACCESSIONS.get(accession)
+        if row is None:
+            raise ValueError("Accession not found")
+    if not row["primary_doc"]:
+        # the full index and the current feed know the issuer; its submissions know the primary document
+        cik10 = zero_pad_cik(str(row["cik"]))
+        await load_history(cik10, f"{year}-01-01", f"{year + 1}-12-31")
+        row = ACCESSIONS.get(accession)
+        if not row["primary_doc"] and not OFFLINE:
+            # filed since the cached submissions were fetched
+            await load_history(cik10, f"{year}-01-01", f"{year + 1}-12-31", revalidate=True)
+            row = ACCESSIONS.get(accession)
+        if not row["primary_doc"] and not OFFLINE:
+            # EDGAR's submissions API can trail the feed; the filing's own index page cannot
+            doc = await _primary_from_index(row["cik"], accession)
+            if doc:
+                await asyncio.to_thread(ACCESSIONS.put_many, [(accession, row["cik"], row["form"], row["filed"], doc)])
+                row = ACCESSIONS.get(accession)
+        if not row["primary_doc"]:
+            raise ValueError("Primary document not found in issuer submissions")
+    return row
+
+
+async def _lookup_meta(accession: str) -> Dict[str, str]:
+    row = await resolve_accession(accession)
+    cik10 = zero_pad_cik(str(row["cik"]))
+    filed_at = datetime.fromisoformat(row["filed"])
+    filed_at_iso = filed_at.replace(tzinfo=timezone.utc).isoformat().replace("+00:00", "Z")
     acc_nodash = accession.replace("-", "")
-    # Need CIK to construct full path. We'll derive via submissions if not supplied.
+    base = f"https://www.sec.gov/Archives/edgar/data/{int(cik10)}/{acc_nodash}/"
     return {
-        "acc_nodash": acc_nodash,
+        "accession": accession,
+        "cik": cik10,
+        "form": row["form"],
+        "filed_at": filed_at_iso,
+        "index_url": urljoin(base, f"{accession}.txt"),
+        "doc_url": urljoin(base, row["primary_doc"]),
     }
 
 
-async def _lookup_meta_from_submissions(accession: str) -> Dict[str, str]:
-    # Brute-force via submissions index: the first 10 digits are the CIK
-    # Some accessions embed CIK; if not, try all? Instead, query the daily index is heavy.
-    # Here we assume accession includes CIK prefix (standard case).
-    cik_prefix = accession.split("-")[0]
-    cik10 = zero_pad_cik(cik_prefix)
-    subs_url = f"https://data.sec.gov/submissions/CIK{cik10}.json"
-    subs = await fetch_json(subs_url, cache_key=f"subs_{cik10}", cache_ttl=24 * 3600)
-    recent = subs.get("filings", {}).get("recent", {})
-    forms = recent.get("form", [])
-    accs = recent.get("accessionNumber", [])
-    filed = recent.get("filingDate", [])
-    primary_docs = recent.get("primaryDocument", [])
-    for i, acc in enumerate(accs):
-        if acc == accession:
-            form = forms[i]
-            filed_at = datetime.fromisoformat(filed[i])
-            filed_at_iso = filed_at.replace(tzinfo=timezone.utc).isoformat().replace("+00:00", "Z")
-            doc = primary_docs[i]
-            acc_nodash = accession.replace("-", "")
-            base = f"https://www.sec.gov/Archives/edgar/data/{int(cik10)}/{acc_nodash}/"
-            return {
-                "accession": accession,
-                "cik": cik10,
-                "form": form,
-                "filed_at": filed_at_iso,
-                "index_url": urljoin(base, f"{accession}.txt"),
-                "doc_url": urljoin(base, doc),
-            }
-    raise ValueError("Accession not found in submissions")
-
-
-async def fetch_primary_doc(accession: str, urls: Dict[str, str] | None = None):
-    meta = await _lookup_meta_from_submissions(accession)
-    # Primary doc may be HTML or text. If .txt, we still return as string.
-    from httpx import AsyncClient
-    async with AsyncClient(timeout=20.0) as client:
-        resp = await client.get(meta["doc_url"], headers={"User-Agent": "sec-mcp/0.1 contact@example.com"})
-        resp.raise_for_status()
-        html = resp.text
-        return html, meta
-
-
-def accession_to_urls(accession: str) -> Dict[str, str]:
-    paths = _accession_to_paths(accession)
-    # Will be completed in _lookup_meta_from_submissions
-    return paths
+def _is_plain(doc_url: str) -> bool:
+    return doc_url.lower().endswith(".txt")
+
+
+async def convert_filing(accession: str, rec: dict) -> dict:
+    """Text, spans and section offsets for a stored raw document, computed in a worker."""
+    meta = rec["meta"]
+    # html -> text, spans and sectioning happen in one worker job
+    with stage("html_parse"):
+        out = await POOL.run(convert_document, str(DOCS.objects.root), rec["raw"], _is_plain(meta["doc_url"]), meta["form"])
+    return DOCS.attach_text(
+        accession, out["text"], out["text_index"], out["chars"], spans=out["spans"], sections=(out["sections"], out["version"])
+    )
+
+
+async def _download_raw(accession: str) -> dict:
+    async with host_lock(f"raw:{accession}"):
+        # the document store is shared by every server process on the host
+        rec = DOCS.get(accession)
+        if rec and rec.get("raw") and DOCS.objects.path(rec["raw"]).exists():
+            return rec
+        if OFFLINE:
+            # the bulk archives carry no documents, only what the store already holds
+            raise ValueError("Filing document not in the local store (offline mode)")
+        meta = await _lookup_meta(accession)
+        sha, size = await download_stream(meta["doc_url"], _RawSink)
+        return DOCS.attach(accession, "raw", sha, size, meta=meta)
+
+
+async def download_filing(accession: str) -> dict:
+    """Stream the primary document into the store; returns its record."""
+    return await INFLIGHT.do(f"raw:{accession}", lambda: _download_raw(accession))
+
+
+async def _fetch_and_convert(accession: str) -> dict:
+    return await convert_filing(accession, await download_filing(accession))
+
 
+async def ensure_filing(accession: str) -> dict:
+    """Docstore record of an accession with its text, spans and sections in place.
 
+    Served from the document store when possible. Otherwise the document is
+    streamed to disk and, once the download is complete, converted in a
+    worker process that reads it back in chunks and also computes the
+    section offsets while the text is in hand.
+    """
+    rec = DOCS.get(accession)
+    if rec:
+        if DOCS.has_text(rec):
+            return rec
+        if rec.get("raw") and DOCS.objects.path(rec["raw"]).exists():
+            return await INFLIGHT.do(f"doc:{accession}", lambda: convert_filing(accession, rec))
+    return await INFLIGHT.do(f"doc:{accession}", lambda: _fetch_and_convert(accession))
@@ -1,36 +1,140 @@
-from typing import Optional
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import List, Optional
+from rapidfuzz import fuzz, process
 from schemas.models import Company
 from adapters.sec_api import fetch_json
+from adapters.bulk_store import BULK, OFFLINE
 
 # SEC provides a mapping of tickers to CIKs. Cache it for a week.
 TICKER_TTL = 7 * 24 * 3600
+TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
 
-async def find_company_impl(query: str) -> Company:
-    q = query.strip().upper()
-    url = "https://www.sec.gov/files/company_tickers.json"
-    data = await fetch_json(url, cache_key="company_tickers", cache_ttl=TICKER_TTL)
+# Trigrams shared by more than this fraction of names (e.g. "inc", "cor") add
+# candidates without adding signal, so they are skipped when ranking.
+_COMMON_TRIGRAM = 0.05
+_MAX_CANDIDATES = 256
+# Below this WRatio score a name is not considered a match at all.
+_MIN_SCORE = 50
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+# Legal-form suffixes carry no identity: "Apple Inc." should match "apple" exactly.
+_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "llc", "plc", "lp", "sa", "nv", "ag", "the"}
+
+
+def _norm(s: str) -> str:
+    words = _NON_ALNUM.sub(" ", s.lower()).split()
+    return " ".join(w for w in words if w not in _SUFFIXES) or " ".join(words)
+
+
+def _trigrams(s: str):
+    s = f"  {s} "
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+class CompanyIndex:
+    """Lookup tables over company_tickers.json, built once per refresh of the file."""
+
+    def __init__(self, data: dict):
+        self.source = data
+        self.records = list(data.values())
+        self.by_ticker = {}
+        self.by_cik = {}
+        self.names = []
+        grams = defaultdict(list)
+        for i, v in enumerate(self.records):
+            self.by_ticker.setdefault(v["ticker"].upper(), i)
+            self.by_cik.setdefault(int(v["cik_str"]), i)
+            name = _norm(v["title"])
+            self.names.append(name)
+            for g in _trigrams(name):
+                grams[g].append(i)
+        self.grams = dict(grams)
+        # (normalized name, row) sorted for prefix range scans
+        self.sorted_names = sorted((n, i) for i, n in enumerate(self.names))
+
+    def lookup(self, q: str) -> Optional[int]:
+        q = q.strip().upper()
+        if q in self.by_ticker:
+            return self.by_ticker[q]
+        if q.isdigit():
+            return self.by_cik.get(int(q))
+        return None
+
+    def _prefixed(self, qn: str, limit: int):
+        lo = bisect_left(self.sorted_names, (qn, -1))
+        out = []
+        for name, i in self.sorted_names[lo : lo + limit]:
+            if not name.startswith(qn):
+                break
+            out.append(i)
+        return out
 
+    def search(self, query: str, k: int = 5) -> List[tuple]:
+        """Rank names against `query`; returns up to k (row, score) pairs, best first."""
+        qn = _norm(query)
+        if not qn:
+            return []
+        counts = defaultdict(int)
+        cutoff = max(1, int(len(self.records) * _COMMON_TRIGRAM))
+        for g in _trigrams(qn):
+            post = self.grams.get(g)
+            if post and len(post) <= cutoff:
+                for i in post:
+                    counts[i] += 1
+        cands = sorted(counts, key=counts.__getitem__, reverse=True)[:_MAX_CANDIDATES]
+        prefixed = self._prefixed(qn, 32)
+        cands = list(dict.fromkeys(prefixed + cands))
+        if not cands:
+            return []
+
+        choices = {i: self.names[i] for i in cands}
+        scored = process.extract(qn, choices, scorer=fuzz.WRatio, limit=max(k * 4, 20))
+        prefix_set = set(prefixed)
+        ranked = []
+        for _, score, i in scored:
+            if self.names[i] == qn:
+                score += 20
+            elif i in prefix_set:
+                score += 10
+            # plain ratio breaks ties in favour of names close to the whole query
+            ranked.append((i, score, fuzz.ratio(qn, self.names[i])))
+        ranked.sort(key=lambda r: (-r[1], -r[2]))
+        return [(i, score) for i, score, _ in ranked[:k]]
+
+    def company(self, i: int) -> Company:
+        rec = self.records[i]
+        return Company(name=rec["title"], ticker=rec["ticker"], cik=str(rec["cik_str"]).zfill(10))
+
+
+_INDEX: Optional[CompanyIndex] = None
+
+
+async def company_index() -> CompanyIndex:
+    global _INDEX
     # company_tickers.json is a dict of index -> {ticker, cik_str, title}
-    by_ticker = {v["ticker"].upper(): v for v in data.values()}
-    by_cik = {v["cik_str"]: v for v in data.values()}
-
-    rec = None
-    if q in by_ticker:
-        rec = by_ticker[q]
-    elif q.isdigit() and int(q) in by_cik:
-        rec = by_cik[int(q)]
+    if OFFLINE:
+        # rebuilt from the submissions archive's names and tickers
+        data = BULK.tickers()
     else:
-        # fallback: fuzzy title match
-        qn = q.lower()
-        for v in data.values():
-            if qn in v["title"].lower():
-                rec = v
-                break
+        data = await fetch_json(TICKERS_URL, cache_key="company_tickers", cache_ttl=TICKER_TTL)
+    # the memory cache hands back the same object until the file is refreshed
+    if _INDEX is None or _INDEX.source is not data:
+        _INDEX = CompanyIndex(data)
+    return _INDEX
 
-    if not rec:
-        raise ValueError("Company not found")
 
-    cik = str(rec["cik_str"]).zfill(10)
-    return Company(name=rec["title"], ticker=rec["ticker"], cik=cik)
+async def search_companies_impl(query: str, limit: int = 5) -> List[Company]:
+    idx = await company_index()
+    exact = idx.lookup(query)
+    rows = [exact] if exact is not None else []
+    if len(rows) < limit:
+        rows += [i for i, score in idx.search(query, limit) if i != exact and score >= _MIN_SCORE]
+    return [idx.company(i) for i in rows[:limit]]
 
 
+async def find_company_impl(query: str) -> Company:
+    matches = await search_companies_impl(query, limit=1)
+    if not matches:
+        raise ValueError("Company not found")
+    return matches[0]
@@ -1,31 +1,104 @@
-from ..schemas.models import SectionDiff, SectionName
-from .filings import search_filings_impl
-from .sections import get_sections_impl
-from .sentdiff import sentence_diff
+import asyncio
+from typing import List
+
+from adapters.metrics import stage
+from adapters.workers import POOL
+from schemas.models import (
+    Filing, HistoryStep, ModifiedSentence, SectionDiff, SectionHistory, SectionName, SentenceEdit, SentenceHistory,
+)
+from tools.common import DOCS, zero_pad_cik
+from tools.company import find_company_impl
+from tools.filings import search_filings_impl
+from tools.sections import get_sections_impl
+from tools.sectioner import SECTIONER_VERSION
+from tools.jobs import fingerprint_section
+from tools.sentdiff import diff_sentences, lineage
+
+# Hard cap on filings per diff_history call; each one is a full document fetch.
+MAX_HISTORY = 20
+
+
+async def _resolve_cik(cik_or_ticker: str) -> str:
+    if cik_or_ticker.strip().isdigit():
+        return zero_pad_cik(cik_or_ticker)
+    return (await find_company_impl(cik_or_ticker)).cik
+
+
+async def _section_text(accession: str, section: SectionName) -> str:
+    fs = await get_sections_impl(accession, [section])
+    return fs.sections[0].text if fs.sections else ""
+
+
+async def section_sentences(accession: str, section: SectionName) -> dict:
+    """Sentences and fingerprints of one filing section, computed once per filing."""
+    rec = DOCS.get(accession)
+    data = DOCS.load_sentences(rec, section, SECTIONER_VERSION) if rec else None
+    if data is None:
+        text = await _section_text(accession, section)
+        with stage("diff"):
+            data = await POOL.run(fingerprint_section, text)
+        DOCS.put_sentences(accession, section, data, SECTIONER_VERSION)
+    return data
 
 
 async def diff_last_two_impl(cik_or_ticker: str, form: str, section: SectionName) -> SectionDiff:
-    filings = await search_filings_impl(cik_or_ticker, [form], None, None, limit=2)
+    cik10 = await _resolve_cik(cik_or_ticker)
+    filings = await search_filings_impl(cik10, [form], None, None, limit=2)
     if len(filings) < 2:
         raise ValueError("Not enough filings to diff")
     a, b = filings[1], filings[0]
-    sa = await get_sections_impl(a.accession, [section])
-    sb = await get_sections_impl(b.accession, [section])
-    ta = sa.sections[0].text if sa.sections else ""
-    tb = sb.sections[0].text if sb.sections else ""
-    added, removed = sentence_diff(ta, tb)
+    ta, tb = await asyncio.gather(_section_text(a.accession, section), _section_text(b.accession, section))
+    with stage("diff"):
+        added, removed, modified = await POOL.run(diff_sentences, ta, tb)
     return SectionDiff(
         accession_a=a.accession,
         accession_b=b.accession,
-        cik=b.cik if hasattr(b, "cik") else "",
+        cik=cik10,
         form=form,
         section=section,
-        filed_at_a=getattr(a, "filed", ""),
-        filed_at_b=getattr(b, "filed", ""),
+        filed_at_a=a.filed,
+        filed_at_b=b.filed,
         added=added,
         removed=removed,
+        modified=[ModifiedSentence(old=o, new=n, score=sc) for o, n, sc in modified],
         summary=None,
         source_urls=[a.url, b.url],
     )
 
 
+async def diff_history_impl(cik_or_ticker: str, form: str, section: SectionName, count: int = 5) -> SectionHistory:
+    """Chained diff of a section across the last `count` filings of a form."""
+    cik10 = await _resolve_cik(cik_or_ticker)
+    filings: List[Filing] = await search_filings_impl(cik10, [form], None, None, limit=max(2, min(count, MAX_HISTORY)))
+    if len(filings) < 2:
+        raise ValueError("Not enough filings to diff")
+    filings.reverse()
+    data = await asyncio.gather(*(section_sentences(f.accession, section) for f in filings))
+    versions = [d["sentences"] for d in data]
+    with stage("diff"):
+        lines = await POOL.run(lineage, versions, [d["fingerprints"] for d in data])
+
+    steps = [
+        HistoryStep(accession_a=filings[v - 1].accession, accession_b=f.accession, added=0, removed=0, modified=0)
+        for v, f in enumerate(filings) if v
+    ]
+    sentences = []
+    for line in lines:
+        first, last = line["first"], line["last"]
+        if first:
+            steps[first - 1].added += 1
+        if last < len(filings) - 1:
+            steps[last].removed += 1
+        edits = []
+        for v, i, j, score in line["edits"]:
+            steps[v - 1].modified += 1
+            edits.append(SentenceEdit(accession=filings[v].accession, old=versions[v - 1][i], new=versions[v][j], score=score))
+        sentences.append(
+            SentenceHistory(
+                text=versions[last][line["pos"]],
+                first_seen=filings[first].accession,
+                last_seen=filings[last].accession,
+                edits=edits,
+            )
+        )
+    return SectionHistory(cik=cik10, form=form, section=section, filings=filings, steps=steps, sentences=sentences)
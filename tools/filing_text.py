@@ -1,11 +1,48 @@
-from ..schemas.models import FilingText
-from .common import accession_to_urls, fetch_primary_doc, html_to_text
+from bisect import bisect_left, bisect_right
+from typing import Optional
 
+from schemas.models import FilingText
+from tools.common import DOCS, ensure_filing
+from tools.htmltext import spans_to_dicts
+from tools.search import index_filing
+from tools.sectioner import SECTIONER_VERSION
+from tools.window import encode_cursor, requested_window, snap_end
 
-async def get_filing_text_impl(accession: str) -> FilingText:
-    urls = accession_to_urls(accession)
-    html, meta = await fetch_primary_doc(accession, urls)
-    text = html_to_text(html)
+
+async def get_filing_text_impl(
+    accession: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_spans: bool = False,
+) -> FilingText:
+    """The filing's text, or the window of it asked for, sliced from the stored copy.
+
+    A window that stops short of the end is cut at a section start or line
+    break and carries a next_cursor for the rest. With include_spans, the
+    html offset spans overlapping the window come back too.
+    """
+    window = requested_window(accession, offset, length, max_tokens, cursor)
+    rec = await ensure_filing(accession)
+    meta = rec["meta"]
+    sections = DOCS.load_sections(rec, SECTIONER_VERSION)
+    await index_filing(rec, sections)
+    total = DOCS.text_length(rec)
+    start, size = window or (0, None)
+    start = min(start, total)
+    end = total if size is None else min(total, start + size)
+    text = DOCS.read_text(rec, start, end)
+    if end < total:
+        bounds = sorted(s["start"] for s in (sections or {}).values())
+        end = snap_end(start, end, total, text, bounds)
+        text = text[: end - start]
+    spans = DOCS.load_spans(rec) if include_spans else None
+    if spans is not None and (start, end) != (0, total):
+        # spans are in document order; keep those overlapping the window
+        lo = bisect_right(spans[3::4], start)
+        hi = bisect_left(spans[2::4], end)
+        spans = spans[lo * 4 : hi * 4]
     return FilingText(
         accession=meta["accession"],
         cik=meta["cik"],
@@ -13,7 +50,8 @@ async def get_filing_text_impl(accession: str) -> FilingText:
         filed_at=meta["filed_at"],
         source_url=meta["doc_url"],
         text=text,
-        spans=None,
+        spans=spans_to_dicts(spans) if spans is not None else None,
+        offset=start,
+        total_length=total,
+        next_cursor=encode_cursor(accession, end) if end < total else None,
     )
-
-
@@ -1,38 +1,178 @@
-from typing import List, Optional
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from heapq import merge
+from typing import Dict, List, Optional
 from schemas.models import Filing
+from adapters.accession_index import ACCESSIONS
+from adapters.bulk_store import BULK, OFFLINE
 from adapters.sec_api import fetch_json
 
 FILINGS_TTL = 24 * 3600
+# Older history shards never change once written.
+SHARD_TTL = 7 * 24 * 3600
+MAX_INDEXES = 256
 
 def _filing_url(accession: str, cik10: str):
     acc_no_dashes = accession.replace("-", "")
     return f"https://www.sec.gov/Archives/edgar/data/{int(cik10)}/{acc_no_dashes}/{accession}.txt"
 
+
+class FilingsIndex:
+    """Columnar view of one CIK's filing history, sorted by filing date ascending.
+
+    Starts from submissions' `filings.recent` block; older `filings.files`
+    shards are merged in only when a query's date range reaches them.
+    """
+
+    def __init__(self, cik10: str, subs: dict):
+        self.cik10 = cik10
+        self.source = subs
+        self.filed: List[str] = []
+        self.form: List[str] = []
+        self.accession: List[str] = []
+        self.primary_doc: List[str] = []
+        self.form_pos: Dict[str, List[int]] = {}
+        filings = subs.get("filings", {})
+        self.shards = [dict(f) for f in filings.get("files", [])]
+        self._merge(filings.get("recent", {}))
+
+    def _merge(self, cols: dict):
+        filed = self.filed + cols.get("filingDate", [])
+        form = self.form + cols.get("form", [])
+        acc = self.accession + cols.get("accessionNumber", [])
+        docs = self.primary_doc + cols.get("primaryDocument", [""] * len(cols.get("accessionNumber", [])))
+        order = sorted(range(len(acc)), key=lambda i: (filed[i], acc[i]))
+        seen = set()
+        self.filed, self.form, self.accession, self.primary_doc = [], [], [], []
+        for i in order:
+            if acc[i] in seen:
+                continue
+            seen.add(acc[i])
+            self.filed.append(filed[i])
+            self.form.append(form[i])
+            self.accession.append(acc[i])
+            self.primary_doc.append(docs[i])
+        pos: Dict[str, List[int]] = {}
+        for i, f in enumerate(self.form):
+            pos.setdefault(f, []).append(i)
+        self.form_pos = pos
+
+    def add_shard(self, name: str, cols: dict):
+        self._merge(cols)
+        for s in self.shards:
+            if s["name"] == name:
+                s["loaded"] = True
+
+    def query(self, form_types: List[str], start_date: Optional[str], end_date: Optional[str], limit: int) -> List[int]:
+        """Positions of the newest `limit` matching rows, newest first."""
+        lo = bisect_left(self.filed, start_date) if start_date else 0
+        # end_date is inclusive and filingDate is a plain YYYY-MM-DD string
+        hi = bisect_right(self.filed, end_date) if end_date else len(self.filed)
+        if hi <= lo or limit <= 0:
+            return []
+        if not form_types:
+            return list(range(hi - 1, max(lo, hi - limit) - 1, -1))
+        runs = []
+        for f in set(form_types):
+            p = self.form_pos.get(f)
+            if not p:
+                continue
+            a, b = bisect_left(p, lo), bisect_left(p, hi)
+            runs.append(reversed(p[max(a, b - limit) : b]))
+        out = []
+        for i in merge(*runs, reverse=True):
+            out.append(i)
+            if len(out) == limit:
+                break
+        return out
+
+    def shards_needed(self, start_date: Optional[str], end_date: Optional[str], cutoff: Optional[str]) -> List[dict]:
+        """Unloaded shards overlapping [start_date, end_date] that may hold rows newer than cutoff."""
+        need = []
+        for s in self.shards:
+            if s.get("loaded"):
+                continue
+            if start_date and s.get("filingTo", "9999") < start_date:
+                continue
+            if end_date and s.get("filingFrom", "0000") > end_date:
+                continue
+            if cutoff and s.get("filingTo", "9999") < cutoff:
+                continue
+            need.append(s)
+        return need
+
+    def filing(self, i: int) -> Filing:
+        acc = self.accession[i]
+        return Filing(accession=acc, form=self.form[i], filed=self.filed[i], url=_filing_url(acc, self.cik10))
+
+
+_INDEXES: "OrderedDict[str, FilingsIndex]" = OrderedDict()
+
+
+async def _record(cik10: str, cols: dict):
+    # every submissions block we read feeds the accession -> filing lookup
+    accs = cols.get("accessionNumber", [])
+    docs = cols.get("primaryDocument", [None] * len(accs))
+    rows = list(zip(accs, [int(cik10)] * len(accs), cols.get("form", []), cols.get("filingDate", []), docs))
+    await asyncio.to_thread(ACCESSIONS.put_many, rows)
+
+
+async def filings_index(cik10: str, revalidate: bool = False) -> FilingsIndex:
+    """Index of cik10's recent filings; revalidate skips the cache TTL for a just-filed accession."""
+    if OFFLINE:
+        data = BULK.submissions(f"CIK{cik10}.json")
+        if data is None:
+            raise ValueError(f"No submissions for CIK {cik10} in the bulk store")
+    else:
+        url = f"https://data.sec.gov/submissions/CIK{cik10}.json"
+        if revalidate:
+            data = await fetch_json(url, cache_key=f"subs_{cik10}", cache_ttl=0, stale_while_revalidate=False)
+        else:
+            data = await fetch_json(url, cache_key=f"subs_{cik10}", cache_ttl=FILINGS_TTL)
+    idx = _INDEXES.get(cik10)
+    # rebuild only when the cached submissions document was refreshed
+    if idx is None or idx.source is not data:
+        idx = FilingsIndex(cik10, data)
+        _INDEXES[cik10] = idx
+        await _record(cik10, data.get("filings", {}).get("recent", {}))
+        while len(_INDEXES) > MAX_INDEXES:
+            _INDEXES.popitem(last=False)
+    _INDEXES.move_to_end(cik10)
+    return idx
+
+
+async def _load_shards(idx: FilingsIndex, shards: List[dict]):
+    async def one(s):
+        if OFFLINE:
+            return s["name"], BULK.submissions(s["name"]) or {}
+        url = f"https://data.sec.gov/submissions/{s['name']}"
+        return s["name"], await fetch_json(url, cache_key=f"subs_{s['name']}", cache_ttl=SHARD_TTL)
+
+    for name, cols in await asyncio.gather(*(one(s) for s in shards)):
+        idx.add_shard(name, cols)
+        await _record(idx.cik10, cols)
+
+
+async def load_history(
+    cik10: str, start_date: Optional[str] = None, end_date: Optional[str] = None, revalidate: bool = False
+) -> FilingsIndex:
+    """Index for cik10 with every shard overlapping [start_date, end_date] merged in."""
+    idx = await filings_index(cik10, revalidate)
+    shards = idx.shards_needed(start_date, end_date, None)
+    if shards:
+        await _load_shards(idx, shards)
+    return idx
+
+
 async def search_filings_impl(cik: str, form_types: List[str], start_date: Optional[str], end_date: Optional[str], limit: int) -> List[Filing]:
     cik10 = str(int(cik)).zfill(10)
-    url = f"https://data.sec.gov/submissions/CIK{cik10}.json"
-    data = await fetch_json(url, cache_key=f"subs_{cik10}", cache_ttl=FILINGS_TTL)
-
-    forms = data.get("filings", {}).get("recent", {})
-    rows = []
-    for i in range(len(forms.get("accessionNumber", []))):
-        form = forms["form"][i]
-        if form_types and form not in form_types:
-            continue
-        filed = forms["filingDate"][i]
-        acc = forms["accessionNumber"][i]
-        if start_date and filed < start_date:
-            continue
-        if end_date and filed > end_date:
-            continue
-        rows.append(Filing(
-            accession=acc,
-            form=form,
-            filed=filed,
-            url=_filing_url(acc, cik10)
-        ))
-
-    rows.sort(key=lambda r: r.filed, reverse=True)
-    return rows[:limit]
-
+    idx = await filings_index(cik10)
 
+    rows = idx.query(form_types, start_date, end_date, limit)
+    cutoff = idx.filed[rows[-1]] if len(rows) >= limit else None
+    shards = idx.shards_needed(start_date, end_date, cutoff)
+    if shards:
+        await _load_shards(idx, shards)
+        rows = idx.query(form_types, start_date, end_date, limit)
+    return [idx.filing(i) for i in rows]
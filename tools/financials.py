@@ -1,8 +1,18 @@
-from typing import Dict
-from schemas.models import FinancialsSnapshot
-from adapters.sec_api import fetch_json
+import asyncio, json, os, re, struct, time, zlib
+from array import array
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional
+import numpy as np
+from schemas.models import FinancialsPanel, FinancialsSnapshot
+from adapters.bulk_store import BULK, OFFLINE
+from adapters.sec_api import CACHE, fetch_json
 
 FACTS_TTL = 7 * 24 * 3600
+MAX_TABLES = 512
+# companyfacts downloads in flight at once for a panel; all of them still share
+# the global rate limiter.
+PANEL_CONCURRENCY = int(os.environ.get("SEC_MCP_PANEL_CONCURRENCY", "8"))
 
 TAG_MAP = {
     "Revenue": ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax", "SalesRevenueNet"],
@@ -16,51 +26,307 @@ TAG_MAP = {
     "OperatingCashFlow": ["NetCashProvidedByUsedInOperatingActivities"],
     "Capex": ["PaymentsToAcquirePropertyPlantAndEquipment"]
 }
+# Balance-sheet concepts are point-in-time values rather than durations.
+INSTANT_CONCEPTS = ("CashAndCashEquivalents", "LongTermDebt", "CurrentAssets", "CurrentLiabilities")
 
-def _pick_fact(facts: Dict, gaap_name: str, period_key: str):
-    # facts structure: {"facts":{"us-gaap":{"Tag":{"units":{"USD":[{...}]}}}}}
+_FP = {"FY": 0, "Q1": 1, "Q2": 2, "Q3": 3, "Q4": 4}
+_PERIOD = re.compile(r"^(?:(FY|Q[1-4])\s*-?\s*(\d{4})|(\d{4})\s*-?\s*(FY|Q[1-4])?)$")
+_UNITS = ("USD", "USD/share", "USD/shares")
+# Duration windows (days) for annual, quarterly and nine-month year-to-date facts.
+_ANNUAL = (340, 380)
+_QUARTER = (80, 100)
+_NINE_MONTHS = (260, 285)
+_YTD9 = 5  # pseudo fiscal period: Q3 year-to-date, used to derive Q4
+_EPOCH = date(1970, 1, 1).toordinal()
+_QUARTER_DAYS = 365.25 / 4
+# key fiscal period -> fiscal quarter it ends; FY ends with Q4, Q3 YTD with Q3
+_QUARTER_POS = {0: 4, 1: 1, 2: 2, 3: 3, 4: 4, _YTD9: 3}
+# Bumped whenever FactTable's row selection changes, so stored tables are rebuilt.
+FACT_TABLE_VERSION = 2
+# FactTable columns in serialized order, with their array typecodes.
+_COLUMNS = (
+    ("concept", "H"), ("unit", "B"), ("form", "H"), ("fy", "H"), ("fp", "B"),
+    ("start", "i"), ("end", "i"), ("filed", "i"), ("val", "d"),
+)
+
+
+def parse_period(period: str):
+    """'FY2023', 'Q1 2024', '2024Q1', '2023' -> (fiscal year, fiscal period)."""
+    m = _PERIOD.match(period.strip().upper())
+    if not m:
+        raise ValueError(f"Unrecognized period {period!r}; use e.g. FY2023 or Q1 2024")
+    if m.group(2):
+        return int(m.group(2)), m.group(1)
+    return int(m.group(3)), m.group(4) or "FY"
+
+
+def _day(s: str) -> int:
+    return date.fromisoformat(s).toordinal() - _EPOCH
+
+
+class FactTable:
+    """Columnar us-gaap facts for one company, indexed by (concept, fiscal period).
+
+    Built once per companyfacts download. Each (concept, fy, fp, instant) key
+    points at the single row that reports that period: for durations the fact
+    whose length matches the period (so Q2's 6-month YTD value is skipped), for
+    instants the balance at period end. The company's own filing for the period
+    wins, latest amendment first; otherwise the first later filing that carries
+    it as a comparative.
+    """
+
+    def __init__(self, facts: Dict):
+        self.concepts: List[str] = []
+        self.units: List[str] = []
+        self.forms: List[str] = []
+        self.concept = array("H")
+        self.unit = array("B")
+        self.form = array("H")
+        self.fy = array("H")
+        self.fp = array("B")
+        self.start = array("i")  # days since epoch, -1 for instants
+        self.end = array("i")
+        self.filed = array("i")
+        self.val = array("d")
+        self.index: Dict[tuple, int] = {}
+        self.ts = None
+        self._build(facts.get("facts", {}).get("us-gaap", {}))
+
+    def _intern(self, table: List[str], ids: Dict[str, int], v: str) -> int:
+        i = ids.get(v)
+        if i is None:
+            i = ids[v] = len(table)
+            table.append(v)
+        return i
+
+    def _build(self, gaap: Dict):
+        unit_ids, form_ids = {}, {}
+        index = self.index
+        groups: Dict[tuple, List[int]] = {}
+        for tag, node in gaap.items():
+            c = len(self.concepts)
+            self.concepts.append(tag)
+            for unit, items in node.get("units", {}).items():
+                if unit not in _UNITS:
+                    continue
+                u = self._intern(self.units, unit_ids, unit)
+                for it in items:
+                    fp = _FP.get(it.get("fp"))
+                    fy = it.get("fy")
+                    if fp is None or not fy or "end" not in it:
+                        continue
+                    end = _day(it["end"])
+                    start = _day(it["start"]) if it.get("start") else -1
+                    if start >= 0:
+                        days = end - start
+                        if _ANNUAL[0] <= days <= _ANNUAL[1] and fp == 0:
+                            key_fp = 0
+                        elif _QUARTER[0] <= days <= _QUARTER[1]:
+                            # a 3-month duration inside a 10-K is the fourth quarter
+                            key_fp = 4 if fp == 0 else fp
+                        elif _NINE_MONTHS[0] <= days <= _NINE_MONTHS[1] and fp == 3:
+                            key_fp = _YTD9
+                        else:
+                            continue
+                    else:
+                        key_fp = fp
+                    row = len(self.val)
+                    self.concept.append(c)
+                    self.unit.append(u)
+                    self.form.append(self._intern(self.forms, form_ids, it.get("form", "")))
+                    self.fy.append(fy)
+                    self.fp.append(fp)
+                    self.start.append(start)
+                    self.end.append(end)
+                    self.filed.append(_day(it["filed"]) if it.get("filed") else 0)
+                    self.val.append(float(it["val"]))
+
+                    groups.setdefault((c, fy, key_fp, start < 0), []).append(row)
+
+        # Rows sharing a key come from filings for the same fiscal period; the
+        # one ending last is that period's figure, earlier ends are comparatives
+        # placed by how many fiscal quarters back they end: prior years for
+        # durations, and also the prior year-end balance a 10-Q carries.
+        # Comparatives only fill in periods whose own filing is missing.
+        ranked = {}
+        for (c, fy, key_fp, instant), rows in groups.items():
+            last = max(self.end[r] for r in rows)
+            for r in rows:
+                back = round((last - self.end[r]) / _QUARTER_DAYS)
+                if back % 4 == 0:
+                    year, fp = fy - back // 4, key_fp
+                elif instant:
+                    q = _QUARTER_POS[key_fp] - back
+                    year, fp = fy + (q - 1) // 4, (q - 1) % 4 + 1
+                    fp = 0 if fp == 4 else fp  # fiscal year-end balances are keyed FY
+                else:
+                    continue
+                key = (c, year, fp, instant)
+                own = self.end[r] == last
+                rank = (own, self.filed[r] if own else -self.filed[r])
+                if key not in ranked or rank > ranked[key]:
+                    ranked[key] = rank
+                    index[key] = r
+        self._concept_ids = {c: i for i, c in enumerate(self.concepts)}
+
+    def to_bytes(self) -> bytes:
+        """Compressed binary form (native byte order), for the bulk store."""
+        head = json.dumps(
+            {"concepts": self.concepts, "units": self.units, "forms": self.forms, "rows": len(self.val), "version": FACT_TABLE_VERSION}
+        )
+        keys = array("i")
+        for (c, fy, fp, instant), row in self.index.items():
+            keys.extend((c, fy, fp, instant, row))
+        parts = [struct.pack("<I", len(head)), head.encode()]
+        parts += [getattr(self, name).tobytes() for name, _ in _COLUMNS]
+        parts.append(keys.tobytes())
+        return zlib.compress(b"".join(parts), 6)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "FactTable":
+        data = zlib.decompress(blob)
+        (n,) = struct.unpack_from("<I", data)
+        head = json.loads(data[4 : 4 + n])
+        if head.get("version") != FACT_TABLE_VERSION:
+            raise ValueError("Bulk store facts predate this version; reload them with python -m ingestion.bulk --companyfacts")
+        pos = 4 + n
+        table = cls.__new__(cls)
+        table.concepts, table.units, table.forms = head["concepts"], head["units"], head["forms"]
+        for name, code in _COLUMNS:
+            col = array(code)
+            end = pos + head["rows"] * col.itemsize
+            col.frombytes(data[pos:end])
+            setattr(table, name, col)
+            pos = end
+        keys = array("i")
+        keys.frombytes(data[pos:])
+        table.index = {(keys[i], keys[i + 1], keys[i + 2], bool(keys[i + 3])): keys[i + 4] for i in range(0, len(keys), 5)}
+        table.ts = None
+        table._concept_ids = {c: i for i, c in enumerate(table.concepts)}
+        return table
+
+    def _row(self, c: int, fy: int, fp: int):
+        row = self.index.get((c, fy, fp, False))
+        if row is None:
+            # balance-sheet concepts are instants; Q4's balance is the fiscal year-end one
+            row = self.index.get((c, fy, 0 if fp == 4 else fp, True))
+        return row
+
+    def value(self, tag: str, fy: int, fp: str):
+        c = self._concept_ids.get(tag)
+        if c is None:
+            return None
+        code = _FP[fp]
+        row = self._row(c, fy, code)
+        if row is not None:
+            v = self.val[row]
+            return int(v) if v.is_integer() else v
+        if code == 4:
+            # Q4 is rarely tagged on its own: fiscal year less the Q3 year-to-date
+            annual = self.index.get((c, fy, 0, False))
+            ytd = self.index.get((c, fy, _YTD9, False))
+            if annual is not None and ytd is not None:
+                v = self.val[annual] - self.val[ytd]
+                return int(v) if v.is_integer() else v
+        return None
+
+
+def _pick_fact(facts: FactTable, gaap_name: str, period_key: str):
+    fy, fp = parse_period(period_key)
     tag_aliases = TAG_MAP.get(gaap_name, [gaap_name])
     for tag in tag_aliases:
-        node = facts.get("facts", {}).get("us-gaap", {}).get(tag)
-        if not node:
-            continue
-        # Look for USD values and pick the one matching the period
-        for unit, items in node.get("units", {}).items():
-            if unit not in ("USD", "USD/share", "USD/shares"):
-                continue
-            # Choose the last item in the given fiscal period label
-            # period_key examples: FY2023, Q1 2024. We try to match by "fy" and "fp"
-            # If no exact match, take the latest item.
-            latest = sorted(items, key=lambda x: (x.get("fy", 0), x.get("fp", ""), x.get("end", "")))[-1]
-            return latest.get("val")
+        v = facts.value(tag, fy, fp)
+        if v is not None:
+            return v
     return None
 
+
+_TABLES: "OrderedDict[str, FactTable]" = OrderedDict()
+
+
+def _bulk_fact_table(cik10: str, table: Optional[FactTable]) -> FactTable:
+    crc = BULK.facts_crc(int(cik10))
+    if crc is None:
+        raise ValueError(f"No companyfacts for CIK {cik10} in the bulk store")
+    if table is None or table.ts != crc:
+        table = FactTable.from_bytes(BULK.facts_blob(int(cik10)))
+        table.ts = crc
+    return table
+
+
+async def fact_table(cik10: str) -> FactTable:
+    url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik10}.json"
+    key = f"facts_{cik10}"
+    table = _TABLES.get(cik10)
+    ts = None if OFFLINE else CACHE.stamp(key, {"url": url})
+    if OFFLINE:
+        _TABLES[cik10] = table = _bulk_fact_table(cik10, table)
+    elif table is None or ts is None or table.ts != ts or time.time() - ts > FACTS_TTL:
+        facts = await fetch_json(url, cache_key=key, cache_ttl=FACTS_TTL)
+        ts = CACHE.stamp(key, {"url": url})
+        if table is None or table.ts != ts:
+            table = FactTable(facts)
+            table.ts = ts
+        _TABLES[cik10] = table
+        while len(_TABLES) > MAX_TABLES:
+            _TABLES.popitem(last=False)
+    _TABLES.move_to_end(cik10)
+    return table
+
+# derived metric -> TAG_MAP concepts it is computed from
+DERIVED = {
+    "free_cash_flow": ("OperatingCashFlow", "Capex"),
+    "gross_margin": ("Revenue", "CostOfRevenue"),
+    "operating_margin": ("Revenue", "OperatingIncomeLoss"),
+    "net_margin": ("Revenue", "NetIncomeLoss"),
+    "current_ratio": ("CurrentAssets", "CurrentLiabilities"),
+}
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    # zero denominators give NaN rather than inf, like the scalar `if rev` guards did
+    out = np.full(num.shape, np.nan)
+    np.divide(num, den, out=out, where=(den != 0) & ~np.isnan(den))
+    return out
+
+
+def derive_columns(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Derived metrics over whole columns at once; NaN marks a missing input."""
+    nan = np.full(len(next(iter(cols.values()))) if cols else 0, np.nan)
+    rev = cols.get("Revenue", nan)
+    cogs = cols.get("CostOfRevenue", nan)
+    cur_a = cols.get("CurrentAssets", nan)
+    cur_l = cols.get("CurrentLiabilities", nan)
+    return {
+        "free_cash_flow": cols.get("OperatingCashFlow", nan) + cols.get("Capex", nan),
+        "gross_margin": _ratio(rev - cogs, rev),
+        "operating_margin": _ratio(cols.get("OperatingIncomeLoss", nan), rev),
+        "net_margin": _ratio(cols.get("NetIncomeLoss", nan), rev),
+        "current_ratio": np.where(cur_a != 0, _ratio(cur_a, cur_l), np.nan),
+    }
+
+
+def _scalar(v):
+    if v is None or np.isnan(v):
+        return None
+    v = float(v)
+    return int(v) if v.is_integer() else v
+
+
 def _derived(snapshot: dict):
     try:
-        rev = snapshot["income_statement"].get("Revenue")
-        cogs = snapshot["income_statement"].get("CostOfRevenue")
-        op_inc = snapshot["income_statement"].get("OperatingIncomeLoss")
-        net = snapshot["income_statement"].get("NetIncomeLoss")
-        ocf = snapshot["cash_flow"].get("OperatingCashFlow")
-        capex = snapshot["cash_flow"].get("Capex")
-        cur_a = snapshot["balance_sheet"].get("CurrentAssets")
-        cur_l = snapshot["balance_sheet"].get("CurrentLiabilities")
-        fcf = ocf + capex if (ocf is not None and capex is not None) else None
-        gross = (rev - cogs) if (rev is not None and cogs is not None) else None
-        return {
-            "free_cash_flow": fcf,
-            "gross_margin": (gross / rev) if (gross is not None and rev) else None,
-            "operating_margin": (op_inc / rev) if (op_inc is not None and rev) else None,
-            "net_margin": (net / rev) if (net is not None and rev) else None,
-            "current_ratio": (cur_a / cur_l) if (cur_a and cur_l) else None
-        }
+        cols = {}
+        for part in ("income_statement", "balance_sheet", "cash_flow"):
+            for k, v in snapshot[part].items():
+                cols[k] = np.array([np.nan if v is None else v], dtype=float)
+        return {k: _scalar(v[0]) for k, v in derive_columns(cols).items()}
     except Exception:
         return {}
 
 async def get_financials_impl(cik: str, period: str) -> FinancialsSnapshot:
     cik10 = str(int(cik)).zfill(10)
-    url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik10}.json"
-    facts = await fetch_json(url, cache_key=f"facts_{cik10}", cache_ttl=FACTS_TTL)
+    parse_period(period)
+    facts = await fact_table(cik10)
 
     income = {
         "Revenue": _pick_fact(facts, "Revenue", period),
@@ -93,3 +359,57 @@ async def get_financials_impl(cik: str, period: str) -> FinancialsSnapshot:
     return snap
 
 
+async def _resolve_cik(company: str) -> str:
+    if company.strip().isdigit():
+        return str(int(company)).zfill(10)
+    from tools.company import find_company_impl
+    return (await find_company_impl(company)).cik
+
+
+async def get_financials_panel_impl(
+    companies: List[str], periods: List[str], concepts: Optional[List[str]] = None, derived: Optional[List[str]] = None
+) -> FinancialsPanel:
+    concepts = list(concepts) if concepts else list(TAG_MAP)
+    derived = list(derived) if derived is not None else list(DERIVED)
+    unknown = [c for c in concepts if c not in TAG_MAP] + [d for d in derived if d not in DERIVED]
+    if unknown:
+        raise ValueError(f"Unknown concepts: {', '.join(unknown)}")
+    parsed = [parse_period(p) for p in periods]
+    needed = list(dict.fromkeys(concepts + [c for d in derived for c in DERIVED[d]]))
+
+    sem = asyncio.Semaphore(PANEL_CONCURRENCY)
+    errors: Dict[str, str] = {}
+
+    async def load(company: str):
+        async with sem:
+            try:
+                cik10 = await _resolve_cik(company)
+                return cik10, await fact_table(cik10)
+            except Exception as e:
+                errors[company] = str(e)
+                return None, None
+
+    loaded = await asyncio.gather(*(load(c) for c in companies))
+    tables = [(cik10, t) for cik10, t in loaded if t is not None]
+
+    # one row per (company, period); fill each concept column with table probes
+    n = len(tables) * len(parsed)
+    cols = {c: np.full(n, np.nan) for c in needed}
+    for c in needed:
+        col = cols[c]
+        aliases = TAG_MAP[c]
+        r = 0
+        for _, t in tables:
+            for fy, fp in parsed:
+                for tag in aliases:
+                    v = t.value(tag, fy, fp)
+                    if v is not None:
+                        col[r] = v
+                        break
+                r += 1
+    metrics = derive_columns(cols) if n else {}
+
+    out_cols = [cols[c] for c in concepts] + [metrics[d] for d in derived]
+    keys = [(cik10, p) for cik10, _ in tables for p in periods]
+    rows = [[cik10, p] + [_scalar(col[r]) for col in out_cols] for r, (cik10, p) in enumerate(keys)]
+    return FinancialsPanel(columns=["cik", "period"] + concepts + derived, rows=rows, errors=errors)
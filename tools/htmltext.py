@@ -0,0 +1,132 @@
+import re
+from array import array
+from html import unescape
+from typing import List, Tuple
+
+# Markup tokens. Each alternative also matches its own unterminated form at the
+# end of the buffer (the `open` group) so a tag split across chunks is held back.
+_TOKEN = re.compile(
+    r"<!--(?:.*?-->|(?P<open>.*\Z))"
+    r"|<!\[CDATA\[(?:.*?\]\]>|(?P<open_cdata>.*\Z))"
+    r"|<[!?][^>]*(?:>|(?P<open_decl>\Z))"
+    r"|<(?P<close>/?)(?P<name>[A-Za-z][\w:.-]*)"
+    r"(?P<attrs>[^>\"']*(?:(?:\"[^\"]*\"|'[^']*')[^>\"']*)*)(?:>|(?P<open_tag>\Z))",
+    re.S,
+)
+# Content of these is never text.
+_RAW = {"script", "style"}
+# Subtrees that hold no readable text: document head and the hidden inline
+# XBRL header (contexts, units, hidden facts).
+_SKIP = {"head", "ix:header"}
+
+
+class HtmlTextStream:
+    """Incremental HTML -> text converter that records offset spans.
+
+    Produces the same text as selectolax's ``body.text(separator="\\n",
+    strip=True)``: every non-blank text node, stripped, joined by newlines.
+    The document is fed in chunks (tools.jobs reads the stored raw blob back
+    that way); only an unfinished tag or text node is held back, so memory is
+    bounded by the output text, not the HTML.
+
+    Spans are (html_start, html_end, text_start, text_end) per emitted node,
+    with html offsets counted in characters of the decoded document.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._base = 0  # html offset of self._buf[0]
+        self._skip = 0
+        self._raw_end = None  # compiled closing-tag pattern while inside script/style
+        self._parts: List[str] = []
+        self._len = 0
+        self.spans = array("q")
+
+    def _emit(self, raw: str, start: int):
+        if self._skip or not raw or raw.isspace():
+            return
+        text = unescape(raw).strip() if "&" in raw else raw.strip()
+        if not text:
+            return
+        if self._parts:
+            self._parts.append("\n")
+            self._len += 1
+        self._parts.append(text)
+        self.spans.extend((start, start + len(raw), self._len, self._len + len(text)))
+        self._len += len(text)
+
+    def _tag(self, m: re.Match):
+        name = m.group("name")
+        # cheap reject: only head, ix:header, script and style change state
+        if not name or name[0] not in "hHiIsS":
+            return
+        name = name.lower()
+        closing = m.group("close") == "/"
+        self_closing = m.group("attrs").rstrip().endswith("/")
+        if name in _SKIP and not self_closing:
+            self._skip = max(0, self._skip + (-1 if closing else 1))
+        elif name in _RAW and not closing and not self_closing:
+            self._raw_end = re.compile(rf"</{name}\s*>", re.I)
+
+    def feed(self, chunk: str, final: bool = False):
+        buf = self._buf + chunk
+        pos = 0
+        while True:
+            if self._raw_end is not None:
+                m = self._raw_end.search(buf, pos)
+                if not m:
+                    # keep enough of the tail to match a closing tag split across chunks
+                    pos = len(buf) if final else max(pos, len(buf) - 16)
+                    break
+                self._raw_end = None
+                pos = m.end()
+            hold = None
+            for m in _TOKEN.finditer(buf, pos):
+                if m.lastgroup and m.lastgroup.startswith("open"):
+                    hold = m.start()
+                    break
+                if m.start() > pos:
+                    self._emit(buf[pos : m.start()], self._base + pos)
+                pos = m.end()
+                self._tag(m)
+                if self._raw_end is not None:
+                    break
+            if self._raw_end is not None:
+                continue
+            if hold is not None:
+                # text before an unfinished tag is a complete node
+                self._emit(buf[pos:hold], self._base + pos)
+                pos = len(buf) if final else hold
+            elif final:
+                self._emit(buf[pos:], self._base + pos)
+                pos = len(buf)
+            # otherwise the trailing text node may continue in the next chunk
+            break
+        self._buf = buf[pos:]
+        self._base += pos
+
+    def close(self) -> Tuple[str, array]:
+        self.feed("", final=True)
+        return "".join(self._parts), self.spans
+
+
+class PlainTextStream:
+    """Pass-through for primary documents that are already plain text."""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._len = 0
+
+    def feed(self, chunk: str, final: bool = False):
+        self._parts.append(chunk)
+        self._len += len(chunk)
+
+    def close(self) -> Tuple[str, array]:
+        return "".join(self._parts), array("q", (0, self._len, 0, self._len))
+
+
+def spans_to_dicts(spans: array) -> List[dict]:
+    return [
+        {"html_start": spans[i], "html_end": spans[i + 1], "text_start": spans[i + 2], "text_end": spans[i + 3]}
+        for i in range(0, len(spans), 4)
+    ]
@@ -0,0 +1,60 @@
+"""Entry points executed in worker processes (see adapters.workers).
+
+Documents travel by content address: a job reads its input blob from the
+object store and writes its output there, returning only addresses and
+offsets to the server process.
+"""
+from typing import Dict, Optional
+
+from adapters.docstore import ObjectStore, text_checkpoints
+from adapters.text_index import TEXT_INDEX
+from tools.htmltext import HtmlTextStream, PlainTextStream
+from tools.sectioner import SECTIONER_VERSION, extract_sections
+from tools.sentdiff import fingerprint, split_sents
+
+_STORES: Dict[str, ObjectStore] = {}
+
+
+def _objects(root: str) -> ObjectStore:
+    store = _STORES.get(root)
+    if store is None:
+        store = _STORES[root] = ObjectStore(root)
+    return store
+
+
+def convert_document(root: str, raw_sha: str, plain: bool, form: str) -> dict:
+    """Raw document blob -> text, checkpoints and spans blobs plus section offsets."""
+    objects = _objects(root)
+    conv = PlainTextStream() if plain else HtmlTextStream()
+    for chunk in objects.iter_text(raw_sha):
+        conv.feed(chunk)
+    text, spans = conv.close()
+    return {
+        "text": objects.put_plain(text.encode("utf-8")),
+        "text_index": objects.put(text_checkpoints(text).tobytes()),
+        "chars": len(text),
+        "spans": objects.put(spans.tobytes()),
+        "sections": extract_sections(text, form),
+        "version": SECTIONER_VERSION,
+    }
+
+
+def section_offsets(root: str, text_sha: str, form: str) -> dict:
+    return extract_sections(_objects(root).plain_path(text_sha).read_bytes().decode("utf-8"), form)
+
+
+def index_document(root: str, doc: dict, sections: dict, old_sha: Optional[str]) -> int:
+    """Add a stored text to the full-text index; returns the number of chunks written."""
+    objects = _objects(root)
+    text = objects.plain_path(doc["text_sha"]).read_bytes().decode("utf-8")
+    old_text = None
+    if old_sha == doc["text_sha"]:
+        old_text = text
+    elif old_sha and objects.plain_path(old_sha).exists():
+        old_text = objects.plain_path(old_sha).read_bytes().decode("utf-8")
+    return TEXT_INDEX.add(doc, text, sections, old_text)
+
+
+def fingerprint_section(text: str) -> dict:
+    sentences = split_sents(text)
+    return {"sentences": sentences, "fingerprints": [fingerprint(s) for s in sentences]}
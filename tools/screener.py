@@ -0,0 +1,227 @@
+import asyncio, json, operator, os, pathlib, re, time
+from collections import OrderedDict
+from typing import List, Optional
+import httpx
+import numpy as np
+from schemas.models import ScreenResult
+from adapters.bulk_store import BULK, OFFLINE
+from adapters.metrics import stage
+from adapters.sec_api import INFLIGHT, fetch_conditional
+from adapters.singleflight import host_lock
+from tools.financials import DERIVED, INSTANT_CONCEPTS, TAG_MAP, FactTable, _scalar, derive_columns, parse_period
+
+FRAMES_DIR = pathlib.Path(os.environ.get("SEC_MCP_FRAMES_DIR", ".cache/frames"))
+# Frames keep growing as late filers report; revalidate (ETag) after this long.
+FRAMES_TTL = 24 * 3600
+MAX_FRAMES = 128
+MAX_ROWS = 500
+
+_FILTER = re.compile(r"^\s*([A-Za-z_]+)\s*(>=|<=|==|!=|>|<|=)\s*(-?[\d.]+(?:e[+-]?\d+)?)\s*([KMBT]?)\s*$", re.I)
+_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq, "=": operator.eq, "!=": operator.ne}
+_SCALE = {"": 1, "K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+
+
+def frame_periods(fy: int, fp: str):
+    """(duration frame, instant frame) for a period, e.g. FY2023 -> CY2023, CY2023Q4I."""
+    if fp == "FY":
+        return f"CY{fy}", f"CY{fy}Q4I"
+    return f"CY{fy}{fp}", f"CY{fy}{fp}I"
+
+
+class Frame:
+    """One concept for one calendar period across every filer, as columns sorted by CIK."""
+
+    __slots__ = ("cik", "val", "name", "validators", "checked")
+
+    def __init__(self, cik: np.ndarray, val: np.ndarray, name: np.ndarray, validators: Optional[dict] = None, checked: float = 0.0):
+        self.cik, self.val, self.name = cik, val, name
+        self.validators = validators or {}
+        self.checked = checked
+
+    @classmethod
+    def from_json(cls, data: dict, validators: dict) -> "Frame":
+        rows = data.get("data", [])
+        cik = np.array([r["cik"] for r in rows], dtype=np.int64)
+        # a filer appears once per frame; keep the first should that ever change
+        cik, first = np.unique(cik, return_index=True)
+        val = np.array([r["val"] for r in rows], dtype=float)[first]
+        name = np.array([r.get("entityName", "") for r in rows], dtype=str)[first]
+        return cls(cik, val, name, validators)
+
+    def save(self, fp: pathlib.Path):
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        tmp = fp.with_name(f".{fp.name}.{os.getpid()}.tmp")
+        meta = json.dumps({"validators": self.validators, "checked": self.checked})
+        with open(tmp, "wb") as fh:
+            np.savez(fh, cik=self.cik, val=self.val, name=self.name, meta=np.array(meta))
+        os.replace(tmp, fp)
+
+    @classmethod
+    def load(cls, fp: pathlib.Path) -> "Frame":
+        with np.load(fp, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            return cls(z["cik"], z["val"], z["name"], meta["validators"], meta["checked"])
+
+
+_FRAMES: "OrderedDict[str, Frame]" = OrderedDict()
+
+
+async def _refresh_frame(key: str, url: str, frame: Optional[Frame]) -> Frame:
+    fp = FRAMES_DIR / f"{key}.npz"
+    async with host_lock(url):
+        # the columns on disk are shared by every server process on the host
+        if fp.exists():
+            disk = Frame.load(fp)
+            if time.time() - disk.checked <= FRAMES_TTL:
+                return disk
+            if frame is None or disk.checked > frame.checked:
+                frame = disk
+        try:
+            text, validators = await fetch_conditional(url, frame.validators if frame else None)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 404:
+                raise
+            # nobody reported the concept for that period
+            text, validators = '{"data": []}', {}
+        if text is not None:
+            frame = Frame.from_json(json.loads(text), validators)
+        frame.checked = time.time()
+        frame.save(fp)
+        return frame
+
+
+async def load_frame(tag: str, period: str, unit: str = "USD") -> Frame:
+    key = f"{tag}_{unit.replace('/', '-')}_{period}"
+    frame = _FRAMES.get(key)
+    if frame is None or time.time() - frame.checked > FRAMES_TTL:
+        url = f"https://data.sec.gov/api/xbrl/frames/us-gaap/{tag}/{unit}/{period}.json"
+        frame = _FRAMES[key] = await INFLIGHT.do(f"frame:{key}", lambda: _refresh_frame(key, url, frame))
+        while len(_FRAMES) > MAX_FRAMES:
+            _FRAMES.popitem(last=False)
+    _FRAMES.move_to_end(key)
+    return frame
+
+
+def _build_bulk_frames(missing: List[str], fy: int, fp: str) -> dict:
+    """Frames built from the bulk store's FactTables, by fiscal period, for `missing` tags.
+
+    The concept index narrows the scan to filers that ever reported a tag,
+    and each of their tables is decoded once for all tags. Runs in a thread,
+    so it leaves _FRAMES to the caller on the event loop.
+    """
+    titles = {c["cik_str"]: c["title"] for c in BULK.tickers().values()}
+    found = {t: ([], []) for t in missing}
+    for cik in sorted({cik for t in missing for cik in BULK.ciks_with(t)}):
+        blob = BULK.facts_blob(cik)
+        if blob is None:
+            continue
+        table = FactTable.from_bytes(blob)
+        for t in missing:
+            v = table.value(t, fy, fp)
+            if v is not None:
+                found[t][0].append(cik)
+                found[t][1].append(v)
+    return {
+        t: Frame(
+            np.array(ciks, dtype=np.int64), np.array(vals, dtype=float), np.array([titles.get(c, "") for c in ciks], dtype=str),
+            checked=time.time(),
+        )
+        for t, (ciks, vals) in found.items()
+    }
+
+
+async def _bulk_frames(tags: List[str], fy: int, fp: str) -> List[Frame]:
+    """One bulk frame per tag, cached in _FRAMES for the store generation."""
+    gen = BULK.generation()
+    frames = {t: _FRAMES.get(f"bulk_{gen}_{t}_{fy}{fp}") for t in tags}
+    missing = [t for t, f in frames.items() if f is None]
+    if missing:
+        frames.update(await asyncio.to_thread(_build_bulk_frames, missing, fy, fp))
+    for t, frame in frames.items():
+        key = f"bulk_{gen}_{t}_{fy}{fp}"
+        _FRAMES[key] = frame
+        _FRAMES.move_to_end(key)
+    while len(_FRAMES) > MAX_FRAMES:
+        _FRAMES.popitem(last=False)
+    return [frames[t] for t in tags]
+
+
+def _parse_filter(expr: str):
+    """'Revenue > 1B' -> ("Revenue", operator.gt, 1e9)."""
+    m = _FILTER.match(expr)
+    if not m:
+        raise ValueError(f"Unrecognized filter {expr!r}; use e.g. 'Revenue > 1B' or 'free_cash_flow > 0'")
+    return m.group(1), _OPS[m.group(2)], float(m.group(3)) * _SCALE[m.group(4).upper()]
+
+
+async def screen_companies_impl(
+    period: str,
+    filters: Optional[List[str]] = None,
+    sort_by: Optional[str] = None,
+    descending: bool = True,
+    limit: int = 50,
+    columns: Optional[List[str]] = None,
+) -> ScreenResult:
+    """Every filer's values for the requested concepts in one period, filtered and ranked.
+
+    Frames are calendar-aligned: FY2023 reads CY2023 durations and balances
+    at the end of CY2023 Q4, which for off-calendar fiscal years is the
+    closest calendar period rather than the fiscal one get_financials uses.
+    Offline, columns come from the bulk companyfacts instead and use the
+    fiscal period, as get_financials does.
+    """
+    conds = [_parse_filter(f) for f in filters or []]
+    fields = list(dict.fromkeys(list(columns or []) + [c[0] for c in conds] + ([sort_by] if sort_by else [])))
+    if not fields:
+        raise ValueError("Give at least one of filters, sort_by or columns")
+    unknown = [f for f in fields if f not in TAG_MAP and f not in DERIVED]
+    if unknown:
+        raise ValueError(f"Unknown concepts: {', '.join(unknown)}")
+    fy, fp = parse_period(period)
+    needed = list(dict.fromkeys(c for f in fields for c in (DERIVED.get(f) or (f,))))
+    if OFFLINE:
+        wanted = [(c, tag, f"{fp}{fy}") for c in needed for tag in TAG_MAP[c]]
+        with stage("bulk_frames"):
+            frames = await _bulk_frames([tag for _, tag, _ in wanted], fy, fp)
+    else:
+        duration, instant = frame_periods(fy, fp)
+        # one frame per TAG_MAP alias, in preference order
+        wanted = [(c, tag, instant if c in INSTANT_CONCEPTS else duration) for c in needed for tag in TAG_MAP[c]]
+        frames = await asyncio.gather(*(load_frame(tag, p) for _, tag, p in wanted))
+
+    with stage("screen"):
+        universe = np.unique(np.concatenate([f.cik for f in frames]))
+        n = len(universe)
+        cols = {c: np.full(n, np.nan) for c in needed}
+        for (c, _, _), f in zip(wanted, frames):
+            if not len(f.cik):
+                continue
+            pos = np.searchsorted(universe, f.cik)
+            gap = np.isnan(cols[c][pos])
+            cols[c][pos[gap]] = f.val[gap]
+        if n and any(f in DERIVED for f in fields):
+            cols.update((k, v) for k, v in derive_columns(cols).items() if k in fields)
+        keep = np.ones(n, dtype=bool)
+        for field, op, value in conds:
+            col = cols[field]
+            keep &= ~np.isnan(col) & op(col, value)
+        idx = np.flatnonzero(keep)
+        if sort_by:
+            # NaN sorts last either way
+            key = cols[sort_by][idx]
+            idx = idx[np.argsort(-key if descending else key, kind="stable")]
+        top = idx[: max(1, min(int(limit), MAX_ROWS))]
+
+    names = {}
+    for f in frames:
+        if not len(f.cik):
+            continue
+        pos = np.minimum(np.searchsorted(f.cik, universe[top]), len(f.cik) - 1)
+        for i, p in zip(top, pos):
+            if f.cik[p] == universe[i]:
+                names.setdefault(i, str(f.name[p]))
+    rows = [[str(universe[i]).zfill(10), names.get(i, "")] + [_scalar(cols[f][i]) for f in fields] for i in top]
+    return ScreenResult(
+        period=period, frames=sorted({p for _, _, p in wanted}), columns=["cik", "name"] + fields, rows=rows,
+        matched=len(idx), universe=n,
+    )
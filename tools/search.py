@@ -0,0 +1,97 @@
+from typing import List, Optional
+
+from adapters.metrics import METRICS, record_error, stage
+from adapters.sec_api import INFLIGHT
+from adapters.text_index import TEXT_INDEX, parse_query
+from adapters.workers import POOL
+from schemas.models import SectionName, TextHit, TextSearchResult
+from tools.common import DOCS, zero_pad_cik
+from tools.jobs import index_document
+from tools.sectioner import SECTIONER_VERSION
+
+MAX_HITS = 50
+# Match offsets reported per hit, and the snippet around the first one.
+MAX_MATCHES = 8
+SNIPPET_CHARS = 240
+
+METRICS.collect(
+    "sec_mcp_text_index_size", "gauge", "Filings and chunks in the full-text index", ("kind",),
+    lambda: TEXT_INDEX.counts().items(),
+)
+
+
+async def _index(doc: dict, sections: dict, old_sha: Optional[str]):
+    with stage("text_index"):
+        await POOL.run(index_document, str(DOCS.objects.root), doc, sections, old_sha)
+
+
+async def index_filing(rec: dict, sections: Optional[dict] = None):
+    """Add a stored filing to the full-text index unless it is there already.
+
+    Called on every read of filing text or sections; re-indexes when the text
+    changed or sections arrive for a filing first indexed without them.
+    """
+    if not DOCS.has_text(rec):
+        return
+    meta = rec["meta"]
+    version = SECTIONER_VERSION if sections is not None else 0
+    doc = {
+        "accession": meta["accession"], "cik": int(meta["cik"]), "form": meta["form"], "filed": meta["filed_at"][:10],
+        "text_sha": rec["text"], "version": version,
+    }
+    state = TEXT_INDEX.state(doc["accession"])
+    if state is not None and state[0] == rec["text"] and (state[1] == version or not version):
+        return
+    try:
+        await INFLIGHT.do(
+            f"index:{doc['accession']}", lambda: _index(doc, sections or {}, state[0] if state else None)
+        )
+    except Exception as e:
+        # a failed index write must not fail the read that triggered it
+        record_error(e, "INDEX_FAILED", fails_call=False)
+
+
+def _hit(row: tuple, pattern) -> TextHit:
+    acc, cik, form, filed, section, start, end, score = row
+    hit = TextHit(
+        accession=acc, cik=str(cik).zfill(10), form=form, filed=filed, section=section, start=start, end=end,
+        score=round(-score, 4),
+    )
+    rec = DOCS.get(acc)
+    if not rec or not DOCS.has_text(rec):
+        # evicted from the document store since it was indexed
+        return hit
+    text = DOCS.read_text(rec, start, end)
+    found = [(m.start(), m.end()) for _, m in zip(range(MAX_MATCHES), pattern.finditer(text))]
+    hit.matches = [[start + a, start + b] for a, b in found]
+    first = found[0][0] if found else 0
+    lo = max(0, first - SNIPPET_CHARS // 3)
+    hit.snippet = text[lo : lo + SNIPPET_CHARS]
+    hit.snippet_start = start + lo
+    return hit
+
+
+async def search_text_impl(
+    query: str,
+    cik: Optional[str] = None,
+    form_types: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sections: Optional[List[SectionName]] = None,
+    limit: int = 10,
+    per_filing: int = 3,
+) -> TextSearchResult:
+    """Ranked chunks of indexed filings matching the query, with match offsets.
+
+    Only filings already read through get_filing_text or get_sections are
+    indexed; nothing is fetched.
+    """
+    match, pattern = parse_query(query)
+    limit = max(1, min(int(limit), MAX_HITS))
+    with stage("text_search"):
+        rows = TEXT_INDEX.search(
+            match, int(zero_pad_cik(cik)) if cik else None, form_types, start_date, end_date, sections, limit,
+            max(1, int(per_filing)),
+        )
+        hits = [_hit(row, pattern) for row in rows]
+    return TextSearchResult(query=query, hits=hits, indexed_filings=TEXT_INDEX.counts()["filings"])
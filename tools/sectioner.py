@@ -1,25 +1,140 @@
 import re
-from typing import Dict
-
-HEADINGS = [
-    ("MDA", r"Item\s+7\.\s*Management['’]s Discussion and Analysis|Item\s+2\.\s*Management"),
-    ("RiskFactors", r"Item\s+1A\.\s*Risk Factors"),
-    ("Business", r"Item\s+1\.\s*Business"),
-    ("Footnotes", r"Notes to (the )?Consolidated Financial Statements"),
-]
-
-
-def extract_sections(text: str) -> Dict[str, dict]:
-    found = []
-    for key, pat in HEADINGS:
-        m = re.search(pat, text, re.IGNORECASE)
-        if m:
-            found.append((key, m.start(), m.group(0)))
-    found.sort(key=lambda x: x[1])
-    results: Dict[str, dict] = {}
-    for i, (key, start, heading) in enumerate(found):
-        end = found[i + 1][1] if i + 1 < len(found) else len(text)
-        results[key] = {"start": start, "end": end, "heading": heading}
-    return results
+from typing import Dict, List, Optional
+
+# Bump when heading detection changes so stored section offsets are recomputed.
+SECTIONER_VERSION = 4
+
+TENK_ITEMS = {
+    "1": "Business",
+    "1A": "RiskFactors",
+    "1B": "UnresolvedStaffComments",
+    "1C": "Cybersecurity",
+    "2": "Properties",
+    "3": "LegalProceedings",
+    "4": "MineSafetyDisclosures",
+    "5": "MarketForEquity",
+    "6": "Reserved",
+    "7": "MDA",
+    "7A": "MarketRisk",
+    "8": "FinancialStatements",
+    "9": "ChangesInAccountants",
+    "9A": "ControlsAndProcedures",
+    "9B": "OtherInformation",
+    "9C": "ForeignJurisdictionInspections",
+    "10": "DirectorsAndGovernance",
+    "11": "ExecutiveCompensation",
+    "12": "SecurityOwnership",
+    "13": "RelatedTransactions",
+    "14": "AccountantFees",
+    "15": "Exhibits",
+    "16": "Form10KSummary",
+}
+TENQ_ITEMS = {
+    "I": {"1": "FinancialStatements", "2": "MDA", "3": "MarketRisk", "4": "ControlsAndProcedures"},
+    "II": {
+        "1": "LegalProceedings",
+        "1A": "RiskFactors",
+        "2": "UnregisteredSales",
+        "3": "DefaultsUponSeniorSecurities",
+        "4": "MineSafetyDisclosures",
+        "5": "OtherInformation",
+        "6": "Exhibits",
+    },
+}
+
+# Every heading kind in one alternation so the text is scanned once. Headings
+# start a line because HtmlTextStream puts every text node on its own line.
+_SCAN = re.compile(
+    r"^[ \t\xa0]*(?:"
+    r"(?P<part>PART\s+(?P<roman>IV|I{1,3})\b)"
+    r"|(?P<item>ITEM\s*(?P<num>1[0-6]|[1-9])(?P<sub>[A-C])?\b)"
+    r"|(?P<notes>NOTES\s+TO\s+(?:THE\s+)?(?:CONDENSED\s+)?(?:CONSOLIDATED\s+)?FINANCIAL\s+STATEMENTS)"
+    r")[^\n]{0,160}",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Headings each followed this closely by the next one, _TOC_RUN or more in a
+# row, are a table of contents; fewer are short items ("Item 1B. ... None.").
+_TOC_GAP = 400
+_TOC_RUN = 5
+_PAGE_NUMBER = re.compile(r"\s(?:[A-Z]-)?\d{1,3}\s*$")
+# "Item 7 of this report ..." wrapped onto its own line is a cross-reference, not a heading.
+_XREF = re.compile(r"[ \t\xa0]*(?:,|[a-z])")
+
+
+def _heading(text: str, m: re.Match) -> str:
+    line = m.group(0).strip()
+    if len(re.sub(r"[^A-Za-z]", "", line)) <= len("item") + 1:
+        # "Item 7." alone on a line: the title is on the next one
+        nxt = text[m.end() + 1 : text.find("\n", m.end() + 1)]
+        line = f"{line} {nxt.strip()}"[:200]
+    return line
 
 
+def extract_sections(text: str, form: Optional[str] = None) -> Dict[str, dict]:
+    """Map section name -> {start, end, heading} in one pass over the text.
+
+    Every PART / ITEM / Notes heading is collected in a single scan. For each
+    section the first occurrence that does not look like a table-of-contents
+    entry (part of a run of _TOC_RUN headings each within _TOC_GAP chars of
+    the next, or a trailing page number) is taken as the body heading;
+    sections end where the next chosen item begins.
+    """
+    quarterly = bool(form) and form.upper().startswith("10-Q")
+    hits: List[tuple] = []  # (start, kind, key, match)
+    part = "I"
+    for m in _SCAN.finditer(text):
+        if m.group("part"):
+            part = m.group("roman").upper()
+            hits.append((m.start(), "part", None, m))
+        elif m.group("item"):
+            num = m.group("num") + (m.group("sub") or "").upper()
+            if quarterly:
+                name = TENQ_ITEMS.get(part, TENQ_ITEMS["II"]).get(num)
+            else:
+                name = TENK_ITEMS.get(num)
+            if name and not _XREF.match(text, m.end("item")):
+                hits.append((m.start(), "item", name, m))
+        else:
+            hits.append((m.start(), "notes", "Footnotes", m))
+
+    gaps = [b[0] - a[0] for a, b in zip(hits, hits[1:])] + [len(text) - hits[-1][0]] if hits else []
+    toc = [False] * len(hits)
+    i = 0
+    while i < len(hits):
+        j = i
+        while j < len(hits) and gaps[j] < _TOC_GAP:
+            j += 1
+        if j - i >= _TOC_RUN:
+            # the last entry is far from the next heading only because the body follows
+            toc[i : j + 1] = [True] * (min(j + 1, len(hits)) - i)
+        i = j + 1
+
+    def pick(kinds, after=-1):
+        chosen: Dict[str, tuple] = {}
+        fallback: Dict[str, tuple] = {}
+        for i, (start, kind, name, m) in enumerate(hits):
+            if kind not in kinds or start < after or name in chosen:
+                continue
+            gap = gaps[i]
+            if not toc[i] and not _PAGE_NUMBER.search(m.group(0)):
+                chosen[name] = (start, m)
+            elif name not in fallback or gap > fallback[name][2]:
+                fallback[name] = (start, m, gap)
+        for name, (start, m, _) in fallback.items():
+            chosen.setdefault(name, (start, m))
+        return chosen
+
+    items = sorted((start, name, m) for name, (start, m) in pick(("item",)).items())
+    bounds = [start for start, _, _ in items] + [len(text)]
+    results: Dict[str, dict] = {}
+    for i, (start, name, m) in enumerate(items):
+        results[name] = {"start": start, "end": bounds[i + 1], "heading": _heading(text, m)}
+
+    # notes sit inside the financial statements item; stop at the next item
+    fs = results.get("FinancialStatements")
+    notes = pick(("notes",), after=fs["start"] if fs else -1).get("Footnotes")
+    if notes:
+        start, m = notes
+        end = next((b for b in bounds if b > start), len(text))
+        results["Footnotes"] = {"start": start, "end": end, "heading": _heading(text, m)}
+    return results
@@ -1,24 +1,106 @@
 from typing import List, Optional
 
-from ..schemas.models import FilingSections, SectionSlice, SectionName
-from .filing_text import get_filing_text_impl
-from .sectioner import extract_sections
+from schemas.models import FilingSections, SectionSlice, SectionName
+from adapters.metrics import stage
+from adapters.workers import POOL
+from tools.common import DOCS, ensure_filing
+from tools.jobs import section_offsets
+from tools.search import index_filing
+from tools.sectioner import SECTIONER_VERSION
+from tools.window import encode_cursor, requested_window, snap_end
 
 
-async def get_sections_impl(accession: str, sections: Optional[List[SectionName]]) -> FilingSections:
-    ft = await get_filing_text_impl(accession)
-    all_sections = extract_sections(ft.text)
+def _runs(chosen: list) -> List[list]:
+    """[name, start, end] runs covering the chosen sections in document order.
+
+    Every position belongs to the innermost section holding it, so a child
+    nested in a parent splits the parent into the runs before and after it
+    and no text is read twice under one cursor.
+    """
+    cuts = sorted({b for _, s in chosen for b in (s["start"], s["end"])})
+    runs: List[list] = []
+    for a, b in zip(cuts, cuts[1:]):
+        inside = [(s["end"] - s["start"], name) for name, s in chosen if s["start"] <= a < s["end"]]
+        if not inside:
+            continue
+        name = min(inside)[1]
+        if runs and runs[-1][0] == name and runs[-1][2] == a:
+            runs[-1][2] = b
+        else:
+            runs.append([name, a, b])
+    return runs
+
+
+async def get_sections_impl(
+    accession: str,
+    sections: Optional[List[SectionName]],
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> FilingSections:
+    """Selected sections, each sliced from the stored text.
+
+    Without a window every selected section comes back whole, so a nested
+    section's text also appears inside its parent's. With a window the text
+    is read once, in document order from `offset` (an absolute text offset,
+    or where `cursor` left off) until the budget runs out, each stretch under
+    the innermost selected section; a parent interrupted by a child, or a
+    section cut short, is marked incomplete and next_cursor resumes inside it.
+    """
+    window = requested_window(accession, offset, length, max_tokens, cursor)
+    rec = await ensure_filing(accession)
+    meta = rec["meta"]
+    all_sections = DOCS.load_sections(rec, SECTIONER_VERSION)
+    if all_sections is None:
+        # stored offsets predate the current sectioner
+        with stage("sectioning"):
+            all_sections = await POOL.run(section_offsets, str(DOCS.objects.root), rec["text"], meta["form"])
+        DOCS.put_sections(accession, all_sections, SECTIONER_VERSION)
+    await index_filing(rec, all_sections)
     wanted = set(sections) if sections else set(all_sections.keys())
-    slices = []
-    for name, s in all_sections.items():
-        if name in wanted:
+    chosen = sorted(
+        ((name, s) for name, s in all_sections.items() if name in wanted), key=lambda x: (x[1]["start"], -x[1]["end"])
+    )
+    slices, next_cursor = [], None
+    if window is None:
+        # whole sections, nested ones (Footnotes inside FinancialStatements) included
+        for name, s in chosen:
+            text = DOCS.read_text(rec, s["start"], s["end"])
+            slices.append(SectionSlice(name=name, start=s["start"], end=s["end"], heading=s.get("heading"), text=text))
+    else:
+        pos, budget = window
+        for name, a, b in _runs(chosen):
+            if b <= pos:
+                continue
+            if budget is not None and budget <= 0:
+                next_cursor = encode_cursor(accession, max(pos, a))
+                break
+            s = all_sections[name]
+            start = max(pos, a)
+            end = b if budget is None else min(b, start + budget)
+            text = DOCS.read_text(rec, start, end)
+            if end < b:
+                end = snap_end(start, end, b, text)
+                text = text[: end - start]
+                next_cursor = encode_cursor(accession, end)
             slices.append(
                 SectionSlice(
-                    name=name, start=s["start"], end=s["end"], heading=s.get("heading"), text=ft.text[s["start"] : s["end"]]
+                    name=name, start=start, end=end, heading=s.get("heading"), text=text,
+                    complete=(start, end) == (s["start"], s["end"]),
                 )
             )
+            if next_cursor:
+                break
+            pos = end
+            if budget is not None:
+                budget -= end - start
     return FilingSections(
-        accession=ft.accession, cik=ft.cik, form=ft.form, filed_at=ft.filed_at, source_url=ft.source_url, sections=slices
+        accession=meta["accession"],
+        cik=meta["cik"],
+        form=meta["form"],
+        filed_at=meta["filed_at"],
+        source_url=meta["doc_url"],
+        sections=slices,
+        next_cursor=next_cursor,
     )
-
-
@@ -1,31 +1,168 @@
-import re
-from rapidfuzz import process, fuzz
+import hashlib, os, re
+from collections import defaultdict, deque
+from typing import List, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz
+from rapidfuzz.process import cdist
+
+# Sentences scoring at least this against one on the other side are the same
+# sentence, edited.
+MATCH_SCORE = 80
+# Threads rapidfuzz may use per diff. Diffs already run in worker processes,
+# so raising this trades per-diff latency against throughput.
+DIFF_THREADS = int(os.environ.get("SEC_MCP_DIFF_THREADS", "-1"))
+# cdist rows scored at once; bounds the score matrix to _BLOCK x len(new).
+_BLOCK = 1024
 
 
 def split_sents(t: str):
     return [s.strip() for s in re.split(r"(?<=[\.?\!])\s+", t) if s.strip()]
 
 
-def sentence_diff(old: str, new: str):
-    old_s = split_sents(old)
-    new_s = split_sents(new)
-    added, removed = [], []
-    for s in new_s:
-        if not old_s:
-            added.append(s)
-            continue
-        match = process.extractOne(s, old_s, scorer=fuzz.token_set_ratio)
-        score = match[1] if match else 0
-        if score < 80:
-            added.append(s)
-    for s in old_s:
-        if not new_s:
-            removed.append(s)
-            continue
-        match = process.extractOne(s, new_s, scorer=fuzz.token_set_ratio)
-        score = match[1] if match else 0
-        if score < 80:
-            removed.append(s)
-    return added, removed
+def _key(s: str) -> str:
+    return " ".join(s.split())
+
+
+def fingerprint(s: str) -> int:
+    """64-bit hash of a sentence, insensitive to whitespace."""
+    return int.from_bytes(hashlib.blake2b(_key(s).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _candidates(old: List[str], new: List[str]):
+    """(i, j, score) for every pair scoring >= MATCH_SCORE."""
+    out = []
+    for lo in range(0, len(old), _BLOCK):
+        # no cheaper scorer bounds token_set_ratio from above (plain ratio drops a
+        # sentence extended with a clause), so score every pair with it, in bulk
+        m = cdist(
+            old[lo : lo + _BLOCK], new, scorer=fuzz.token_set_ratio, score_cutoff=MATCH_SCORE,
+            dtype=np.uint8, workers=DIFF_THREADS,
+        )
+        ii, jj = np.nonzero(m)
+        out.extend(zip((ii + lo).tolist(), jj.tolist(), m[ii, jj].tolist()))
+    return out
+
+
+def _align(cands, n_new: int):
+    """Highest-scoring set of candidate pairs that keeps both sides in order.
+
+    Weighted longest increasing subsequence over j, with a Fenwick tree of
+    prefix maxima, so it is O(k log n) in the number of candidates.
+    """
+    tree = [(0, -1)] * (n_new + 1)
+    best, back = [], []
+    # within one old sentence visit j descending so two pairs never share i
+    order = sorted(range(len(cands)), key=lambda k: (cands[k][0], -cands[k][1]))
+    for k in order:
+        _, j, score = cands[k]
+        prev, p, x = 0, -1, j  # prefix max over new positions < j
+        while x > 0:
+            if tree[x][0] > prev:
+                prev, p = tree[x]
+            x -= x & -x
+        total = prev + score
+        best.append(total)
+        back.append(p)
+        x = j + 1
+        while x <= n_new:
+            if tree[x][0] < total:
+                tree[x] = (total, len(best) - 1)
+            x += x & -x
+    if not best:
+        return []
+    k = max(range(len(best)), key=best.__getitem__)
+    chain = []
+    while k != -1:
+        chain.append(cands[order[k]])
+        k = back[k]
+    return chain[::-1]
 
 
+def align(old_s: List[str], new_s: List[str], old_fp: List[int] | None = None, new_fp: List[int] | None = None):
+    """Pair sentences of two versions; returns (exact, edited) index pairs.
+
+    exact holds (i, j) for identical sentences, edited (i, j, score) for the
+    same sentence reworded. Identical sentences are paired first by
+    fingerprint; the rest are scored in bulk and aligned in document order,
+    then any leftover mutual best matches (moved and edited sentences) are
+    paired too.
+    """
+    old_fp = old_fp if old_fp is not None else [fingerprint(s) for s in old_s]
+    new_fp = new_fp if new_fp is not None else [fingerprint(s) for s in new_s]
+    pool = defaultdict(deque)
+    for i, fp in enumerate(old_fp):
+        pool[fp].append(i)
+    exact = []
+    new_left = []
+    for j, fp in enumerate(new_fp):
+        q = pool.get(fp)
+        if q:
+            exact.append((q.popleft(), j))
+        else:
+            new_left.append(j)
+    done = {i for i, _ in exact}
+    old_left = [i for i in range(len(old_s)) if i not in done]
+
+    pairs = []
+    if old_left and new_left:
+        cands = _candidates([old_s[i] for i in old_left], [new_s[j] for j in new_left])
+        pairs = _align(cands, len(new_left))
+        used_o = {i for i, _, _ in pairs}
+        used_n = {j for _, j, _ in pairs}
+        best_o, best_n = {}, {}
+        for i, j, score in cands:
+            if i in used_o or j in used_n:
+                continue
+            if score > best_o.get(i, (0, -1))[0]:
+                best_o[i] = (score, j)
+            if score > best_n.get(j, (0, -1))[0]:
+                best_n[j] = (score, i)
+        pairs += [(i, j, score) for i, (score, j) in best_o.items() if best_n[j][1] == i]
+        pairs.sort()
+    return exact, [(old_left[i], new_left[j], score) for i, j, score in pairs]
+
+
+def diff_sentences(old: str, new: str) -> Tuple[List[str], List[str], List[tuple]]:
+    """(added, removed, modified) sentences; modified holds (old, new, score)."""
+    old_s, new_s = split_sents(old), split_sents(new)
+    exact, edited = align(old_s, new_s)
+    matched_o = {i for i, _ in exact} | {i for i, _, _ in edited}
+    matched_n = {j for _, j in exact} | {j for _, j, _ in edited}
+    added = [s for j, s in enumerate(new_s) if j not in matched_n]
+    removed = [s for i, s in enumerate(old_s) if i not in matched_o]
+    modified = [(old_s[i], new_s[j], score) for i, j, score in edited]
+    return added, removed, modified
+
+
+def lineage(versions: List[List[str]], fingerprints: List[List[int]]) -> List[dict]:
+    """Follow every sentence through a series of versions, oldest first.
+
+    Returns one entry per sentence lineage with indices only: first/last
+    version it appears in, its position in the last one, and the edits as
+    (version, old_pos, new_pos, score). Adjacent versions are aligned once each.
+    """
+    lines: List[dict] = []
+    current = {}  # position in the previous version -> lineage id
+    for v, sents in enumerate(versions):
+        following = {}
+        if v:
+            exact, edited = align(versions[v - 1], sents, fingerprints[v - 1], fingerprints[v])
+            for i, j in exact:
+                following[j] = current[i]
+            for i, j, score in edited:
+                following[j] = current[i]
+                lines[current[i]]["edits"].append((v, i, j, score))
+        for j in range(len(sents)):
+            if j not in following:
+                following[j] = len(lines)
+                lines.append({"first": v, "edits": []})
+            line = lines[following[j]]
+            line["last"], line["pos"] = v, j
+        current = following
+    return lines
+
+
+def sentence_diff(old: str, new: str):
+    added, removed, _ = diff_sentences(old, new)
+    return added, removed
@@ -0,0 +1,58 @@
+"""Windows over stored filing text and the cursors that continue them."""
+import base64
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+# Rough size of a token in filing prose, for max_tokens windows.
+CHARS_PER_TOKEN = 4
+
+
+def encode_cursor(accession: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{accession}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, accession: str) -> int:
+    try:
+        acc, offset = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().rsplit(":", 1)
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Malformed cursor")
+    if acc != accession:
+        raise ValueError(f"Cursor is for {acc}, not {accession}")
+    return offset
+
+
+def requested_window(
+    accession: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Optional[Tuple[int, Optional[int]]]:
+    """(start, size) asked for, size None meaning to the end; None if no window was asked for."""
+    if offset is None and length is None and max_tokens is None and cursor is None:
+        return None
+    start = decode_cursor(cursor, accession) if cursor else int(offset or 0)
+    sizes = [int(length)] if length is not None else []
+    if max_tokens is not None:
+        sizes.append(int(max_tokens) * CHARS_PER_TOKEN)
+    if start < 0 or any(n <= 0 for n in sizes):
+        raise ValueError("offset must be >= 0 and length/max_tokens > 0")
+    return start, min(sizes) if sizes else None
+
+
+def snap_end(start: int, end: int, limit: int, text: str, boundaries: List[int] = ()) -> int:
+    """Pull a window end that falls short of `limit` back to a clean break.
+
+    Prefers a section start, then a line break, in the second half of the
+    window, so the next window begins at the top of a section or paragraph.
+    `text` holds the characters [start, end).
+    """
+    if end >= limit:
+        return limit
+    floor = start + (end - start) // 2
+    i = bisect_right(boundaries, end) - 1
+    if i >= 0 and boundaries[i] > floor:
+        return boundaries[i]
+    nl = text.rfind("\n", floor - start)
+    return start + nl + 1 if nl >= 0 else end